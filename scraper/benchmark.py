@@ -0,0 +1,348 @@
+"""
+Offline benchmark for the scraper pipeline.
+
+Serves synthetic (or recorded) RSS feeds and article pages from local HTTP
+servers, answers curator prompts with fakes.FakeGeminiModel and writes to a
+throwaway SQLite file through the same libsql client the scraper uses. Nothing
+leaves the machine and the real scraper/cache and scraper/logs are untouched.
+
+    python benchmark.py --feeds 200 --entries 50 --model-latency 0.5
+    python benchmark.py --mode feed --feeds 5          # fetch_and_save_feed one by one
+    python benchmark.py --record fixtures/             # capture live feeds + pages once
+    python benchmark.py --fixtures fixtures/           # replay them offline
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import resource
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import quote
+
+SCHEMA_FILE = Path(__file__).resolve().parent / "schema.sql"
+
+TITLE_WORDS = [
+    "Скопје", "Охрид", "стартап", "изложба", "фестивал", "иновација", "дизајн", "музика",
+    "технологија", "млади", "успех", "уметност", "кафе", "патување", "спорт", "бизнис",
+]
+
+
+# ---- Synthetic content ----
+
+def build_feed_xml(base_url: str, feed_index: int, entries: int, now: float) -> bytes:
+    items = []
+    for i in range(entries):
+        # Distinct word order per article, so the near-duplicate stage doesn't fold them together
+        rng = random.Random(feed_index * 100_003 + i)
+        words = " ".join(rng.choices(TITLE_WORDS, k=6))
+        story = " ".join(rng.choices(TITLE_WORDS, k=40))
+        link = f"{base_url}/article/{feed_index}/{i}.html"
+        image = f'<img src="/img/{feed_index}-{i}.jpg" />' if i % 3 == 0 else ""
+        items.append(
+            f"<item><title>{words} #{feed_index}-{i}</title><link>{link}</link>"
+            f"<guid>{link}</guid><pubDate>{formatdate(now - i * 1800)}</pubDate>"
+            f"<description><![CDATA[<p>{words}. {story}.</p>{image}]]></description></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>Bench feed {feed_index}</title>{''.join(items)}</channel></rss>"
+    ).encode("utf-8")
+
+
+def build_article_html(base_url: str, path: str, body_kb: int) -> bytes:
+    head = (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Статија</title>"
+        + "<link rel=\"stylesheet\" href=\"/style.css\">" * 20
+        + f"<meta property=\"og:image\" content=\"{base_url}/og/{quote(path)}.jpg\"></head>"
+    )
+    body = "<body>" + "<p>Текст на статијата.</p>" * (body_kb * 40) + "</body></html>"
+    return (head + body).encode("utf-8")
+
+
+# ---- Local HTTP server ----
+
+class BenchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        bench = self.server.bench
+        if bench["latency"]:
+            time.sleep(bench["latency"])
+
+        base_url = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+        body, content_type = None, "text/html; charset=utf-8"
+
+        feed_match = re.fullmatch(r"/feed/(\d+)\.xml", self.path)
+        if feed_match:
+            body = build_feed_xml(base_url, int(feed_match.group(1)), bench["entries"], bench["now"])
+            content_type = "application/rss+xml"
+        elif self.path.startswith("/article/"):
+            body = build_article_html(base_url, self.path, bench["body_kb"])
+        elif self.path.startswith("/fixtures/feeds/") and bench["fixtures"]:
+            body = _serve_fixture_feed(bench, self.path[len("/fixtures/feeds/"):], base_url)
+            content_type = "application/rss+xml"
+        elif self.path.startswith("/fixtures/pages/") and bench["fixtures"]:
+            page = bench["fixtures"] / "pages" / Path(self.path).name
+            body = page.read_bytes() if page.exists() else build_article_html(base_url, self.path, bench["body_kb"])
+
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _serve_fixture_feed(bench: dict, name: str, base_url: str) -> bytes | None:
+    feed_file = bench["fixtures"] / "feeds" / Path(name).name
+    if not feed_file.exists():
+        return None
+    text = feed_file.read_text(encoding="utf-8", errors="replace")
+    # Point recorded article links at our local copies of the pages
+    for original, page_name in bench["manifest"].get("pages", {}).items():
+        text = text.replace(original, f"{base_url}/fixtures/pages/{page_name}")
+    return text.encode("utf-8")
+
+
+def start_servers(hosts: int, bench: dict) -> list[ThreadingHTTPServer]:
+    """
+    One server per loopback address (127.0.0.1, 127.0.0.2, ...) so the per-host
+    limit sees several outlets. Falls back to 127.0.0.1 where aliases don't exist.
+    """
+    servers = []
+    for i in range(hosts):
+        try:
+            server = ThreadingHTTPServer((f"127.0.0.{i + 1}", 0), BenchHandler)
+        except OSError:
+            if not servers:
+                raise
+            print(f"⚠️ Loopback alias 127.0.0.{i + 1} unavailable, using {len(servers)} hosts.")
+            break
+        server.daemon_threads = True
+        server.bench = bench
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+# ---- Recording ----
+
+def record_fixtures(target: Path, pages_per_feed: int) -> None:
+    """Captures the live TARGET_FEEDS and a few article pages for offline runs."""
+    import cloudscraper
+    import feedparser
+    from scraper import TARGET_FEEDS
+
+    (target / "feeds").mkdir(parents=True, exist_ok=True)
+    (target / "pages").mkdir(parents=True, exist_ok=True)
+    session = cloudscraper.create_scraper()
+    manifest = {"feeds": [], "pages": {}}
+
+    for config in TARGET_FEEDS:
+        try:
+            resp = session.get(config["url"], timeout=20)
+            if resp.status_code != 200:
+                print(f"❌ [{config['source']}] Status {resp.status_code}")
+                continue
+        except Exception as e:
+            print(f"❌ [{config['source']}] {e}")
+            continue
+
+        feed_name = hashlib.sha1(config["url"].encode()).hexdigest()[:16] + ".xml"
+        (target / "feeds" / feed_name).write_bytes(resp.content)
+        manifest["feeds"].append({"source": config["source"], "file": feed_name})
+
+        for entry in feedparser.parse(resp.content).entries[:pages_per_feed]:
+            link = entry.get("link")
+            if not link:
+                continue
+            try:
+                page = session.get(link, timeout=10)
+            except Exception:
+                continue
+            page_name = hashlib.sha1(link.encode()).hexdigest()[:16] + ".html"
+            (target / "pages" / page_name).write_bytes(page.content)
+            manifest["pages"][link] = page_name
+        print(f"📼 Recorded {config['source']}")
+
+    (target / "index.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"📼 Saved {len(manifest['feeds'])} feeds and {len(manifest['pages'])} pages to {target}")
+
+
+# ---- Benchmark run ----
+
+def prepare_environment(workdir: Path) -> Path:
+    """Points the scraper at a fresh SQLite file and private cache/log dirs."""
+    db_path = workdir / "bench.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_FILE.read_text(encoding="utf-8"))
+    conn.commit()
+    conn.close()
+
+    os.environ["TURSO_DATABASE_URL"] = f"file:{db_path}"
+    os.environ.pop("TURSO_AUTH_TOKEN", None)
+    os.environ["SCRAPER_CACHE_DIR"] = str(workdir / "cache")
+    os.environ["SCRAPER_LOG_DIR"] = str(workdir / "logs")
+    os.environ["SCRAPER_SNAPSHOT_DIR"] = str(workdir / "snapshots")
+    return db_path
+
+
+def build_feed_configs(args, servers, manifest: dict) -> list[dict]:
+    if args.fixtures:
+        base = f"http://127.0.0.1:{servers[0].server_address[1]}"
+        return [{"url": f"{base}/fixtures/feeds/{feed['file']}", "source": feed["source"]} for feed in manifest["feeds"]]
+
+    configs = []
+    for i in range(args.feeds):
+        host, port = servers[i % len(servers)].server_address
+        configs.append({"url": f"http://{host}:{port}/feed/{i}.xml", "source": f"Bench {i}"})
+    return configs
+
+
+def run_benchmark(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="vibes-bench-"))
+    db_path = prepare_environment(workdir)
+
+    # Imported only now so module-level paths pick up the benchmark environment
+    import curator
+    import metrics
+    import scraper
+    from fakes import FakeGeminiModel
+    from logger import flush_logs
+
+    curator.set_model_factory(lambda name: FakeGeminiModel(
+        name, latency=args.model_latency, failure_rate=args.model_failure_rate, seed=args.seed,
+    ))
+    if not args.rate_limits:
+        curator.MODEL_LIMITS = {}
+        curator.DEFAULT_MODEL_LIMITS = {"rpm": 1_000_000, "tpm": 1_000_000_000}
+
+    manifest = {}
+    fixtures = Path(args.fixtures) if args.fixtures else None
+    if fixtures:
+        manifest = json.loads((fixtures / "index.json").read_text(encoding="utf-8"))
+
+    bench = {
+        "entries": args.entries,
+        "latency": args.http_latency,
+        "body_kb": args.body_kb,
+        "now": time.time(),
+        "fixtures": fixtures,
+        "manifest": manifest,
+    }
+    servers = start_servers(1 if fixtures else args.hosts, bench)
+    feed_configs = build_feed_configs(args, servers, manifest)
+    scraper.TARGET_FEEDS = feed_configs
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    metrics.reset()
+    started = time.perf_counter()
+
+    if args.mode == "main":
+        try:
+            scraper.main([])
+        except SystemExit:
+            pass
+    else:
+        scraper.ensure_feature_slots()
+        for config in feed_configs:
+            scraper.fetch_and_save_feed(config)
+        scraper.close_client()
+
+    elapsed = time.perf_counter() - started
+    flush_logs()
+    peak_traced = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+    if args.tracemalloc:
+        tracemalloc.stop()
+
+    for server in servers:
+        server.shutdown()
+
+    conn = sqlite3.connect(db_path)
+    posts = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+    conn.close()
+
+    data = metrics.summary()
+    collected = data["counters"].get("articles_collected", 0)
+    return {
+        "mode": args.mode,
+        "feeds": len(feed_configs),
+        "entries_per_feed": args.entries,
+        "elapsed_s": round(elapsed, 3),
+        "articles_collected": collected,
+        "posts_written": posts,
+        "articles_per_s": round(collected / elapsed, 2) if elapsed else None,
+        "feeds_per_s": round(len(feed_configs) / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_traced_mb": round(peak_traced / 1024 / 1024, 1) if peak_traced is not None else None,
+        "stages": data["stages"],
+        "counters": data["counters"],
+        "workdir": str(workdir),
+    }
+
+
+def print_report(report: dict) -> None:
+    print("\n==== 🏎️  Benchmark ====")
+    print(f"mode={report['mode']} feeds={report['feeds']} entries/feed={report['entries_per_feed']}")
+    print(f"wall time        {report['elapsed_s']:.2f}s")
+    print(f"articles         {report['articles_collected']:g} collected, {report['posts_written']} written")
+    print(f"throughput       {report['articles_per_s']} articles/s, {report['feeds_per_s']} feeds/s")
+    print(f"peak RSS         {report['peak_rss_mb']} MB")
+    if report["peak_traced_mb"] is not None:
+        print(f"peak traced      {report['peak_traced_mb']} MB")
+    print("stage                        p50       p95     total   count")
+    for stage, stats in sorted(report["stages"].items(), key=lambda kv: -kv[1]["total_s"]):
+        print(f"{stage:<24} {stats['p50_s']:>8.3f}s {stats['p95_s']:>8.3f}s {stats['total_s']:>8.2f}s {stats['count']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the news scraper.")
+    parser.add_argument("--mode", choices=["main", "feed"], default="main",
+                        help="main(): full concurrent run; feed: fetch_and_save_feed one feed at a time")
+    parser.add_argument("--feeds", type=int, default=50)
+    parser.add_argument("--entries", type=int, default=20, help="Entries per synthetic feed")
+    parser.add_argument("--hosts", type=int, default=8, help="Loopback hosts to spread feeds over")
+    parser.add_argument("--http-latency", type=float, default=0.05, help="Seconds added to every HTTP response")
+    parser.add_argument("--body-kb", type=int, default=64, help="Approximate article body size")
+    parser.add_argument("--model-latency", type=float, default=0.5, help="Seconds per fake Gemini call")
+    parser.add_argument("--model-failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the real Gemini RPM/TPM limits")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tracemalloc", action="store_true", help="Track peak Python heap (slower)")
+    parser.add_argument("--fixtures", help="Serve feeds/pages recorded with --record instead of synthetic ones")
+    parser.add_argument("--record", help="Record live feeds and pages into this directory and exit")
+    parser.add_argument("--record-pages", type=int, default=8, help="Article pages to record per feed")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(Path(args.record), args.record_pages)
+        return
+
+    report = run_benchmark(args)
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,34 @@
 import os
 import json
-import google.generativeai as genai
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from curator_cache import article_key, get_verdicts, put_verdicts
+from curator_wire import (CHARS_PER_TOKEN, build_compact_prompt, compact_enabled, estimate_tokens, full_response_chars,
+                          parse_compact_response, trim_summary)
 from logger import log_event
+from metrics import incr, timed
+from model_guard import CircuitBreaker, RateLimiter, is_quota_error
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("❌ GEMINI_API_KEY is missing in .env file!")
+_genai_configured = False
 
-genai.configure(api_key=api_key)
+
+def configure_genai() -> None:
+    """Configures the Gemini API key the first time a real model is needed."""
+    global _genai_configured
+    if _genai_configured:
+        return
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("❌ GEMINI_API_KEY is missing in .env file!")
+    import google.generativeai as genai  # Takes over a second to import, so only when a model is built
+    genai.configure(api_key=api_key)
+    _genai_configured = True
 
 MODEL_PRIORITY = [
     "gemini-2.5-flash",
@@ -26,58 +42,201 @@ GENERATION_CONFIG = {
     "response_mime_type": "application/json"
 }
 
-_cached_models: dict[str, genai.GenerativeModel] = {}
+# Cross-feed batching: articles from all feeds are packed into as few
+# calls as this budget allows (the instruction prompt is sent once per call)
+BATCH_CHAR_BUDGET = 24000
+BATCH_MAX_ARTICLES = 40
+ARTICLE_OVERHEAD_CHARS = 40  # JSON keys, quotes and the id per article
+
+# Per-model quotas (requests / tokens per minute) used by the rate limiter
+MODEL_LIMITS = {
+    "gemini-2.5-flash": {"rpm": 10, "tpm": 250_000},
+    "gemini-2.5-flash-lite": {"rpm": 15, "tpm": 250_000},
+    "gemini-2.0-flash": {"rpm": 15, "tpm": 1_000_000},
+    "gemini-2.0-flash-lite": {"rpm": 30, "tpm": 1_000_000},
+}
+DEFAULT_MODEL_LIMITS = {"rpm": 10, "tpm": 250_000}
+RATE_LIMIT_SHARE = 1.0        # Fraction of the quota this process may use (sharded runs split it)
+
+MAX_PARALLEL_CALLS = 3        # Curator batches in flight at once
+MAX_RATE_WAIT_SECONDS = 20    # Longer than this and we try the next model instead
+QUOTA_RETRIES = 2             # Retries on the same model after a quota error
+QUOTA_BACKOFF_SECONDS = 2.0   # Doubled after each quota retry
+BREAKER_THRESHOLD = 3         # Consecutive failures before a model is skipped
+BREAKER_COOLDOWN_SECONDS = 300
+
+
+class ModelsUnavailableError(RuntimeError):
+    """Every model is skipped (breaker open or rate limited); retrying now won't help."""
+
+
+def _default_model_factory(model_name: str):
+    configure_genai()
+    import google.generativeai as genai
+    return genai.GenerativeModel(
+        model_name=model_name,
+        generation_config=GENERATION_CONFIG
+    )
+
+
+_model_factory = _default_model_factory
+_cached_models: dict = {}
+_rate_limiters: dict[str, RateLimiter] = {}
+_breakers: dict[str, CircuitBreaker] = {}
+_guards_lock = threading.Lock()
+
 
+def set_model_factory(factory) -> None:
+    """Swaps the model constructor, e.g. for fakes.FakeGeminiModel in benchmarks."""
+    global _model_factory
+    with _guards_lock:
+        _model_factory = factory
+        _cached_models.clear()
+        _rate_limiters.clear()
+        _breakers.clear()
 
-def get_model_instance(model_name: str) -> genai.GenerativeModel:
-    if model_name not in _cached_models:
-        _cached_models[model_name] = genai.GenerativeModel(
-            model_name=model_name,
-            generation_config=GENERATION_CONFIG
-        )
-    return _cached_models[model_name]
 
+def get_model_instance(model_name: str):
+    with _guards_lock:
+        if model_name not in _cached_models:
+            _cached_models[model_name] = _model_factory(model_name)
+        return _cached_models[model_name]
 
+
+def set_rate_limit_share(share: float) -> None:
+    """Limits this process to a share of each model's quota; the key's quota is shared by all runners."""
+    global RATE_LIMIT_SHARE
+    with _guards_lock:
+        RATE_LIMIT_SHARE = share
+        _rate_limiters.clear()
+
+
+def _get_guards(model_name: str) -> tuple[RateLimiter, CircuitBreaker]:
+    with _guards_lock:
+        if model_name not in _rate_limiters:
+            limits = MODEL_LIMITS.get(model_name, DEFAULT_MODEL_LIMITS)
+            _rate_limiters[model_name] = RateLimiter(
+                max(1, int(limits["rpm"] * RATE_LIMIT_SHARE)), max(1, int(limits["tpm"] * RATE_LIMIT_SHARE))
+            )
+            _breakers[model_name] = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN_SECONDS)
+        return _rate_limiters[model_name], _breakers[model_name]
+
+
+@timed("generate_with_fallback")
 def generate_with_fallback(prompt: str):
     last_error = None
+    attempted = False
+    estimated_tokens = len(prompt) // CHARS_PER_TOKEN
+
     for model_name in MODEL_PRIORITY:
-        try:
-            model = get_model_instance(model_name)
-            response = model.generate_content(prompt)
-            if model_name != MODEL_PRIORITY[0]:
-                log_event("curator_model_fallback", {"model_used": model_name})
-            return response
-        except Exception as err:
-            last_error = err
-            log_event("curator_model_error", {"model": model_name, "error": str(err)})
+        limiter, breaker = _get_guards(model_name)
+        if not breaker.allow():
+            continue  # Circuit open: this model keeps failing, don't wait for it again
+        if not limiter.acquire(estimated_tokens, MAX_RATE_WAIT_SECONDS):
+            log_event("curator_model_rate_limited", {"model": model_name})
+            incr("model_rate_limited")
+            breaker.release()
             continue
+
+        attempted = True
+        backoff = QUOTA_BACKOFF_SECONDS
+        for attempt in range(QUOTA_RETRIES + 1):
+            try:
+                model = get_model_instance(model_name)
+                response = model.generate_content(prompt)
+                breaker.record_success()
+                incr("model_calls")
+                if model_name != MODEL_PRIORITY[0]:
+                    log_event("curator_model_fallback", {"model_used": model_name})
+                    incr("model_fallbacks")
+                return response
+            except Exception as err:
+                last_error = err
+                log_event("curator_model_error", {"model": model_name, "error": str(err), "attempt": attempt})
+                incr("model_errors")
+                if is_quota_error(err) and attempt < QUOTA_RETRIES:
+                    time.sleep(backoff)
+                    backoff *= 2
+                    # A retry is another request against the same budget
+                    if limiter.acquire(estimated_tokens, MAX_RATE_WAIT_SECONDS):
+                        continue
+                    log_event("curator_model_rate_limited", {"model": model_name})
+                    incr("model_rate_limited")
+                break
+
+        if breaker.record_failure():
+            print(f"⚡ Circuit open for {model_name}, skipping it for {BREAKER_COOLDOWN_SECONDS}s.")
+            log_event("curator_circuit_open", {"model": model_name})
+            incr("model_circuit_opened")
+
+    if not attempted:
+        raise ModelsUnavailableError("All Gemini models are cooling down or rate limited.")
     raise RuntimeError(f"All Gemini models failed. Last error: {last_error}")
 
-def analyze_news_batch(articles):
+# Model fields we keep per verdict (cache) and copy onto approved articles
+VERDICT_FIELDS = ("category", "summary", "teaser", "tone", "hero_candidate", "hero_score")
+
+
+def build_enriched_article(original_article: dict, item: dict) -> dict:
+    """Merges a model verdict (fresh or cached) into the original article."""
+    teaser_text = item.get('teaser', '')
+    if not teaser_text:
+        teaser_text = item.get('summary', '')[:80]
+        print(f"⚠️ Missing teaser for '{original_article['title']}'. Fallback to summary snippet.")
+
+    return {
+        "title": original_article['title'],
+        "link": original_article['link'],
+        "source": original_article['source'],
+        "published_at": original_article['published_at'],
+        "image_url": original_article.get('image_url'),
+        # AI Fields
+        "summary": item['summary'],
+        "teaser": teaser_text,
+        "category": item['category'],
+        "tone": item.get('tone', ''),
+        "hero_candidate": bool(item.get('hero_candidate', False)),
+        "hero_score": int(item.get('hero_score', 0) or 0)
+    }
+
+def reconstruct_results(articles: list[dict], accepted_items: list, rejected_items: list,
+                        verbose: bool = True) -> tuple[list[dict], list[int], dict[int, dict]]:
     """
-    Takes a list of raw articles: [{'title': '...', 'source': '...', 'link': '...'}]
-    Returns: A list of ONLY the approved articles with 'category' and 'summary'.
+    Maps the model's per-batch ids back onto the input articles.
+    Returns (approved enriched articles, rejected indexes, verdict per index).
     """
-    
-    if not articles:
-        return []
+    verdicts: dict[int, dict] = {}
+    rejected_indexes = []
 
-    print(f"🧠 Brain: Analyzing {len(articles)} headlines...")
+    # Log rejected items with reasons
+    for item in rejected_items:
+        idx = item.get('id')
+        reason = item.get('reason', 'No reason provided')
+        known = idx is not None and idx < len(articles)
+        if verbose:
+            title = articles[idx]['title'] if known else "Unknown"
+            print(f"🚫 Rejected: {title} — {reason}")
+        if known:
+            rejected_indexes.append(idx)
+            verdicts[idx] = {"accepted": False, "reason": reason}
 
-    # 1. Prepare payload (Title + Source is usually enough for a vibe check)
-    payload = []
-    for i, article in enumerate(articles):
-        payload.append({
-            "id": i,
-            "title": article['title'],
-            "source": article['source'],
-            "summary": article.get('summary_text', '')
-        })
+    approved = []
+    for item in accepted_items:
+        original_index = item['id']
+        
+        # Grab original data
+        original_article = articles[original_index]
+        approved.append(build_enriched_article(original_article, item))
+        verdicts[original_index] = {
+            "accepted": True,
+            **{field: item.get(field) for field in VERDICT_FIELDS},
+        }
 
-    log_event("curator_input", {"count": len(payload), "articles": payload})
+    return approved, rejected_indexes, verdicts
 
-    # 2. The Prompt
-    prompt = f"""
+def build_prompt(payload: list[dict]) -> str:
+    """The full-format curator prompt."""
+    return f"""
         You are the "Vibe Editor" for a modern Macedonian news aggregator.
 
         Each input item includes:
@@ -134,6 +293,98 @@ def analyze_news_batch(articles):
         {json.dumps(payload, ensure_ascii=False)}
         """
 
+
+def report_wire_savings(batch_id: str, full_payload: list[dict], prompt: str, raw_text: str,
+                        accepted_items: list, rejected_items: list) -> None:
+    """Estimated tokens the compact protocol saved on one batch, against the full format."""
+    full_prompt_tokens = estimate_tokens(build_prompt(full_payload))
+    full_response_tokens = full_response_chars(accepted_items, rejected_items) // CHARS_PER_TOKEN
+    prompt_tokens = estimate_tokens(prompt)
+    response_tokens = estimate_tokens(raw_text)
+    saved = (full_prompt_tokens - prompt_tokens) + (full_response_tokens - response_tokens)
+    full_total = full_prompt_tokens + full_response_tokens
+
+    print(f"🗜️ Compact wire: ~{prompt_tokens}+{response_tokens} tokens instead of "
+          f"~{full_prompt_tokens}+{full_response_tokens} ({saved / max(full_total, 1):.0%} saved).")
+    incr("curator_tokens_saved", saved)
+    log_event("curator_wire_savings", {
+        "batch_id": batch_id,
+        "prompt_tokens": prompt_tokens,
+        "full_prompt_tokens": full_prompt_tokens,
+        "response_tokens": response_tokens,
+        "full_response_tokens": full_response_tokens,
+    })
+
+def analyze_news_batch(articles, rejected_links: list | None = None, raise_on_error: bool = False):
+    """
+    Takes a list of raw articles: [{'title': '...', 'source': '...', 'link': '...'}]
+    Returns: A list of ONLY the approved articles with 'category' and 'summary'.
+    If rejected_links is given, links the model explicitly rejected are appended to it.
+    With raise_on_error, a failed call raises instead of returning the cached subset.
+    """
+    
+    if not articles:
+        return []
+
+    # 0. Serve known articles from the verdict cache, only send the misses
+    keys = [article_key(article) for article in articles]
+    cached_verdicts = get_verdicts(keys)
+    final_articles = []
+    pending_articles = []
+    pending_keys = []
+    for article, key in zip(articles, keys):
+        verdict = cached_verdicts.get(key)
+        if verdict is None:
+            pending_articles.append(article)
+            pending_keys.append(key)
+        elif verdict.get("accepted"):
+            final_articles.append(build_enriched_article(article, verdict))
+        elif rejected_links is not None:
+            rejected_links.append(article.get('link'))
+
+    cache_hits = len(articles) - len(pending_articles)
+    incr("curator_cache_hits", cache_hits)
+    incr("curator_cache_misses", len(pending_articles))
+    if cache_hits:
+        print(f"♻️ Brain: {cache_hits} verdicts served from cache.")
+        log_event("curator_cache", {"hits": cache_hits, "misses": len(pending_articles)})
+    if not pending_articles:
+        return final_articles
+
+    total_count = len(articles)
+    articles = pending_articles
+
+    print(f"🧠 Brain: Analyzing {len(articles)} headlines...")
+
+    # 1. Prepare payload (Title + Source is usually enough for a vibe check)
+    compact = compact_enabled()
+    full_payload = []
+    for i, article in enumerate(articles):
+        full_payload.append({
+            "id": i,
+            "title": article['title'],
+            "source": article['source'],
+            "summary": article.get('summary_text', '')
+        })
+    # The compact protocol only sends the start of each summary
+    payload = [{**item, "summary": trim_summary(item['summary'])} for item in full_payload] if compact else full_payload
+
+    # The originals and batch id let replay.py rebuild results from the log alone
+    batch_id = uuid.uuid4().hex[:12]
+    log_event("curator_input", {
+        "batch_id": batch_id,
+        "wire": "compact" if compact else "full",
+        "count": len(payload),
+        "articles": payload,
+        "originals": [
+            {"link": a.get('link'), "published_at": a.get('published_at'), "image_url": a.get('image_url')}
+            for a in articles
+        ],
+    })
+
+    # 2. The Prompt (compact protocol if enabled, see curator_wire.py)
+    prompt = build_compact_prompt(payload) if compact else build_prompt(payload)
+
     try:
         # 3. Call the Model with fallback logic
         response = generate_with_fallback(prompt)
@@ -145,67 +396,113 @@ def analyze_news_batch(articles):
         except json.JSONDecodeError as parse_err:
             print("🔥 Brain JSON Error:", parse_err)
             print("📝 Model raw response:\n", raw_text)
-            log_event("curator_parse_error", {"error": str(parse_err), "raw": raw_text})
-            return []
-        accepted_items = result_payload.get("accepted", []) if isinstance(result_payload, dict) else result_payload
-        rejected_items = result_payload.get("rejected", []) if isinstance(result_payload, dict) else []
+            log_event("curator_parse_error", {"batch_id": batch_id, "error": str(parse_err), "raw": raw_text})
+            if raise_on_error:
+                raise
+            return final_articles
+        if compact:
+            # Strict: ids must belong to this batch, each answered once, with valid fields
+            accepted_items, rejected_items, invalid = parse_compact_response(result_payload, len(articles))
+            if invalid:
+                print(f"⚠️ Brain: ignored {invalid} invalid items in the compact reply.")
+                incr("curator_invalid_items", invalid)
+            report_wire_savings(batch_id, full_payload, prompt, raw_text, accepted_items, rejected_items)
+        else:
+            accepted_items = result_payload.get("accepted", []) if isinstance(result_payload, dict) else result_payload
+            rejected_items = result_payload.get("rejected", []) if isinstance(result_payload, dict) else []
 
         log_event("curator_output_raw", {
+            "batch_id": batch_id,
             "accepted": accepted_items,
             "rejected": rejected_items,
         })
 
-        # Log rejected items with reasons
-        for item in rejected_items:
-            idx = item.get('id')
-            reason = item.get('reason', 'No reason provided')
-            title = articles[idx]['title'] if idx is not None and idx < len(articles) else "Unknown"
-            print(f"🚫 Rejected: {title} — {reason}")
-        
         # 5. Reconstruct the final list
-        final_articles = []
-        for item in accepted_items:
-            original_index = item['id']
-            
-            # Grab original data
-            original_article = articles[original_index]
-
-            teaser_text = item.get('teaser', '')
-            if not teaser_text:
-                teaser_text = item.get('summary', '')[:80]
-                print(f"⚠️ Missing teaser for '{original_article['title']}'. Fallback to summary snippet.")
-            
-            # Create enriched object
-            enriched_article = {
-                "title": original_article['title'],
-                "link": original_article['link'],
-                "source": original_article['source'],
-                "published_at": original_article['published_at'],
-                "image_url": original_article.get('image_url'),
-                # AI Fields
-                "summary": item['summary'],
-                "teaser": teaser_text,
-                "category": item['category'],
-                "tone": item.get('tone', ''),
-                "hero_candidate": bool(item.get('hero_candidate', False)),
-                "hero_score": int(item.get('hero_score', 0) or 0)
-            }
-            
-            final_articles.append(enriched_article)
-
-        for article in final_articles:
+        approved_now, rejected_indexes, verdicts = reconstruct_results(articles, accepted_items, rejected_items)
+        if rejected_links is not None:
+            rejected_links.extend(articles[idx].get('link') for idx in rejected_indexes)
+        new_verdicts = {pending_keys[idx]: verdict for idx, verdict in verdicts.items()}
+
+        put_verdicts(new_verdicts)
+
+        for article in approved_now:
             hero_flag = " ⭐" if article.get("hero_candidate") else ""
             print(f"✅ Approved: {article['title']} — {article['teaser']}{hero_flag}")
 
         log_event("curator_output_final", {
-            "approved": final_articles,
+            "batch_id": batch_id,
+            "approved": approved_now,
             "rejected_count": len(rejected_items),
         })
 
-        print(f"✨ Vibe Check Complete: Approved {len(final_articles)} out of {len(articles)} articles.")
+        final_articles.extend(approved_now)
+        print(f"✨ Vibe Check Complete: Approved {len(final_articles)} out of {total_count} articles.")
         return final_articles
 
     except Exception as e:
         print(f"🔥 Brain Error: {e}")
-        log_event("curator_exception", {"error": str(e)})
-        return []
\ No newline at end of file
+        log_event("curator_exception", {"batch_id": batch_id, "error": str(e)})
+        if raise_on_error:
+            raise
+        return final_articles
+
+
+def estimate_article_chars(article: dict) -> int:
+    summary = article.get('summary_text') or ''
+    return (
+        len(article.get('title') or '')
+        + len(article.get('source') or '')
+        + len(trim_summary(summary) if compact_enabled() else summary)
+        + ARTICLE_OVERHEAD_CHARS
+    )
+
+
+def pack_batches(articles: list[dict], char_budget: int = BATCH_CHAR_BUDGET,
+                 max_articles: int = BATCH_MAX_ARTICLES) -> list[list[dict]]:
+    """Greedily packs articles, in order, into batches that fit the budget."""
+    batches = []
+    current = []
+    current_chars = 0
+    for article in articles:
+        size = estimate_article_chars(article)
+        if current and (current_chars + size > char_budget or len(current) >= max_articles):
+            batches.append(current)
+            current = []
+            current_chars = 0
+        current.append(article)
+        current_chars += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def analyze_with_split(batch: list[dict], rejected_links: list | None = None) -> list[dict]:
+    """Curates one batch; if the call fails, halves it and retries each half."""
+    pending = [batch]
+    approved = []
+    while pending:
+        current = pending.pop()
+        try:
+            approved.extend(analyze_news_batch(current, rejected_links, raise_on_error=True))
+        except ModelsUnavailableError as e:
+            # Splitting won't help; these articles are picked up again next run
+            print(f"⏳ Brain: no model available, deferring {len(current)} articles.")
+            log_event("curator_batch_deferred", {"size": len(current), "error": str(e)})
+        except Exception as e:
+            if len(current) == 1:
+                print(f"🔥 Brain: giving up on '{current[0]['title']}'")
+                log_event("curator_batch_dropped", {"link": current[0].get('link'), "error": str(e)})
+                continue
+            middle = len(current) // 2
+            print(f"✂️ Brain: splitting failed batch of {len(current)} and retrying.")
+            log_event("curator_batch_split", {"size": len(current), "error": str(e)})
+            pending.extend([current[middle:], current[:middle]])
+    return approved
+
+
+def analyze_in_batches(articles: list[dict], rejected_links: list | None = None) -> list[dict]:
+    """Curates any number of articles with as few model calls as the budget allows."""
+    batches = pack_batches(articles)
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_CALLS) as pool:
+        results = pool.map(lambda batch: analyze_with_split(batch, rejected_links), batches)
+        return [art for approved in results for art in approved]
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from local_state import CACHE_DIR
+
+# Persistent cache of curator verdicts keyed by a hash of what Gemini sees
+# (title + source + summary), so reruns don't pay for the same article twice.
+
+CACHE_FILE = CACHE_DIR / "curator_cache.db"
+
+CACHE_TTL_SECONDS = 14 * 24 * 3600
+CACHE_MAX_ENTRIES = 5000
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()
+_read_only = False
+
+
+def set_read_only(read_only: bool) -> None:
+    """Serve cached verdicts but store nothing (dry runs)."""
+    global _read_only
+    _read_only = read_only
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(CACHE_FILE, check_same_thread=False)
+        _conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS verdicts (
+                key TEXT PRIMARY KEY,
+                verdict TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_last_used ON verdicts(last_used)")
+    return _conn
+
+
+def article_key(article: dict) -> str:
+    parts = [article.get('title') or '', article.get('source') or '', article.get('summary_text') or '']
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def get_verdicts(keys: list[str]) -> dict[str, dict]:
+    """Returns the fresh cached verdicts for the given keys and bumps their last use."""
+    if not keys or (_read_only and not CACHE_FILE.exists()):
+        return {}
+    try:
+        with _lock:
+            conn = _get_conn()
+            now = time.time()
+            found = {}
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, verdict FROM verdicts WHERE key IN ({placeholders}) AND created_at >= ?",
+                    [*chunk, now - CACHE_TTL_SECONDS],
+                ).fetchall()
+                for key, verdict in rows:
+                    found[key] = json.loads(verdict)
+            if not _read_only:
+                conn.executemany("UPDATE verdicts SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                conn.commit()
+            return found
+    except Exception as e:
+        print(f"⚠️ Curator cache read failed: {e}")
+        return {}
+
+
+def put_verdicts(verdicts: dict[str, dict]) -> None:
+    """Stores verdicts, then trims expired and least recently used entries."""
+    if not verdicts or _read_only:
+        return
+    try:
+        with _lock:
+            conn = _get_conn()
+            now = time.time()
+            conn.executemany(
+                "INSERT OR REPLACE INTO verdicts (key, verdict, created_at, last_used) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(verdict, ensure_ascii=False), now, now) for key, verdict in verdicts.items()],
+            )
+            conn.execute("DELETE FROM verdicts WHERE created_at < ?", [now - CACHE_TTL_SECONDS])
+            conn.execute(
+                """
+                DELETE FROM verdicts WHERE key IN (
+                    SELECT key FROM verdicts ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                [CACHE_MAX_ENTRIES],
+            )
+            conn.commit()
+    except Exception as e:
+        print(f"⚠️ Curator cache write failed: {e}")
@@ -0,0 +1,132 @@
+import json
+import os
+
+# Compact curator protocol (CURATOR_WIRE_FORMAT=compact). Same rules as the
+# full prompt in fewer words, one-letter keys, summaries trimmed to a token
+# budget, and a response where rejected stories are bare ids:
+#
+#   in:  [{"i": 0, "t": title, "s": source, "d": summary}, ...]
+#   out: {"a": [{"i": 0, "c": "T", "s": summary, "t": teaser, "o": "+", "x": 9}],
+#         "r": [1, 2], "h": 0}
+#
+# parse_compact_response() validates the reply against the batch and turns it
+# back into full-format items, so everything downstream (verdict cache,
+# enriched articles, logs, replay) is the same for both protocols.
+
+WIRE_FORMAT_ENV = "CURATOR_WIRE_FORMAT"             # "full" (default) or "compact"
+SUMMARY_TOKENS_ENV = "CURATOR_SUMMARY_TOKENS"
+SUMMARY_TOKEN_BUDGET = int(os.getenv(SUMMARY_TOKENS_ENV) or 60)
+CHARS_PER_TOKEN = 3                                 # Rough estimate for mixed Cyrillic/JSON prompts
+
+CATEGORY_CODES = {"T": "Tech", "C": "Culture", "L": "Lifestyle", "B": "Business", "S": "Sports"}
+TONE_CODES = {"+": "positive", "0": "neutral", "-": "negative"}
+MAX_HERO_SCORE = 10
+
+
+class CompactResponseError(ValueError):
+    """The reply isn't a compact-protocol object at all (as opposed to a few bad items)."""
+
+
+def compact_enabled() -> bool:
+    return (os.getenv(WIRE_FORMAT_ENV) or "full").lower() == "compact"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def trim_summary(text: str, token_budget: int = SUMMARY_TOKEN_BUDGET) -> str:
+    """Cuts the summary to about `token_budget` tokens, on a word boundary."""
+    text = (text or "").strip()
+    max_chars = token_budget * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return (cut or text[:max_chars]).rstrip(" ,.;:") + "…"
+
+
+def build_compact_prompt(payload: list[dict]) -> str:
+    """The curator prompt for a full-format payload ({"id", "title", "source", "summary"} per item)."""
+    items = []
+    for item in payload:
+        compact = {"i": item["id"], "t": item["title"], "s": item["source"]}
+        if item.get("summary"):
+            compact["d"] = item["summary"]
+        items.append(compact)
+
+    return f"""Vibe Editor of a Macedonian good-news aggregator. Items: i=id, t=title, s=source, d=snippet.
+KEEP elegant, curious, good-vibe stories: tech, science, art, design, culture, lifestyle, travel, food, wellness, inspiring business, human stories, Macedonian achievements.
+REJECT politics (parties, ministers, parliament, mayors, tenders), crime, courts, corruption, accidents, fires, disasters, weather/utility alerts, strikes, tragedies, gossip, astrology, match recaps, bureaucratic notices, breaking/urgent tone, anything that fits no category.
+c = T Tech (AI, software, gadgets, startups, science) | C Culture (art, film, books, music, design, history) | L Lifestyle (wellness, travel, food, fashion, education, youth) | B Business (entrepreneurs, funding, careers, markets) | S Sports (prefer Macedonian).
+For each kept item: s = one elegant Macedonian sentence <= 25 words on why it matters; t = 6-10 word hook, no final punctuation; o = tone "+", "0" or "-" (reject most "-").
+h = id of the single most irresistible kept story, or null; only that item gets x = hero strength 0-10 (8-10 for true standouts).
+Reply with strict JSON only: {{"a":[{{"i":0,"c":"T","s":"...","t":"...","o":"+","x":9}}],"r":[1],"h":0}} where r lists every rejected id.
+INPUT DATA:
+{json.dumps(items, ensure_ascii=False, separators=(",", ":"))}"""
+
+
+def _decode(value, codes: dict[str, str]) -> str | None:
+    """A code ("T") or, if the model wrote it out, the full value ("Tech")."""
+    if not isinstance(value, str):
+        return None
+    return codes.get(value) or (value if value in codes.values() else None)
+
+
+def parse_compact_response(data, count: int) -> tuple[list[dict], list[dict], int]:
+    """
+    Validates a compact reply for a batch of `count` items and returns
+    (accepted, rejected, invalid item count) in the full format's shape.
+    Items with an unknown or repeated id, or a bad field, are dropped (their
+    articles simply stay unanswered); a reply of the wrong shape raises.
+    """
+    if not isinstance(data, dict):
+        raise CompactResponseError(f"expected an object, got {type(data).__name__}")
+    accepted_raw = data.get("a") or []
+    rejected_raw = data.get("r") or []
+    hero_id = data.get("h")
+    if not isinstance(accepted_raw, list) or not isinstance(rejected_raw, list):
+        raise CompactResponseError('"a" and "r" must be lists')
+
+    seen: set[int] = set()
+    invalid = 0
+
+    def claim(idx) -> bool:
+        nonlocal invalid
+        if isinstance(idx, bool) or not isinstance(idx, int) or not 0 <= idx < count or idx in seen:
+            invalid += 1
+            return False
+        seen.add(idx)
+        return True
+
+    accepted = []
+    for item in accepted_raw:
+        if not isinstance(item, dict):
+            invalid += 1
+            continue
+        category = _decode(item.get("c"), CATEGORY_CODES)
+        summary = item.get("s")
+        if not category or not isinstance(summary, str) or not summary.strip():
+            invalid += 1
+            continue
+        if not claim(item.get("i")):
+            continue
+        score = item.get("x", 0)
+        score = min(MAX_HERO_SCORE, max(0, score)) if isinstance(score, int) and not isinstance(score, bool) else 0
+        accepted.append({
+            "id": item["i"],
+            "category": category,
+            "summary": summary.strip(),
+            "teaser": item.get("t") if isinstance(item.get("t"), str) else "",
+            "tone": _decode(item.get("o"), TONE_CODES) or "neutral",
+            "hero_candidate": item["i"] == hero_id,
+            "hero_score": score,
+        })
+
+    rejected = [{"id": idx} for idx in rejected_raw if claim(idx)]
+    return accepted, rejected, invalid
+
+
+def full_response_chars(accepted: list[dict], rejected: list[dict]) -> int:
+    """Size the same verdicts would have had in the full format (a lower bound: rejections get no reason)."""
+    full = {"accepted": accepted, "rejected": [{"id": item["id"], "reason": ""} for item in rejected]}
+    return len(json.dumps(full, ensure_ascii=False))
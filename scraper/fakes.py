@@ -0,0 +1,84 @@
+import json
+import random
+import threading
+import time
+
+# Local stand-ins for external services, used to exercise the pipeline
+# without network access or API quota:
+#   import curator, fakes
+#   curator.set_model_factory(lambda name: fakes.FakeGeminiModel(name, latency=0.5, failure_rate=0.2))
+
+CATEGORIES = ["Tech", "Culture", "Lifestyle", "Business", "Sports"]
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """
+    Mimics genai.GenerativeModel.generate_content for the curator prompt
+    (full or compact wire format, answered in kind).
+    Accepts roughly `accept_ratio` of the input, sleeps `latency` seconds per call
+    and raises with the given probabilities (quota errors look like HTTP 429).
+    """
+
+    def __init__(self, model_name: str = "fake", latency: float = 0.0, failure_rate: float = 0.0,
+                 quota_failure_rate: float = 0.0, accept_ratio: float = 0.5, seed: int | None = None):
+        self.model_name = model_name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.quota_failure_rate = quota_failure_rate
+        self.accept_ratio = accept_ratio
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str) -> FakeResponse:
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+        if self.latency:
+            time.sleep(self.latency)
+        if roll < self.quota_failure_rate:
+            raise RuntimeError(f"429 Resource has been exhausted (fake quota on {self.model_name})")
+        if roll < self.quota_failure_rate + self.failure_rate:
+            raise RuntimeError(f"500 Internal error (fake failure on {self.model_name})")
+
+        payload = json.loads(prompt[prompt.rindex("INPUT DATA:") + len("INPUT DATA:"):].strip())
+        if payload and "i" in payload[0]:
+            return self._compact_response(payload)
+        accepted, rejected = [], []
+        for item in payload:
+            # Deterministic per title so reruns produce the same verdicts
+            bucket = sum(map(ord, item["title"])) % 100
+            if bucket < self.accept_ratio * 100:
+                accepted.append({
+                    "id": item["id"],
+                    "category": CATEGORIES[bucket % len(CATEGORIES)],
+                    "summary": f"Резиме: {item['title']}",
+                    "teaser": item["title"][:40],
+                    "tone": "positive",
+                    "hero_candidate": bucket % 7 == 0,
+                    "hero_score": bucket % 11,
+                })
+            else:
+                rejected.append({"id": item["id"], "reason": "Fake rejection"})
+        return FakeResponse(json.dumps({"accepted": accepted, "rejected": rejected}, ensure_ascii=False))
+
+    def _compact_response(self, payload: list[dict]) -> FakeResponse:
+        accepted, rejected, hero = [], [], None
+        for item in payload:
+            bucket = sum(map(ord, item["t"])) % 100
+            if bucket < self.accept_ratio * 100:
+                verdict = {"i": item["i"], "c": CATEGORIES[bucket % len(CATEGORIES)][0],
+                           "s": f"Резиме: {item['t']}", "t": item["t"][:40], "o": "+"}
+                if hero is None and bucket % 7 == 0:
+                    hero = item["i"]
+                    verdict["x"] = bucket % 11
+                accepted.append(verdict)
+            else:
+                rejected.append(item["i"])
+        return FakeResponse(json.dumps({"a": accepted, "r": rejected, "h": hero}, ensure_ascii=False,
+                                       separators=(",", ":")))
@@ -0,0 +1,71 @@
+import hashlib
+from datetime import datetime, timezone
+
+# Per-feed HTTP validators (ETag / Last-Modified) plus a hash of the last
+# body we processed, so unchanged feeds can be skipped on the next run.
+
+def ensure_feed_state_table(client) -> None:
+    """Creates the feed_state table if it doesn't exist yet."""
+    client.execute(
+        """
+        CREATE TABLE IF NOT EXISTS feed_state (
+            feed_url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            body_hash TEXT,
+            checked_at TEXT
+        )
+        """
+    )
+
+
+def load_feed_states(client) -> dict[str, dict]:
+    """Loads every stored feed record in one query, keyed by feed URL."""
+    try:
+        rs = client.execute("SELECT feed_url, etag, last_modified, body_hash FROM feed_state")
+    except Exception as e:
+        print(f"⚠️ Failed to load feed state: {e}")
+        return {}
+
+    states = {}
+    for row in rs.rows:
+        states[row[0]] = {
+            "etag": row[1],
+            "last_modified": row[2],
+            "body_hash": row[3],
+        }
+    return states
+
+
+def conditional_headers(state: dict | None) -> dict:
+    """Builds If-None-Match / If-Modified-Since headers from a stored record."""
+    headers = {}
+    if not state:
+        return headers
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    return headers
+
+
+def hash_body(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def feed_state_statement(feed_url: str, etag: str | None, last_modified: str | None, body_hash: str):
+    """Stores the validators of a feed once its body has been fully processed (queued with the run's writes)."""
+    import libsql_client
+
+    return libsql_client.Statement(
+        """
+        INSERT INTO feed_state (feed_url, etag, last_modified, body_hash, checked_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(feed_url) DO UPDATE SET
+            etag = excluded.etag,
+            last_modified = excluded.last_modified,
+            body_hash = excluded.body_hash,
+            checked_at = excluded.checked_at
+        """,
+        [feed_url, etag, last_modified, body_hash, datetime.now(timezone.utc).isoformat()],
+    )
@@ -0,0 +1,66 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics import incr
+
+# CPU side of the fetch stage: every entry's summary HTML is parsed once, and
+# that one tree gives both the plain-text summary and the first inline image.
+# Small batches are parsed in-process; once a batch carries more than
+# POOL_MIN_BATCH_CHARS of HTML it goes to a process pool so parsing spreads
+# across cores instead of competing with the fetch threads for the GIL.
+
+SUMMARY_CHARS = 500
+POOL_MIN_BATCH_CHARS = 32 * 1024   # Below this, pickling costs more than it saves
+POOL_WORKERS = min(4, os.cpu_count() or 1)
+POOL_CHUNK_SIZE = 16
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def parse_summary_html(html: str) -> tuple[str, str | None]:
+    """Returns (first SUMMARY_CHARS of text, src of the first <img>) from one parse."""
+    if not html:
+        return "", None
+    if "<" not in html and "&" not in html:
+        return html.strip()[:SUMMARY_CHARS], None  # Plain text, nothing to parse
+
+    from bs4 import BeautifulSoup  # Imported on first use, like every heavy dependency
+    soup = BeautifulSoup(html, "html.parser")
+    img = soup.find("img") if "<img" in html else None
+    return soup.get_text(separator=" ", strip=True)[:SUMMARY_CHARS], (img.get("src") or None) if img else None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs fetch threads can inherit held locks
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def parse_summaries(htmls: list[str]) -> list[tuple[str, str | None]]:
+    """parse_summary_html for a batch, on the process pool when the batch is big enough."""
+    if POOL_WORKERS > 1 and sum(len(html) for html in htmls) >= POOL_MIN_BATCH_CHARS:
+        try:
+            results = list(_get_pool().map(parse_summary_html, htmls, chunksize=POOL_CHUNK_SIZE))
+            incr("html_pool_batches")
+            return results
+        except Exception as e:
+            print(f"⚠️ HTML pool failed, parsing in-process: {e}")
+    return [parse_summary_html(html) for html in htmls]
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+atexit.register(shutdown_pool)
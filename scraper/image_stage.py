@@ -0,0 +1,337 @@
+import base64
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from images import get_session, host_slot
+from local_state import CACHE_DIR, write_atomic
+from metrics import incr, timed
+
+# Optional image stage (SCRAPER_OPTIMIZE_IMAGES=1, needs Pillow). After
+# curation, every accepted article's image is downloaded once and turned into
+# a few fixed-width WebP (and AVIF, where Pillow supports it) derivatives plus
+# a tiny blurred WebP placeholder inlined as a data URI. Files are named after
+# a hash of the original bytes, so an image shared by several articles, or
+# served from several URLs, is processed once. The result is stored per link
+# in post_images (the original posts.image_url stays as the fallback).
+# Derivatives are uploaded to a public Supabase Storage bucket (SUPABASE_URL,
+# SUPABASE_KEY) and recorded by URL. For local work, SCRAPER_IMAGE_DIR writes
+# them to a directory instead and records paths relative to it.
+
+OPTIMIZE_ENV = "SCRAPER_OPTIMIZE_IMAGES"
+CACHE_FILE = CACHE_DIR / "image_variants.db"
+IMAGE_DIR = Path(os.getenv("SCRAPER_IMAGE_DIR")) if os.getenv("SCRAPER_IMAGE_DIR") else None
+IMAGE_BUCKET = os.getenv("SCRAPER_IMAGE_BUCKET") or "post-images"
+
+WIDTHS = (320, 640, 1280)
+FORMAT_QUALITY = {"webp": 78, "avif": 55}
+PLACEHOLDER_WIDTH = 16
+IMAGE_WORKERS = 4                  # Downloads + encodes in flight at once
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+DOWNLOAD_TIMEOUT_SECONDS = 15
+DIGEST_CHARS = 20
+REMOVE_BATCH_SIZE = 1000           # Storage deletes at most this many objects per request
+CACHE_TTL_SECONDS = 30 * 24 * 3600  # Well under the posts' retention, so a cleaned-up digest is never served from here
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()
+_bucket = None
+_warned = False
+
+
+def _storage_configured() -> bool:
+    return bool(os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY")) or IMAGE_DIR is not None
+
+
+def image_stage_enabled() -> bool:
+    """True if the stage is switched on, Pillow is installed and there is somewhere to put the files (warns once otherwise)."""
+    global _warned
+    if not os.getenv(OPTIMIZE_ENV):
+        return False
+    problem = None
+    if importlib.util.find_spec("PIL") is None:
+        problem = "Pillow isn't installed"
+    elif not _storage_configured():
+        problem = "neither SUPABASE_URL/SUPABASE_KEY nor SCRAPER_IMAGE_DIR is set"
+    if problem:
+        if not _warned:
+            print(f"⚠️ {OPTIMIZE_ENV} is set but {problem}, keeping the original images.")
+            _warned = True
+        return False
+    return True
+
+
+# ---- Storage ----
+
+def _storage_bucket():
+    """The Supabase Storage bucket for derivatives, or None when they go to IMAGE_DIR."""
+    global _bucket
+    if IMAGE_DIR is not None:
+        return None
+    with _lock:
+        if _bucket is None:
+            from supabase import create_client
+            _bucket = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"]).storage.from_(IMAGE_BUCKET)
+        return _bucket
+
+
+def _public_base() -> str:
+    return f"{os.getenv('SUPABASE_URL', '').rstrip('/')}/storage/v1/object/public/{IMAGE_BUCKET}/"
+
+
+def _store(path: str, data: bytes, fmt: str) -> str:
+    """Saves one derivative and returns the URL (or IMAGE_DIR-relative path) to record."""
+    bucket = _storage_bucket()
+    if bucket is None:
+        write_atomic(IMAGE_DIR / path, data)
+        return path
+    bucket.upload(path, data, file_options={
+        "content-type": f"image/{fmt}",
+        "cache-control": "31536000",  # Names are content hashes, so files never change
+        "upsert": "true",
+    })
+    return _public_base() + path
+
+
+def _storage_path(location: str) -> str:
+    """Inverse of _store: the path inside the bucket (or IMAGE_DIR) of a recorded variant."""
+    return location.removeprefix(_public_base())
+
+
+def _remove(paths: list[str]) -> None:
+    bucket = _storage_bucket()
+    if bucket is None:
+        for path in paths:
+            (IMAGE_DIR / path).unlink(missing_ok=True)
+        return
+    for start in range(0, len(paths), REMOVE_BATCH_SIZE):
+        bucket.remove(paths[start:start + REMOVE_BATCH_SIZE])
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(CACHE_FILE, check_same_thread=False)
+        _conn.execute("CREATE TABLE IF NOT EXISTS sources (image_url TEXT PRIMARY KEY, digest TEXT NOT NULL)")
+        _conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS derivatives (
+                digest TEXT PRIMARY KEY,
+                record TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+    return _conn
+
+
+def _cached_record(image_url: str) -> dict | None:
+    with _lock:
+        row = _get_conn().execute(
+            "SELECT d.record FROM sources s JOIN derivatives d ON d.digest = s.digest "
+            "WHERE s.image_url = ? AND d.created_at >= ?",
+            [image_url, time.time() - CACHE_TTL_SECONDS],
+        ).fetchone()
+    if not row:
+        return None
+    record = json.loads(row[0])
+    # The cache may outlive a local media directory
+    if IMAGE_DIR is not None and not all(
+        (IMAGE_DIR / path).exists() for variants in record["variants"].values() for path in variants.values()
+    ):
+        return None
+    return record
+
+
+def _remember(image_url: str, record: dict) -> None:
+    with _lock:
+        conn = _get_conn()
+        conn.execute("INSERT OR REPLACE INTO sources (image_url, digest) VALUES (?, ?)", [image_url, record["digest"]])
+        conn.execute(
+            "INSERT OR REPLACE INTO derivatives (digest, record, created_at) VALUES (?, ?, ?)",
+            [record["digest"], json.dumps(record), time.time()],
+        )
+        conn.commit()
+
+
+def _supported_formats() -> list[str]:
+    from PIL import features
+
+    return [fmt for fmt in FORMAT_QUALITY if features.check(fmt)]
+
+
+def _download(image_url: str) -> bytes | None:
+    # Images usually come from the outlets' own hosts, so they share the feeds' per-host limit
+    with host_slot(image_url):
+        try:
+            resp = get_session().get(image_url, timeout=DOWNLOAD_TIMEOUT_SECONDS, stream=True)
+        except Exception:
+            return None
+        try:
+            if resp.status_code != 200 or not resp.headers.get("Content-Type", "image/").startswith("image/"):
+                return None
+            data = bytearray()
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                data.extend(chunk)
+                if len(data) > MAX_IMAGE_BYTES:
+                    return None
+            incr("image_bytes_downloaded", len(data))
+            return bytes(data)
+        except Exception:
+            return None
+        finally:
+            resp.close()
+
+
+def build_derivatives(data: bytes) -> dict:
+    """Stores the derivatives of one original and returns its record (see _store for what the variants hold)."""
+    from PIL import Image, ImageFilter, ImageOps
+
+    digest = hashlib.sha256(data).hexdigest()[:DIGEST_CHARS]
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    # Never upscale; an image narrower than every width gets one derivative at its own width
+    widths = [width for width in WIDTHS if width < image.width] + [min(image.width, WIDTHS[-1])]
+    variants: dict[str, dict[str, str]] = {}
+    for fmt in _supported_formats():
+        for width in sorted(set(widths)):
+            height = max(1, round(image.height * width / image.width))
+            buffer = io.BytesIO()
+            image.resize((width, height), Image.LANCZOS).save(buffer, fmt.upper(), quality=FORMAT_QUALITY[fmt])
+            location = _store(f"{digest[:2]}/{digest}-{width}.{fmt}", buffer.getvalue(), fmt)
+            incr("image_derivatives_written")
+            variants.setdefault(fmt, {})[str(width)] = location
+
+    placeholder_height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    tiny = image.resize((PLACEHOLDER_WIDTH, placeholder_height), Image.BILINEAR).filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    tiny.save(buffer, "WEBP", quality=30)
+    return {
+        "digest": digest,
+        "width": image.width,
+        "height": image.height,
+        "variants": variants,
+        "placeholder": "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii"),
+    }
+
+
+def _process(image_url: str) -> dict | None:
+    record = _cached_record(image_url)
+    if record:
+        incr("image_variants_cached")
+        return record
+    data = _download(image_url)
+    if not data:
+        incr("image_download_failures")
+        return None
+    try:
+        record = build_derivatives(data)
+    except Exception as e:
+        print(f"⚠️ Couldn't process image {image_url}: {e}")
+        incr("image_process_failures")
+        return None
+    _remember(image_url, record)
+    incr("images_optimized")
+    return record
+
+
+@timed("optimize_images")
+def optimize_images(articles: list[dict]) -> dict[str, dict]:
+    """{link: record} for the articles whose image could be processed. Each distinct URL is fetched once."""
+    links_by_url: dict[str, list[str]] = {}
+    for art in articles:
+        if art.get("image_url") and art.get("link"):
+            links_by_url.setdefault(art["image_url"], []).append(art["link"])
+    if not links_by_url:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=IMAGE_WORKERS) as pool:
+        records = dict(zip(links_by_url, pool.map(_process, links_by_url)))
+
+    results = {
+        link: record
+        for url, record in records.items() if record
+        for link in links_by_url[url]
+    }
+    print(f"🖼️ Optimized images for {len(results)}/{sum(map(len, links_by_url.values()))} articles.")
+    return results
+
+
+def remove_derivatives(variants_by_digest: dict[str, str]) -> int:
+    """
+    Deletes the stored files of digests that no post uses any more
+    ({digest: post_images.variants JSON}) and forgets them locally. Returns
+    how many files were removed.
+    """
+    if not variants_by_digest:
+        return 0
+    if not _storage_configured():
+        print(f"⚠️ Neither SUPABASE_URL/SUPABASE_KEY nor SCRAPER_IMAGE_DIR is set, "
+              f"leaving the files of {len(variants_by_digest)} images in place.")
+        return 0
+    paths = [
+        _storage_path(location)
+        for variants_json in variants_by_digest.values()
+        for variants in json.loads(variants_json).values()
+        for location in variants.values()
+    ]
+    _remove(paths)
+    digests = list(variants_by_digest)
+    placeholders = ",".join("?" * len(digests))
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            conn.execute(f"DELETE FROM derivatives WHERE digest IN ({placeholders})", digests)
+            conn.execute(f"DELETE FROM sources WHERE digest IN ({placeholders})", digests)
+    incr("image_derivatives_removed", len(paths))
+    return len(paths)
+
+
+def ensure_post_images_table(client) -> None:
+    """Creates the post_images table if it doesn't exist yet."""
+    client.execute(
+        """
+        CREATE TABLE IF NOT EXISTS post_images (
+            link TEXT PRIMARY KEY,
+            post_id INTEGER NOT NULL,
+            digest TEXT NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            variants TEXT NOT NULL,     -- JSON {"webp": {"320": "https://.../ab/ab12...-320.webp", ...}, "avif": {...}}
+            placeholder TEXT,           -- Blurred data: URI shown while the image loads
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(post_id) REFERENCES posts(id)
+        )
+        """
+    )
+
+
+def post_image_statement(link: str, record: dict):
+    """Records an article's derivatives; rides along with the run's write, after the posts upsert."""
+    import libsql_client
+
+    return libsql_client.Statement(
+        """
+        INSERT INTO post_images (link, post_id, digest, width, height, variants, placeholder)
+        SELECT ?, id, ?, ?, ?, ?, ? FROM posts WHERE link = ?
+        ON CONFLICT(link) DO UPDATE SET
+            post_id = excluded.post_id,
+            digest = excluded.digest,
+            width = excluded.width,
+            height = excluded.height,
+            variants = excluded.variants,
+            placeholder = excluded.placeholder
+        """,
+        [link, record["digest"], record["width"], record["height"], json.dumps(record["variants"]),
+         record["placeholder"], link],
+    )
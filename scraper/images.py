@@ -0,0 +1,182 @@
+import codecs
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+from local_state import CACHE_DIR
+from metrics import incr
+
+# Article-page image discovery. Pages are streamed and parsing stops at </head>,
+# so we never download or parse the article body just to read one meta tag.
+
+CACHE_FILE = CACHE_DIR / "image_cache.db"
+
+HIT_TTL_SECONDS = 30 * 24 * 3600
+MISS_TTL_SECONDS = 24 * 3600       # Pages without an image are retried daily
+MAX_HEAD_BYTES = 256 * 1024        # Give up if <head> is larger than this
+CHUNK_SIZE = 8192
+MAX_REQUESTS_PER_HOST = 2          # Feeds, article pages and images alike; konekt.mk alone has 7 category feeds
+
+# Lower number wins: og:image beats twitter:image
+META_PRIORITY = {
+    ("property", "og:image"): 0,
+    ("property", "og:image:url"): 0,
+    ("property", "og:image:secure_url"): 0,
+    ("name", "twitter:image"): 1,
+    ("name", "twitter:image:src"): 1,
+}
+
+_sessions = threading.local()
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()
+_host_semaphores: dict[str, threading.BoundedSemaphore] = {}
+_host_semaphores_lock = threading.Lock()
+
+
+def get_session():
+    """One pooled cloudscraper session per worker thread, reused across feeds."""
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        import cloudscraper  # Heavy; tools that only read the cache never need it
+        session = cloudscraper.create_scraper()
+        _sessions.session = session
+    return session
+
+
+@contextmanager
+def host_slot(target_url: str):
+    """Limits how many requests run against the same host at once."""
+    host = urlparse(target_url).netloc.lower()
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+            _host_semaphores[host] = semaphore
+    with semaphore:
+        yield
+
+
+class _MetaImageParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.best: str | None = None
+        self.best_rank = len(META_PRIORITY)
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            self.done = True
+            return
+        if tag != "meta":
+            return
+        attrs = dict(attrs)
+        content = (attrs.get("content") or "").strip()
+        if not content:
+            return
+        for attr in ("property", "name"):
+            rank = META_PRIORITY.get((attr, (attrs.get(attr) or "").lower()))
+            if rank is not None and rank < self.best_rank:
+                self.best, self.best_rank = content, rank
+                if rank == 0:
+                    self.done = True  # Nothing beats og:image
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.done = True
+
+
+def fetch_meta_image(article_url: str, session) -> tuple[str | None, bool]:
+    """
+    Streams the page until </head> and returns (image_url, definitive).
+    `definitive` is False for network errors, which shouldn't be cached.
+    """
+    try:
+        resp = session.get(article_url, timeout=10, stream=True)
+    except Exception:
+        return None, False
+
+    try:
+        if resp.status_code != 200:
+            return None, resp.status_code in (404, 410)
+
+        decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+        parser = _MetaImageParser()
+        read = 0
+        for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+            read += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            if parser.done or read >= MAX_HEAD_BYTES:
+                break
+        incr("page_bytes", read)
+        return parser.best, True
+    except Exception:
+        return None, False
+    finally:
+        resp.close()
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(CACHE_FILE, check_same_thread=False)
+        _conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS page_images (
+                article_url TEXT PRIMARY KEY,
+                image_url TEXT,
+                checked_at REAL NOT NULL
+            )
+            """
+        )
+    return _conn
+
+
+def get_cached_image(article_url: str) -> tuple[bool, str | None]:
+    """Returns (hit, image_url); a hit with image_url None is a cached miss."""
+    try:
+        with _lock:
+            row = _get_conn().execute(
+                "SELECT image_url, checked_at FROM page_images WHERE article_url = ?", [article_url]
+            ).fetchone()
+    except Exception as e:
+        print(f"⚠️ Image cache read failed: {e}")
+        return False, None
+    if not row:
+        return False, None
+    image_url, checked_at = row
+    ttl = HIT_TTL_SECONDS if image_url else MISS_TTL_SECONDS
+    if time.time() - checked_at > ttl:
+        return False, None
+    return True, image_url
+
+
+def cache_image(article_url: str, image_url: str | None) -> None:
+    try:
+        with _lock:
+            conn = _get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO page_images (article_url, image_url, checked_at) VALUES (?, ?, ?)",
+                [article_url, image_url, time.time()],
+            )
+            conn.commit()
+    except Exception as e:
+        print(f"⚠️ Image cache write failed: {e}")
+
+
+def prune_image_cache() -> None:
+    """Drops expired rows so the cache file doesn't grow forever."""
+    try:
+        with _lock:
+            conn = _get_conn()
+            now = time.time()
+            conn.execute(
+                "DELETE FROM page_images WHERE checked_at < ? OR (image_url IS NULL AND checked_at < ?)",
+                [now - HIT_TTL_SECONDS, now - MISS_TTL_SECONDS],
+            )
+            conn.commit()
+    except Exception as e:
+        print(f"⚠️ Image cache prune failed: {e}")
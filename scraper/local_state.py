@@ -0,0 +1,21 @@
+import os
+import threading
+from pathlib import Path
+
+# Where the scraper keeps the state it carries from one run to the next (seen
+# links, curator and image caches, story index, outbox...) and how files are
+# written there. The workflow restores and saves this directory with
+# actions/cache; SCRAPER_CACHE_DIR points it elsewhere (benchmarks, replays).
+
+CACHE_DIR = Path(os.getenv("SCRAPER_CACHE_DIR") or Path(__file__).resolve().parent / "cache")
+
+
+def write_atomic(path: Path, data: bytes | str) -> None:
+    """Writes through a temp file and a rename, so readers and killed runs never see half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # One temp file per writer: two threads may write the same path at once
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
@@ -1,23 +1,175 @@
+import atexit
+import gzip
 import json
 import os
+import queue
+import random
+import shutil
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict
 
-LOG_DIR = Path(__file__).resolve().parent / "logs"
+LOG_DIR = Path(os.getenv("SCRAPER_LOG_DIR") or Path(__file__).resolve().parent / "logs")
 LOG_FILE = LOG_DIR / "scraper_log.jsonl"
 
+# Rotation: the live file is rotated when it passes MAX_LOG_BYTES or when the
+# day changes; rotated files are gzipped and only the newest few are kept.
+MAX_LOG_BYTES = 5 * 1024 * 1024
+MAX_ROTATED_FILES = 20
+ROTATE_DAILY = True
+
+# Payload limits so a single curator batch can't produce a multi-MB line
+MAX_STRING_CHARS = 4000
+MAX_LIST_ITEMS = 100
+
+# Fraction of events kept per event type (missing = keep all)
+EVENT_SAMPLE_RATES: Dict[str, float] = {}
+
+MAX_QUEUED_EVENTS = 10_000
+FLUSH_INTERVAL_SECONDS = 1.0
+
+_queue: "queue.Queue[str | None]" = queue.Queue(maxsize=MAX_QUEUED_EVENTS)
+_writer: threading.Thread | None = None
+_writer_lock = threading.Lock()
+_dropped_events = 0
+_dropped_lock = threading.Lock()  # Producers on many threads bump the count, the writer swaps it out
+
+
+def set_event_sampling(event_type: str, rate: float) -> None:
+    """Keep only `rate` (0.0-1.0) of the events of this type."""
+    EVENT_SAMPLE_RATES[event_type] = max(0.0, min(1.0, rate))
+
+
+def _truncate(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > MAX_STRING_CHARS:
+        return value[:MAX_STRING_CHARS] + f"…[+{len(value) - MAX_STRING_CHARS} chars]"
+    if isinstance(value, dict):
+        return {key: _truncate(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [_truncate(item) for item in value[:MAX_LIST_ITEMS]]
+        if len(value) > MAX_LIST_ITEMS:
+            items.append(f"…[+{len(value) - MAX_LIST_ITEMS} items]")
+        return items
+    return value
+
+
 def log_event(event_type: str, data: Dict[str, Any]) -> None:
-    """Append a structured JSON log entry to scraper/logs/scraper_log.jsonl."""
+    """Queue a structured JSON log entry for scraper/logs/scraper_log.jsonl."""
+    global _dropped_events
     try:
-        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        rate = EVENT_SAMPLE_RATES.get(event_type, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            return
+
         payload = {
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "event": event_type,
-            "data": data,
+            "data": _truncate(data),
         }
-        with LOG_FILE.open("a", encoding="utf-8") as logfile:
-            logfile.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        line = json.dumps(payload, ensure_ascii=False, default=str) + "\n"
+        _ensure_writer()
+        _queue.put_nowait(line)
+    except queue.Full:
+        # Never block the scraper on logging; count what we lost instead
+        with _dropped_lock:
+            _dropped_events += 1
     except Exception as err:
         # Swallow logging errors so scraping never aborts due to disk hiccups
         print(f"⚠️ Logging failure ({event_type}): {err}")
+
+
+def flush_logs() -> None:
+    """Writes everything queued so far and stops the writer (called at exit)."""
+    global _writer
+    with _writer_lock:
+        writer = _writer
+        _writer = None
+    if writer is None:
+        return
+    _queue.put(None)
+    writer.join(timeout=10)
+
+
+def _ensure_writer() -> None:
+    global _writer
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_writer_loop, name="log-writer", daemon=True)
+            _writer.start()
+
+
+def _writer_loop() -> None:
+    global _dropped_events
+    stopping = False
+    while not stopping:
+        try:
+            first = _queue.get(timeout=FLUSH_INTERVAL_SECONDS)
+        except queue.Empty:
+            continue
+
+        # Drain whatever else is waiting so it's written in one go
+        lines = []
+        for line in [first, *_drain()]:
+            if line is None:
+                stopping = True
+            else:
+                lines.append(line)
+
+        with _dropped_lock:
+            dropped, _dropped_events = _dropped_events, 0
+        if dropped:
+            lines.append(json.dumps({
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "event": "log_events_dropped",
+                "data": {"count": dropped},
+            }) + "\n")
+
+        if lines:
+            _write_lines(lines)
+
+
+def _drain() -> list:
+    items = []
+    while True:
+        try:
+            items.append(_queue.get_nowait())
+        except queue.Empty:
+            return items
+
+
+def _write_lines(lines: list[str]) -> None:
+    try:
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        chunk = "".join(lines)
+        _rotate_if_needed(len(chunk.encode("utf-8")))
+        with LOG_FILE.open("a", encoding="utf-8") as logfile:
+            logfile.write(chunk)
+    except Exception as err:
+        print(f"⚠️ Logging failure (writer): {err}")
+
+
+def _rotate_if_needed(incoming_bytes: int) -> None:
+    if not LOG_FILE.exists():
+        return
+    stat = LOG_FILE.stat()
+    too_big = stat.st_size > 0 and stat.st_size + incoming_bytes > MAX_LOG_BYTES
+    new_day = ROTATE_DAILY and datetime.fromtimestamp(stat.st_mtime).date() != datetime.now().date()
+    if not (too_big or new_day):
+        return
+
+    rotated = LOG_DIR / f"{LOG_FILE.stem}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.jsonl"
+    os.replace(LOG_FILE, rotated)
+    with rotated.open("rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    rotated.unlink()
+
+    # Keep the disk bounded: drop the oldest archives
+    archives = sorted(LOG_DIR.glob(f"{LOG_FILE.stem}-*.jsonl.gz"))
+    for old in archives[:-MAX_ROTATED_FILES]:
+        old.unlink(missing_ok=True)
+
+
+atexit.register(flush_logs)
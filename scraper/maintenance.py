@@ -0,0 +1,234 @@
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from image_stage import remove_derivatives
+from metrics import incr
+
+# Retention for `posts` (`scraper.py maintenance`). Posts older than the
+# retention window are written to monthly gzipped JSONL archives and then
+# deleted in bounded batches, so the table (and every query on it) stays about
+# the same size over the years. Featured and bookmarked posts, and the site's
+# own articles (PROTECTED_CATEGORIES), are never removed. Optimized images
+# (image_stage) that no remaining post uses are removed along with the posts.
+# The two steps are separate phases: `--phase archive` only writes new archive
+# files, and `--phase delete` only deletes the posts listed in the archive
+# files it finds. The workflow uploads the files to durable storage in
+# between, so a row is never deleted before its only copy is safe. A run that
+# dies before deleting leaves its posts to be archived again by the next one,
+# so readers of the archive should dedupe on "id".
+
+ARCHIVE_DIR = Path(os.getenv("SCRAPER_ARCHIVE_DIR") or Path(__file__).resolve().parent / "archive")
+RETENTION_DAYS = 180
+DELETE_BATCH_SIZE = 500       # Rows per archive read or delete round trip (ids fit well under SQLite's 999 params)
+MAX_BATCHES = 200             # Per run; the rest waits for the next one
+BATCH_PAUSE_SECONDS = 0.2     # Leaves room for the scraper's own writes
+
+# Written in-house and served by web/app/blog; the scraper never stores these
+PROTECTED_CATEGORIES = ("Blog",)
+
+# Access patterns of the scraper and the frontend
+INDEXES = {
+    "idx_posts_link": "CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_link ON posts(link)",
+    "idx_posts_published": "CREATE INDEX IF NOT EXISTS idx_posts_published ON posts(published_at DESC)",
+    "idx_posts_category_published":
+        "CREATE INDEX IF NOT EXISTS idx_posts_category_published ON posts(category, published_at DESC)",
+}
+
+POST_COLUMNS = ("id", "title", "link", "source", "category", "teaser", "summary", "image_url",
+                "published_at", "scraped_at", "created_at", "updated_at")
+
+
+def ensure_post_indexes(client) -> None:
+    for name, sql in INDEXES.items():
+        try:
+            client.execute(sql)
+        except Exception as e:
+            print(f"⚠️ Failed to create {name}: {e}")
+
+
+def _existing_tables(client) -> set[str]:
+    rs = client.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return {row[0] for row in rs.rows}
+
+
+def _protected_clause(tables: set[str]) -> str:
+    """SQL excluding the site's own posts and posts that something still points at."""
+    categories = ", ".join("'" + category.replace("'", "''") + "'" for category in PROTECTED_CATEGORIES)
+    clause = f"COALESCE(category, '') NOT IN ({categories})"
+    clause += " AND id NOT IN (SELECT post_id FROM featured_slots WHERE post_id IS NOT NULL)"
+    if "bookmarks" in tables:
+        clause += " AND id NOT IN (SELECT post_id FROM bookmarks)"
+    return clause
+
+
+def _append_archive(directory: Path, posts: list[dict], stamp: str) -> set[Path]:
+    """
+    Appends posts to posts-YYYY-MM.<stamp>.jsonl.gz by publication month (gzip
+    members concatenate). Every run gets its own files, so an upload never
+    replaces an earlier run's archive. Returns the files written.
+    """
+    by_month: dict[str, list[dict]] = {}
+    for post in posts:
+        month = (post.get("published_at") or post.get("created_at") or "unknown")[:7]
+        by_month.setdefault(month, []).append(post)
+
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = set()
+    for month, month_posts in by_month.items():
+        lines = "".join(json.dumps(post, ensure_ascii=False) + "\n" for post in month_posts)
+        path = directory / f"posts-{month}.{stamp}.jsonl.gz"
+        with open(path, "ab") as f:
+            f.write(gzip.compress(lines.encode("utf-8")))
+            f.flush()
+            os.fsync(f.fileno())
+        paths.add(path)
+    return paths
+
+
+def archive_old_posts(client, retention_days: int = RETENTION_DAYS, directory: Path = ARCHIVE_DIR) -> list[Path]:
+    """Writes unreferenced posts older than `retention_days` to new archive files. Deletes nothing."""
+    # published_at is a naive ISO timestamp (see scraper.parse_date)
+    cutoff = (datetime.now() - timedelta(days=retention_days)).replace(microsecond=0).isoformat()
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    tables = _existing_tables(client)
+    protected = _protected_clause(tables)
+    paths: set[Path] = set()
+    archived = 0
+    last_id = 0
+
+    for _ in range(MAX_BATCHES):
+        rs = client.execute(
+            f"""
+            SELECT {', '.join(POST_COLUMNS)} FROM posts
+            WHERE COALESCE(published_at, created_at) < ? AND {protected} AND id > ?
+            ORDER BY id LIMIT ?
+            """,
+            [cutoff, last_id, DELETE_BATCH_SIZE],
+        )
+        if not rs.rows:
+            break
+        posts = [dict(zip(POST_COLUMNS, row)) for row in rs.rows]
+        ids = [post["id"] for post in posts]
+        last_id = ids[-1]
+
+        # Other outlets' copies of the story go into the archive with it
+        if "post_sources" in tables:
+            sources_rs = client.execute(
+                f"SELECT post_id, link, source, title, published_at FROM post_sources WHERE post_id IN ({','.join('?' * len(ids))})",
+                ids,
+            )
+            sources: dict[int, list[dict]] = {}
+            for post_id, link, source, title, published_at in sources_rs.rows:
+                sources.setdefault(post_id, []).append(
+                    {"link": link, "source": source, "title": title, "published_at": published_at}
+                )
+            for post in posts:
+                if post["id"] in sources:
+                    post["sources"] = sources[post["id"]]
+
+        paths |= _append_archive(directory, posts, stamp)
+        archived += len(posts)
+        print(f"🗄️ Archived {len(posts)} posts (up to {posts[-1].get('published_at')}).")
+    else:
+        print(f"⏸️ Stopped after {MAX_BATCHES} batches, the rest is left for the next run.")
+
+    incr("posts_archived", archived)
+    return sorted(paths)
+
+
+def archived_post_ids(directory: Path = ARCHIVE_DIR) -> list[int]:
+    """Ids of every post in the archive files under `directory`."""
+    ids = set()
+    for path in sorted(directory.glob("posts-*.jsonl.gz")):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            ids.update(json.loads(line)["id"] for line in f if line.strip())
+    return sorted(ids)
+
+
+def delete_archived_posts(client, directory: Path = ARCHIVE_DIR) -> int:
+    """Deletes the posts found in the archive files under `directory`. Returns how many were removed."""
+    import libsql_client
+
+    ids = archived_post_ids(directory)
+    tables = _existing_tables(client)
+    protected = _protected_clause(tables)
+    removed = 0
+
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        batch = ids[start:start + DELETE_BATCH_SIZE]
+        placeholders = ",".join("?" * len(batch))
+        variants_by_digest = {}
+        if "post_images" in tables:
+            rs = client.execute(f"SELECT digest, variants FROM post_images WHERE post_id IN ({placeholders})", batch)
+            variants_by_digest = {digest: variants for digest, variants in rs.rows}
+        # Re-check the references: a slot may have rotated to one of these since they were archived
+        statements = [libsql_client.Statement(f"DELETE FROM posts WHERE id IN ({placeholders}) AND {protected}", batch)]
+        # Rows of posts that are gone; a post kept by the re-check keeps its sources and images
+        statements.extend(
+            libsql_client.Statement(
+                f"DELETE FROM {table} WHERE post_id IN ({placeholders}) AND post_id NOT IN (SELECT id FROM posts)", batch
+            )
+            for table in ("post_sources", "post_images") if table in tables
+        )
+        try:
+            results = client.batch(statements)
+        except Exception as e:
+            print(f"🔥 Failed to delete archived posts, stopping: {e}")
+            break
+        removed += results[0].rows_affected
+        _remove_unused_images(client, variants_by_digest)
+        time.sleep(BATCH_PAUSE_SECONDS)
+
+    incr("posts_deleted", removed)
+    return removed
+
+
+def _remove_unused_images(client, variants_by_digest: dict[str, str]) -> None:
+    """Removes the optimized image files of deleted posts, unless a remaining post shares the image."""
+    if not variants_by_digest:
+        return
+    digests = list(variants_by_digest)
+    try:
+        rs = client.execute(
+            f"SELECT DISTINCT digest FROM post_images WHERE digest IN ({','.join('?' * len(digests))})", digests
+        )
+        for (digest,) in rs.rows:
+            variants_by_digest.pop(digest, None)
+        files = remove_derivatives(variants_by_digest)
+    except Exception as e:
+        # The posts are gone either way; stray files only cost storage
+        print(f"⚠️ Failed to remove the image files of deleted posts: {e}")
+        incr("image_cleanup_failures")
+        return
+    if files:
+        print(f"🖼️ Removed {files} image files of deleted posts.")
+
+
+def reclaim_space(client) -> None:
+    """VACUUM where the server allows it, then refresh the planner statistics."""
+    for sql in ("VACUUM", "ANALYZE"):
+        try:
+            client.execute(sql)
+        except Exception as e:
+            print(f"⚠️ {sql} skipped: {e}")
+
+
+def run_maintenance(client, retention_days: int = RETENTION_DAYS, directory: Path = ARCHIVE_DIR,
+                    phase: str = "all") -> None:
+    """`phase` is "archive", "delete" or "all" (both, for local runs where `directory` is the durable copy)."""
+    started = time.monotonic()
+    if phase in ("archive", "all"):
+        print(f"🧹 Maintenance: archiving posts older than {retention_days} days to {directory}.")
+        ensure_post_indexes(client)
+        paths = archive_old_posts(client, retention_days, directory)
+        print(f"🗄️ Wrote {len(paths)} archive files.")
+    if phase in ("delete", "all"):
+        removed = delete_archived_posts(client, directory)
+        if removed:
+            reclaim_space(client)
+        print(f"🧹 Removed {removed} archived posts.")
+    print(f"🧹 Maintenance ({phase}) done in {time.monotonic() - started:.1f}s.")
@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from local_state import write_atomic
+
+# Lightweight per-run instrumentation: stage timers and counters, summarised
+# at the end of a run as JSON (and optionally a Prometheus textfile).
+#
+#   with timed("feed_http", feed=source): ...
+#   @timed("resolve_image_url")
+#   incr("curator_cache_hits", 3)
+
+LOG_DIR = Path(os.getenv("SCRAPER_LOG_DIR") or Path(__file__).resolve().parent / "logs")
+RUN_SUMMARY_FILE = LOG_DIR / "run_summary.json"
+PROM_FILE_ENV = "METRICS_PROM_FILE"  # e.g. a node_exporter textfile collector path
+
+_timings: dict[tuple[str, str | None], list[float]] = {}
+_counters: dict[tuple[str, str | None], float] = {}
+_lock = threading.Lock()
+_started_at = datetime.now(timezone.utc)
+_started_clock = time.monotonic()
+
+
+def reset() -> None:
+    global _started_at, _started_clock
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+        _started_at = datetime.now(timezone.utc)
+        _started_clock = time.monotonic()
+
+
+def record_time(stage: str, seconds: float, feed: str | None = None) -> None:
+    with _lock:
+        _timings.setdefault((stage, None), []).append(seconds)
+        if feed:
+            _timings.setdefault((stage, feed), []).append(seconds)
+
+
+def incr(counter: str, amount: float = 1, feed: str | None = None) -> None:
+    with _lock:
+        _counters[(counter, None)] = _counters.get((counter, None), 0) + amount
+        if feed:
+            _counters[(counter, feed)] = _counters.get((counter, feed), 0) + amount
+
+
+@contextmanager
+def timed(stage: str, feed: str | None = None):
+    """Times a block; also works as a function decorator."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_time(stage, time.perf_counter() - start, feed)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    # Nearest-rank percentile, good enough for a few hundred samples
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def _stats(values: list[float]) -> dict:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "total_s": round(sum(ordered), 4),
+        "p50_s": round(_percentile(ordered, 50), 4),
+        "p95_s": round(_percentile(ordered, 95), 4),
+        "max_s": round(ordered[-1], 4),
+    }
+
+
+def summary() -> dict:
+    with _lock:
+        timings = {key: list(values) for key, values in _timings.items()}
+        counters = dict(_counters)
+
+    result = {
+        "started_at": _started_at.isoformat(),
+        "duration_s": round(time.monotonic() - _started_clock, 3),
+        "stages": {},
+        "feeds": {},
+        "counters": {},
+    }
+    for (stage, feed), values in sorted(timings.items(), key=lambda kv: (kv[0][0], kv[0][1] or "")):
+        if feed is None:
+            result["stages"][stage] = _stats(values)
+        else:
+            result["feeds"].setdefault(feed, {})[stage] = _stats(values)
+    for (counter, feed), value in sorted(counters.items(), key=lambda kv: (kv[0][0], kv[0][1] or "")):
+        if feed is None:
+            result["counters"][counter] = value
+        else:
+            result["feeds"].setdefault(feed, {}).setdefault("counters", {})[counter] = value
+    return result
+
+
+def _prom_name(name: str) -> str:
+    return "vibes_scraper_" + "".join(ch if ch.isalnum() else "_" for ch in name)
+
+
+def _prom_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def to_prometheus(data: dict) -> str:
+    lines = [f"vibes_scraper_run_duration_seconds {data['duration_s']}"]
+    for stage, stats in data["stages"].items():
+        name = _prom_name(stage)
+        lines.append(f'{name}_seconds{{quantile="0.5"}} {stats["p50_s"]}')
+        lines.append(f'{name}_seconds{{quantile="0.95"}} {stats["p95_s"]}')
+        lines.append(f"{name}_seconds_sum {stats['total_s']}")
+        lines.append(f"{name}_seconds_count {stats['count']}")
+    for counter, value in data["counters"].items():
+        lines.append(f"{_prom_name(counter)}_total {value}")
+    for feed, feed_data in data["feeds"].items():
+        for counter, value in feed_data.get("counters", {}).items():
+            lines.append(f'{_prom_name(counter)}_by_feed_total{{feed="{_prom_label(feed)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def write_run_summary(path: Path = RUN_SUMMARY_FILE) -> dict:
+    """Writes the run summary JSON, plus a Prometheus textfile if METRICS_PROM_FILE is set."""
+    data = summary()
+    try:
+        write_atomic(path, json.dumps(data, ensure_ascii=False, indent=2))
+        prom_path = os.getenv(PROM_FILE_ENV)
+        if prom_path:
+            write_atomic(Path(prom_path), to_prometheus(data))
+    except Exception as e:
+        print(f"⚠️ Failed to write run summary: {e}")
+    return data
+
+
+def print_run_summary(data: dict) -> None:
+    """Prints the slowest stages so the workflow log shows where time went."""
+    print("📊 Stage timings (p50 / p95 / total):")
+    for stage, stats in sorted(data["stages"].items(), key=lambda kv: -kv[1]["total_s"]):
+        print(f"   {stage:<24} {stats['p50_s']:>7.3f}s {stats['p95_s']:>7.3f}s {stats['total_s']:>8.2f}s  ×{stats['count']}")
+    if data["counters"]:
+        print("📊 Counters: " + ", ".join(f"{name}={value:g}" for name, value in data["counters"].items()))
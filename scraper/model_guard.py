@@ -0,0 +1,110 @@
+import threading
+import time
+
+# Rate limiting and failure isolation for Gemini calls. One RateLimiter and one
+# CircuitBreaker exist per model, so a tired model doesn't slow down the rest.
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled at `per_minute` per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill(time.monotonic())
+        amount = min(amount, self.capacity)  # An oversized request waits for a full bucket
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one model."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int, max_wait: float) -> bool:
+        """Blocks until one request and `tokens` tokens fit, or returns False after max_wait."""
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if wait == 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for `cooldown`
+    seconds. After that a single trial call is let through (half-open); success
+    closes the breaker again, failure re-opens it.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+
+    def release(self) -> None:
+        """Gives back a trial slot from allow() when the call was never made."""
+        with self._lock:
+            self.trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self) -> bool:
+        """Counts a failure; returns True if this failure opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            was_closed = self.opened_at is None
+            if self.trial_running or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                self.trial_running = False
+                return was_closed
+            return False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+
+def is_quota_error(err: Exception) -> bool:
+    """True for 429 / ResourceExhausted style errors that are worth retrying later."""
+    text = f"{type(err).__name__} {err}".lower()
+    return "429" in text or "resourceexhausted" in text or "quota" in text or "rate limit" in text
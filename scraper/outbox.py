@@ -0,0 +1,176 @@
+import json
+import sqlite3
+import threading
+import time
+
+from local_state import CACHE_DIR
+from metrics import incr
+
+# Write-behind outbox for Turso. A run's writes are committed to a local SQLite
+# file first and pushed to Turso afterwards, oldest first, several writes per
+# batch. A push that keeps failing leaves its writes queued for the next run
+# instead of dropping them, so curated articles survive a Turso outage. When a
+# batch fails, its writes are pushed one at a time, so a write Turso rejects
+# (a missing table, a constraint) only holds back itself.
+# Callers only queue statements that are safe to apply late or twice: upserts,
+# inserts that ignore conflicts, and slot updates guarded by the slot's lock
+# and manual override. A write whose push succeeded but whose reply was lost
+# is then replayed harmlessly, and a stale one can't undo an editor's change.
+
+OUTBOX_FILE = CACHE_DIR / "outbox.db"
+
+SYNC_BATCH_STATEMENTS = 50   # Statements per push; writes are never split across pushes
+SYNC_RETRIES = 3
+SYNC_BACKOFF_SECONDS = 1.0   # Doubled after each failed push
+MAX_ATTEMPTS = 30            # Failures of a write on its own while Turso answered; then it is left aside
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()           # Guards the local queue only, never held during a push
+_flush_lock = threading.Lock()
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(OUTBOX_FILE, check_same_thread=False)
+        _conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                statements TEXT NOT NULL,      -- JSON [[sql, args], ...], applied as one transaction
+                created_at REAL NOT NULL,
+                attempts INTEGER DEFAULT 0,
+                last_error TEXT
+            )
+            """
+        )
+    return _conn
+
+
+def enqueue(writes: list[list]) -> list[int]:
+    """Durably queues each write (a list of statements) and returns their outbox ids."""
+    now = time.time()
+    with _lock:
+        conn = _get_conn()
+        ids = []
+        with conn:  # One local transaction: either every write is queued or none is
+            for statements in writes:
+                payload = json.dumps([[stmt.sql, stmt.args] for stmt in statements], ensure_ascii=False)
+                cursor = conn.execute("INSERT INTO outbox (statements, created_at) VALUES (?, ?)", [payload, now])
+                ids.append(cursor.lastrowid)
+    incr("outbox_queued", len(ids))
+    return ids
+
+
+def pending_count() -> int:
+    with _lock:
+        return _get_conn().execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+
+def _next_push(conn: sqlite3.Connection, after_id: int) -> list[tuple[int, list]]:
+    """The oldest queued writes after `after_id`, up to SYNC_BATCH_STATEMENTS statements (at least one write)."""
+    push = []
+    size = 0
+    rows = conn.execute(
+        "SELECT id, statements FROM outbox WHERE id > ? AND attempts < ? ORDER BY id", [after_id, MAX_ATTEMPTS]
+    )
+    for entry_id, payload in rows:
+        statements = json.loads(payload)
+        if push and size + len(statements) > SYNC_BATCH_STATEMENTS:
+            break
+        push.append((entry_id, statements))
+        size += len(statements)
+    return push
+
+
+def _push(client, push: list[tuple[int, list]]) -> list:
+    import libsql_client
+
+    return client.batch([libsql_client.Statement(sql, args) for _, write in push for sql, args in write])
+
+
+def _turso_reachable(client) -> bool:
+    try:
+        client.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+
+def _done(push: list[tuple[int, list]], result_sets: list, results: dict[int, list]) -> None:
+    """Records the results of a pushed batch and takes its writes off the queue."""
+    offset = 0
+    for entry_id, write in push:
+        results[entry_id] = result_sets[offset:offset + len(write)]
+        offset += len(write)
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(entry_id,) for entry_id, _ in push])
+    incr("outbox_pushed", len(push))
+
+
+def _push_one_by_one(client, push: list[tuple[int, list]], results: dict[int, list]) -> bool:
+    """
+    Pushes a failed batch's writes separately, so one bad write can't hold back
+    the others. Only a write that fails while Turso answers gets an attempt
+    counted. Returns False if Turso is unreachable.
+    """
+    for entry in push:
+        try:
+            result_sets = _push(client, [entry])
+        except Exception as e:
+            if not _turso_reachable(client):
+                return False
+            print(f"🔥 Queued write {entry[0]} failed: {e}")
+            incr("db_write_errors")
+            with _lock:
+                conn = _get_conn()
+                with conn:
+                    conn.execute("UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+                                 [str(e), entry[0]])
+            continue
+        _done([entry], result_sets, results)
+    return True
+
+
+def flush(client) -> dict[int, list]:
+    """
+    Pushes queued writes to Turso in order. Returns {outbox id: result sets}
+    for the writes pushed now; the rest stay queued. Writes queued while a
+    flush runs are picked up by the same flush.
+    """
+    results: dict[int, list] = {}
+    last_id = 0
+    with _flush_lock:  # One flush at a time; enqueue only waits for the local queue
+        with _lock:
+            stuck = _get_conn().execute("SELECT COUNT(*) FROM outbox WHERE attempts >= ?", [MAX_ATTEMPTS]).fetchone()[0]
+        if stuck:
+            # Their articles were never marked as stored, so later runs fetch and queue them again
+            print(f"⚠️ {stuck} queued writes failed {MAX_ATTEMPTS} times and are no longer retried (see {OUTBOX_FILE.name}).")
+        while True:
+            with _lock:
+                push = _next_push(_get_conn(), last_id)
+            if not push:
+                break
+            last_id = push[-1][0]
+
+            backoff = SYNC_BACKOFF_SECONDS
+            for attempt in range(1, SYNC_RETRIES + 1):
+                try:
+                    result_sets = _push(client, push)
+                    break
+                except Exception as e:
+                    print(f"🔥 Turso sync failed (attempt {attempt}/{SYNC_RETRIES}): {e}")
+                    incr("db_write_errors")
+                    if attempt < SYNC_RETRIES:
+                        time.sleep(backoff)
+                        backoff *= 2
+            else:
+                if _push_one_by_one(client, push, results):
+                    continue
+                print(f"📮 {pending_count()} writes stay queued for the next run.")
+                break
+            _done(push, result_sets, results)
+    return results
@@ -0,0 +1,180 @@
+import calendar
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+# Adaptive polling: every feed gets its own interval, learned from how often
+# it publishes (entry timestamps) and how many new links each poll yielded.
+# A run only fetches the feeds that are due, so quiet or broken feeds cost
+# almost nothing and busy ones can be polled every run.
+
+MIN_POLL_INTERVAL_MINUTES = 180         # The workflow runs every 3 hours
+MAX_POLL_INTERVAL_MINUTES = 24 * 60
+MAX_FAILURE_BACKOFF_MINUTES = 24 * 60
+TARGET_NEW_PER_POLL = 4                 # Half the per-feed entry cap, so busy feeds don't overflow it
+RATE_SMOOTHING = 0.3                    # Weight of the newest sample in the moving averages
+RATE_SAMPLE_ENTRIES = 20                # Newest dated entries used to estimate the publish rate
+# Half a cron period: a feed polled late in one run (GitHub delays scheduled
+# runs, job startup varies) is still due in the next one instead of a run later
+DUE_SLACK_MINUTES = MIN_POLL_INTERVAL_MINUTES // 2
+POLL_ALL_ENV = "SCRAPER_POLL_ALL"       # Set to poll every feed regardless of schedule
+
+_schedules: dict[str, dict] = {}        # feed_url -> stored schedule
+_updated: dict[str, dict] = {}          # Schedules changed by this run's polls
+_lock = threading.Lock()
+
+
+def ensure_feed_schedule_table(client) -> None:
+    """Creates the feed_schedule table if it doesn't exist yet."""
+    client.execute(
+        """
+        CREATE TABLE IF NOT EXISTS feed_schedule (
+            feed_url TEXT PRIMARY KEY,
+            publish_rate REAL,          -- Smoothed entries per hour
+            avg_new_links REAL,         -- Smoothed new links per poll
+            failures INTEGER DEFAULT 0, -- Consecutive failed polls
+            interval_minutes INTEGER,
+            last_polled_at TEXT,
+            next_due_at TEXT
+        )
+        """
+    )
+
+
+def load_feed_schedules(client) -> int:
+    """Loads every stored schedule in one query."""
+    try:
+        rs = client.execute(
+            "SELECT feed_url, publish_rate, avg_new_links, failures, interval_minutes, last_polled_at, next_due_at FROM feed_schedule"
+        )
+    except Exception as e:
+        print(f"⚠️ Failed to load feed schedules, polling every feed: {e}")
+        return 0
+
+    with _lock:
+        for row in rs.rows:
+            _schedules[row[0]] = {
+                "publish_rate": row[1],
+                "avg_new_links": row[2],
+                "failures": row[3] or 0,
+                "interval_minutes": row[4],
+                "last_polled_at": row[5],
+                "next_due_at": row[6],
+            }
+    return len(_schedules)
+
+
+def due_feeds(feed_configs: list[dict], now: datetime | None = None) -> tuple[list[dict], list[dict]]:
+    """Splits the feeds into (due, not due yet). New feeds are always due."""
+    if os.getenv(POLL_ALL_ENV):
+        return list(feed_configs), []
+
+    cutoff = ((now or datetime.now(timezone.utc)) + timedelta(minutes=DUE_SLACK_MINUTES)).isoformat()
+    due, waiting = [], []
+    with _lock:
+        for config in feed_configs:
+            next_due_at = (_schedules.get(config["url"]) or {}).get("next_due_at")
+            (due if not next_due_at or next_due_at <= cutoff else waiting).append(config)
+    return due, waiting
+
+
+def _entry_times(entries) -> list[float]:
+    times = []
+    for entry in entries or []:
+        parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+        if parsed:
+            times.append(calendar.timegm(parsed))
+    return sorted(times, reverse=True)[:RATE_SAMPLE_ENTRIES]
+
+
+def _timestamp_rate(entries, now: datetime) -> float | None:
+    """
+    Entries per hour from the oldest sampled entry until now, or None without
+    enough dates. Measuring up to now lets a feed that went quiet slow down.
+    """
+    times = _entry_times(entries)
+    if len(times) < 2:
+        return None
+    span_hours = max((now.timestamp() - times[-1]) / 3600, 1 / 60)
+    return len(times) / span_hours
+
+
+def _smooth(previous: float | None, sample: float) -> float:
+    if previous is None:
+        return sample
+    return previous + RATE_SMOOTHING * (sample - previous)
+
+
+def _interval_minutes(publish_rate: float | None, capped: bool) -> int:
+    if capped or publish_rate is None:
+        # Entries were probably missed (or we know nothing yet): come back soon
+        return MIN_POLL_INTERVAL_MINUTES
+    if publish_rate <= 0:
+        return MAX_POLL_INTERVAL_MINUTES
+    minutes = TARGET_NEW_PER_POLL / publish_rate * 60
+    return int(min(MAX_POLL_INTERVAL_MINUTES, max(MIN_POLL_INTERVAL_MINUTES, minutes)))
+
+
+def record_poll(feed_url: str, new_links: int = 0, entries=None, failed: bool = False, capped: bool = False) -> None:
+    """
+    Updates a feed's schedule after a poll. `entries` are the parsed feed
+    entries (for their timestamps); `capped` means every entry we looked at
+    was new, so the feed likely published more than we took.
+    """
+    now = datetime.now(timezone.utc)
+    with _lock:
+        previous = _schedules.get(feed_url) or {}
+        publish_rate = previous.get("publish_rate")
+        avg_new_links = previous.get("avg_new_links")
+
+        if failed:
+            failures = previous.get("failures", 0) + 1
+            interval = min(MAX_FAILURE_BACKOFF_MINUTES, MIN_POLL_INTERVAL_MINUTES * 2 ** failures)
+        else:
+            failures = 0
+            sample = _timestamp_rate(entries, now)
+            if sample is None and previous.get("last_polled_at"):
+                # No usable dates: fall back to the yield since the last poll
+                hours = (now - datetime.fromisoformat(previous["last_polled_at"])).total_seconds() / 3600
+                sample = new_links / max(hours, MIN_POLL_INTERVAL_MINUTES / 60)
+            if sample is not None:
+                publish_rate = _smooth(publish_rate, sample)
+            avg_new_links = _smooth(avg_new_links, new_links)
+            interval = _interval_minutes(publish_rate, capped)
+
+        schedule = {
+            "publish_rate": publish_rate,
+            "avg_new_links": avg_new_links,
+            "failures": failures,
+            "interval_minutes": interval,
+            "last_polled_at": now.isoformat(),
+            "next_due_at": (now + timedelta(minutes=interval)).isoformat(),
+        }
+        _schedules[feed_url] = schedule
+        _updated[feed_url] = schedule
+
+
+def feed_schedule_statements() -> list:
+    """Upserts for the schedules of every feed polled this run (queued with the run's writes)."""
+    with _lock:
+        updated = dict(_updated)
+    import libsql_client
+
+    return [
+        libsql_client.Statement(
+            """
+            INSERT INTO feed_schedule (feed_url, publish_rate, avg_new_links, failures, interval_minutes, last_polled_at, next_due_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(feed_url) DO UPDATE SET
+                publish_rate = excluded.publish_rate,
+                avg_new_links = excluded.avg_new_links,
+                failures = excluded.failures,
+                interval_minutes = excluded.interval_minutes,
+                last_polled_at = excluded.last_polled_at,
+                next_due_at = excluded.next_due_at
+            """,
+            [url, s["publish_rate"], s["avg_new_links"], s["failures"], s["interval_minutes"],
+             s["last_polled_at"], s["next_due_at"]],
+        )
+        for url, s in updated.items()
+    ]
@@ -0,0 +1,320 @@
+"""
+Replays the post-LLM part of the pipeline without Gemini or network access.
+
+Recorded curator batches (curator_input + curator_output_raw events from
+scraper_log.jsonl and its rotated .gz files) are run through the same result
+reconstruction, feature-slot selection and DB write code as a live run, as fast
+as the machine allows. A feed snapshot recorded with `benchmark.py --record`
+can be replayed too; its articles are curated by fakes.FakeGeminiModel.
+
+    python replay.py                                  # all logs in scraper/logs
+    python replay.py --threshold 5 --threshold 7      # compare feature thresholds
+    python replay.py --repeat 50 --profile replay.prof
+    python replay.py --snapshot fixtures/ --db file:/tmp/replay.db
+
+Writes go to a throwaway SQLite file unless --db points somewhere else.
+"""
+import argparse
+import cProfile
+import gzip
+import hashlib
+import json
+import os
+import pstats
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+SCHEMA_FILE = SCRIPT_DIR / "schema.sql"
+DEFAULT_LOG_DIR = Path(os.getenv("SCRAPER_LOG_DIR") or SCRIPT_DIR / "logs")  # Read before main() redirects it
+
+
+# ---- Loading recorded batches ----
+
+def find_log_files(log_dir: Path) -> list[Path]:
+    """Rotated archives first (oldest to newest), then the live log."""
+    files = sorted(log_dir.glob("scraper_log-*.jsonl.gz"))
+    live = log_dir / "scraper_log.jsonl"
+    if live.exists():
+        files.append(live)
+    return files
+
+
+def iter_events(paths: list[Path]):
+    for path in paths:
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut off by a killed run
+
+
+def _original_articles(input_event: dict) -> list[dict]:
+    """Rebuilds the articles the curator saw; older logs lack links, so fake stable ones."""
+    data = input_event["data"]
+    originals = data.get("originals") or []
+    articles = []
+    for i, item in enumerate(data.get("articles") or []):
+        if not isinstance(item, dict):
+            continue  # A truncation marker
+        extra = originals[i] if i < len(originals) and isinstance(originals[i], dict) else {}
+        fallback_link = "replay://" + hashlib.sha1(f"{item.get('title')}|{item.get('source')}".encode()).hexdigest()
+        articles.append({
+            "title": item.get("title") or "Untitled",
+            "source": item.get("source") or "",
+            "summary_text": item.get("summary") or "",
+            "link": extra.get("link") or fallback_link,
+            "published_at": extra.get("published_at") or input_event.get("timestamp"),
+            "image_url": extra.get("image_url"),
+        })
+    return articles
+
+
+def load_recorded_batches(paths: list[Path]) -> list[dict]:
+    """
+    Pairs every curator_input with its curator_output_raw. Newer logs carry a
+    batch_id (batches run in parallel); older ones are paired in order.
+    """
+    batches = []
+    by_id: dict[str, dict] = {}
+    unlabelled: list[dict] = []
+
+    for event in iter_events(paths):
+        kind = event.get("event")
+        data = event.get("data") or {}
+        if kind == "curator_input":
+            if data.get("batch_id"):
+                by_id[data["batch_id"]] = event
+            else:
+                unlabelled.append(event)
+        elif kind == "curator_output_raw":
+            input_event = by_id.pop(data["batch_id"], None) if data.get("batch_id") else (
+                unlabelled.pop(0) if unlabelled else None
+            )
+            if input_event is None:
+                continue
+            batches.append({
+                "articles": _original_articles(input_event),
+                "accepted": [item for item in data.get("accepted") or [] if isinstance(item, dict)],
+                "rejected": [item for item in data.get("rejected") or [] if isinstance(item, dict)],
+            })
+    return batches
+
+
+def load_snapshot_batches(snapshot: Path) -> list[dict]:
+    """Parses recorded feeds and curates them with the fake model (no network)."""
+    import curator
+    import feedparser
+    import scraper
+    from fakes import FakeGeminiModel
+
+    curator.set_model_factory(lambda name: FakeGeminiModel(name))
+    curator.MODEL_LIMITS = {}
+    curator.DEFAULT_MODEL_LIMITS = {"rpm": 1_000_000, "tpm": 1_000_000_000}
+
+    manifest = json.loads((snapshot / "index.json").read_text(encoding="utf-8"))
+    articles = []
+    for feed in manifest["feeds"]:
+        parsed = feedparser.parse((snapshot / "feeds" / feed["file"]).read_bytes())
+        entries = [entry for entry in parsed.entries[:scraper.MAX_ENTRIES_PER_FEED] if entry.get("link")]
+        for entry, (summary_text, inline_image) in zip(entries, scraper.process_entries_html(entries)):
+            articles.append({
+                "title": entry.get("title", "No Title"),
+                "link": entry["link"],
+                "source": feed["source"],
+                "published_at": scraper.parse_date(entry),
+                "image_url": inline_image,
+                "summary_text": summary_text,
+            })
+
+    # Record what the fake curator says, in the same shape as logged batches
+    batches = []
+    for batch in curator.pack_batches(articles):
+        payload = [{"id": i, "title": a["title"], "source": a["source"], "summary": a["summary_text"]}
+                   for i, a in enumerate(batch)]
+        response = FakeGeminiModel().generate_content("INPUT DATA:\n" + json.dumps(payload, ensure_ascii=False))
+        result = json.loads(response.text)
+        batches.append({"articles": batch, "accepted": result["accepted"], "rejected": result["rejected"]})
+    return batches
+
+
+# ---- Replay ----
+
+def prepare_db(db_url: str | None, workdir: Path) -> str:
+    if db_url:
+        return db_url
+    db_path = workdir / "replay.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_FILE.read_text(encoding="utf-8"))
+    conn.commit()
+    conn.close()
+    return f"file:{db_path}"
+
+
+def select_features(approved_batches: list[list[dict]], threshold: int) -> dict:
+    """Runs the live run-level slot selection over every approved article."""
+    import scraper
+    from slot_ranking import SlotCandidates
+
+    scraper.FEATURE_SCORE_THRESHOLD = threshold
+    scraper.slot_candidates = SlotCandidates(scraper.FEATURE_TOP_K)
+    for slot in scraper.FEATURE_SLOTS:
+        scraper.feature_rotation_allowed[slot] = True
+        scraper.feature_updated_this_run[slot] = False
+
+    by_link = {}
+    for approved in approved_batches:
+        scraper.offer_feature_candidates(approved)
+        by_link.update((art["link"], art) for art in approved)
+
+    winners = {}
+    for slot in scraper.FEATURE_SLOTS:
+        ranked = scraper.slot_candidates.ranked(slot)
+        score, link = ranked[0] if ranked else (None, None)
+        winners[slot] = {"article": by_link.get(link), "score": score, "runners_up": max(0, len(ranked) - 1)}
+    return winners
+
+
+def run_replay(batches: list[dict], thresholds: list[int], repeat: int, write: bool) -> dict:
+    import curator
+    import metrics
+    import scraper
+
+    metrics.reset()
+    started = time.perf_counter()
+    approved_batches = []
+    rejected_total = 0
+    errors = 0
+
+    for round_index in range(repeat):
+        for batch in batches:
+            articles = batch["articles"]
+            if round_index:
+                # Fresh links per round so repeated writes create new rows
+                articles = [{**a, "link": f"{a['link']}#replay-{round_index}"} for a in articles]
+            try:
+                with metrics.timed("reconstruct_results"):
+                    approved, rejected_indexes, _ = curator.reconstruct_results(
+                        articles, batch["accepted"], batch["rejected"], verbose=False,
+                    )
+            except (IndexError, KeyError, TypeError):
+                errors += 1
+                continue
+            approved_batches.append(approved)
+            rejected_total += len(rejected_indexes)
+
+    threshold_reports = {}
+    for threshold in thresholds:
+        with metrics.timed("select_features"):
+            winners = select_features(approved_batches, threshold)
+        threshold_reports[threshold] = {
+            slot: {"score": info["score"], "runners_up": info["runners_up"],
+                   "title": info["article"]["title"] if info["article"] else None}
+            for slot, info in winners.items()
+        }
+
+    written = 0
+    if write and approved_batches:
+        winners = select_features(approved_batches, thresholds[0])
+        slot_updates = [(slot, info["article"]["link"]) for slot, info in winners.items() if info["article"]]
+        now_str = datetime.now(timezone.utc).isoformat()
+        db_articles = []
+        for approved in approved_batches:
+            for art in approved:
+                row = {k: v for k, v in art.items() if k not in ("hero_candidate", "hero_score", "tone")}
+                row["scraped_at"] = now_str
+                db_articles.append(row)
+        post_ids = scraper.save_batch_to_turso(db_articles, slot_updates)
+        written = len(post_ids or {})
+        scraper.close_client()
+
+    elapsed = time.perf_counter() - started
+    data = metrics.summary()
+    approved_count = sum(len(approved) for approved in approved_batches)
+    return {
+        "batches": len(batches) * repeat,
+        "approved": approved_count,
+        "rejected": rejected_total,
+        "malformed_batches": errors,
+        "written": written,
+        "elapsed_s": round(elapsed, 3),
+        "batches_per_s": round(len(batches) * repeat / elapsed, 1) if elapsed else None,
+        "thresholds": threshold_reports,
+        "stages": data["stages"],
+    }
+
+
+def print_report(report: dict) -> None:
+    print("\n==== ⏪ Replay ====")
+    print(f"batches          {report['batches']} ({report['malformed_batches']} malformed)")
+    print(f"articles         {report['approved']} approved, {report['rejected']} rejected, {report['written']} written")
+    print(f"time             {report['elapsed_s']:.3f}s ({report['batches_per_s']} batches/s)")
+    for threshold, slots in report["thresholds"].items():
+        filled = sum(1 for info in slots.values() if info["title"])
+        print(f"threshold > {threshold}: {filled}/{len(slots)} slots filled")
+        for slot, info in slots.items():
+            if info["title"]:
+                print(f"   {slot:<10} score={info['score']:<3} runners-up={info['runners_up']:<2} {info['title'][:60]}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<24} p50={stats['p50_s']:.4f}s p95={stats['p95_s']:.4f}s total={stats['total_s']:.3f}s ×{stats['count']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded curator batches through the post-LLM pipeline.")
+    parser.add_argument("--log", action="append", help="Log file(s) to read (default: everything in scraper/logs)")
+    parser.add_argument("--snapshot", help="Feed snapshot recorded with benchmark.py --record")
+    parser.add_argument("--db", help="libsql URL to write to (default: a throwaway SQLite file)")
+    parser.add_argument("--no-write", action="store_true", help="Skip the DB write stage")
+    parser.add_argument("--threshold", type=int, action="append",
+                        help="Feature score threshold(s) to evaluate; the first is used for writes")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the batches this many times (load testing)")
+    parser.add_argument("--profile", help="Write cProfile stats to this file and print the top entries")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    # Point the scraper at the replay DB and keep replay noise out of the real logs/caches.
+    # Always overridden: a CI-provided cache dir holds the production outbox, which
+    # the first save would otherwise flush into the replay DB.
+    workdir = Path(tempfile.mkdtemp(prefix="vibes-replay-"))
+    os.environ["TURSO_DATABASE_URL"] = prepare_db(args.db, workdir)
+    os.environ["SCRAPER_CACHE_DIR"] = str(workdir / "cache")
+    os.environ["SCRAPER_LOG_DIR"] = str(workdir / "logs")
+    import scraper
+
+    if args.snapshot:
+        batches = load_snapshot_batches(Path(args.snapshot))
+    else:
+        paths = [Path(p) for p in args.log] if args.log else find_log_files(DEFAULT_LOG_DIR)
+        batches = load_recorded_batches(paths)
+    if not batches:
+        print("❌ No recorded curator batches found.")
+        return 1
+    print(f"📼 Loaded {len(batches)} batches.")
+
+    thresholds = args.threshold or [scraper.FEATURE_SCORE_THRESHOLD]
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    report = run_replay(batches, thresholds, max(1, args.repeat), write=not args.no_write)
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+-- Turso schema the scraper writes to. Used to create local SQLite stand-ins
+-- (benchmarks, replays); tables the scraper manages itself such as feed_state
+-- are created on demand and not listed here.
+
+CREATE TABLE IF NOT EXISTS posts (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  title TEXT NOT NULL,
+  link TEXT NOT NULL,
+  source TEXT NOT NULL,
+  category TEXT,
+  teaser TEXT,
+  summary TEXT,
+  image_url TEXT,
+  published_at TEXT,   -- ISO8601 String
+  scraped_at TEXT,     -- ISO8601 String
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Required by the ON CONFLICT(link) upsert
+CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_link ON posts(link);
+-- Newest-first listings, overall and per category (also kept by `scraper.py maintenance`)
+CREATE INDEX IF NOT EXISTS idx_posts_published ON posts(published_at DESC);
+CREATE INDEX IF NOT EXISTS idx_posts_category_published ON posts(category, published_at DESC);
+
+CREATE TABLE IF NOT EXISTS featured_slots (
+  slot_id TEXT PRIMARY KEY,   -- e.g., 'main', 'tech'
+  post_id INTEGER,            -- The ID of the article currently showing (NULL until first rotation)
+  locked_until TEXT,          -- ISO timestamp: When can we rotate this?
+  manual_override INTEGER DEFAULT 0,
+  updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  label TEXT,
+  FOREIGN KEY(post_id) REFERENCES posts(id)
+);
+
+CREATE TABLE IF NOT EXISTS bookmarks (
+  user_id TEXT NOT NULL, -- Comes from Clerk (e.g., 'user_2b...')
+  post_id INTEGER NOT NULL,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (user_id, post_id)
+);
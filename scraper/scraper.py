@@ -1,32 +1,76 @@
 import sys
 import os
+import argparse
+import json
 import time
-import feedparser
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from time import mktime
+from typing import TYPE_CHECKING
 from urllib.parse import urljoin
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
-from curator import analyze_news_batch
+from curator import MAX_PARALLEL_CALLS, analyze_in_batches, analyze_with_split, pack_batches, set_rate_limit_share
+from curator_cache import set_read_only as set_cache_read_only
+from feed_stream import parse_recent_entries
+from feed_state import conditional_headers, ensure_feed_state_table, feed_state_statement, hash_body, load_feed_states
+from html_stage import parse_summaries
+from image_stage import ensure_post_images_table, image_stage_enabled, optimize_images, post_image_statement
+from images import cache_image, fetch_meta_image, get_cached_image, get_session, host_slot, prune_image_cache
+from local_state import CACHE_DIR, write_atomic
 from logger import log_event
-import cloudscraper
-import libsql_client
+from maintenance import ARCHIVE_DIR, RETENTION_DAYS, run_maintenance
+from metrics import incr, print_run_summary, record_time, timed, write_run_summary
+from outbox import enqueue, flush as flush_outbox, pending_count
+from poll_schedule import (due_feeds, ensure_feed_schedule_table, feed_schedule_statements, load_feed_schedules,
+                           record_poll)
+from slot_ranking import SlotCandidates
+from snapshots import export_snapshots
+from sharding import (clear_feature_candidates, ensure_feature_candidates_table, load_best_candidates, parse_shard,
+                      save_feature_candidates, select_shard)
+from seen_links import claim_link, link_status, load_seen_links, remember_rejected, remember_stored, save_seen_links
+from story_index import (assign_story, confirm_stories, ensure_post_sources_table, load_story_index,
+                         post_source_statement, save_story_index)
+
+# Heavy dependencies (libsql_client, cloudscraper, bs4, feedparser, Gemini) are
+# imported where they are first used, so importing this module, --help and the
+# subcommands that don't need them start fast.
+if TYPE_CHECKING:
+    import libsql_client
 
 # Load environment variables
 load_dotenv()
 
 # ---- Turso Setup ----
-url = os.getenv("TURSO_DATABASE_URL")
-token = os.getenv("TURSO_AUTH_TOKEN")
+_client = None
 
-if not url or not token:
-    raise ValueError("❌ Missing TURSO_DATABASE_URL or TURSO_AUTH_TOKEN")
+def get_client():
+    """Creates the sync client (best for scripts) on first use."""
+    global _client
+    if _client is None:
+        url = os.getenv("TURSO_DATABASE_URL")
+        token = os.getenv("TURSO_AUTH_TOKEN")
 
-# Create the sync client (best for scripts)
-client = libsql_client.create_client_sync(url, auth_token=token)
+        # Local SQLite files (file:...) don't need a token
+        if not url or (not token and not url.startswith("file:")):
+            raise ValueError("❌ Missing TURSO_DATABASE_URL or TURSO_AUTH_TOKEN")
+
+        import libsql_client
+        _client = libsql_client.create_client_sync(url, auth_token=token)
+    return _client
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
 
 # ---- Config ----
 FEATURE_ROTATION_HOURS = 8
+FEATURE_SCORE_THRESHOLD = 6   # hero_score (0-10, after penalties) must be above this to take a slot
+FEATURE_TOP_K = 3             # Runners-up kept per slot in case the best one isn't stored
+NO_IMAGE_PENALTY = 5
 FEATURE_SLOTS = {
     "main": {"category": None, "label": "Main Story"},
     "tech": {"category": "Tech", "label": "Tech Highlight"},
@@ -40,6 +84,32 @@ feature_states: dict = {}
 feature_rotation_allowed: dict = {slot: False for slot in FEATURE_SLOTS}
 feature_updated_this_run: dict = {slot: False for slot in FEATURE_SLOTS}
 
+# Every curated article of the run competes for the open slots; the winners are
+# written once all feeds are in. Sharded runs only submit their best per slot and
+# --merge-features rotates.
+slot_candidates = SlotCandidates(FEATURE_TOP_K)
+defer_feature_rotation = False
+
+# Dry runs (and fetch-only) fetch and curate as usual but write nothing to the
+# database or the local state files (seen links, schedules, story index, curator
+# and image caches); fetched/curated articles go to JSON files
+dry_run = False
+FETCHED_ARTICLES_FILE = CACHE_DIR / "fetched_articles.json"
+CURATED_ARTICLES_FILE = CACHE_DIR / "curated_articles.json"
+
+# Conditional GET state per feed URL, loaded once at the start of a run
+feed_states: dict = {}
+unchanged_feeds: list[str] = []
+
+# ---- Concurrency ----
+MAX_CONCURRENT_FEEDS = 8     # Feeds processed at the same time
+DB_WRITE_CHUNK_SIZE = 100    # Rows per multi-row upsert (9 params each, under SQLite's 999)
+
+_feature_lock = threading.Lock()
+_unchanged_lock = threading.Lock()
+
+MAX_ENTRIES_PER_FEED = 8 # Limit to 8 per feed to save tokens
+
 TARGET_FEEDS = [
     # --- TECH & SCIENCE ---
     {"url": "https://it.mk/feed/", "source": "IT.mk"},
@@ -84,7 +154,8 @@ def normalize_image_url(url: str | None, base_link: str | None) -> str | None:
     if not base_link: return url
     return urljoin(base_link, url)
 
-def extract_inline_image(entry, base_link: str | None) -> str | None:
+def extract_inline_image(entry, base_link: str | None, summary_image: str | None = None) -> str | None:
+    """Feed-provided image: media:content, then image enclosures, then the first <img> of the summary."""
     candidates: list[str] = []
     
     # Check media_content (common in standard RSS)
@@ -99,12 +170,9 @@ def extract_inline_image(entry, base_link: str | None) -> str | None:
         if enc.get('type', '').startswith('image/') and enc.get('href'):
             candidates.append(enc['href'])
 
-    # Check HTML summary for <img> tags
-    if entry.get('summary', '').find('<img') != -1:
-        soup = BeautifulSoup(entry.get('summary', ''), 'html.parser')
-        img = soup.find('img')
-        if img and img.get('src'):
-            candidates.append(img['src'])
+    # <img> from the HTML summary (found by process_entries_html)
+    if summary_image:
+        candidates.append(summary_image)
 
     for candidate in candidates:
         normalized = normalize_image_url(candidate, base_link)
@@ -114,35 +182,34 @@ def extract_inline_image(entry, base_link: str | None) -> str | None:
 
 def scrape_image_from_page(article_url: str, scraper) -> str | None:
     if not article_url: return None
-    try:
-        resp = scraper.get(article_url, timeout=10)
-        if resp.status_code != 200: return None
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        
-        # Priority: Open Graph -> Twitter Card -> Article First Image
-        meta_props = [
-            {'property': 'og:image'},
-            {'name': 'twitter:image'},
-        ]
-        for attrs in meta_props:
-            tag = soup.find('meta', attrs=attrs)
-            if tag and tag.get('content'):
-                return normalize_image_url(tag['content'], article_url)
-                
-    except Exception:
-        pass # Fail silently on image scrape
-    return None
 
-def resolve_image_url(entry, scraper) -> str | None:
-    link = entry.get('link')
-    inline = extract_inline_image(entry, link)
-    if inline: return inline
-    return scrape_image_from_page(link, scraper)
-
-def extract_summary_text(entry) -> str:
-    raw = entry.get('summary') or entry.get('description') or ''
-    soup = BeautifulSoup(raw, 'html.parser')
-    return soup.get_text(separator=' ', strip=True)[:500]
+    # Priority: Open Graph -> Twitter Card (cached per article, misses included)
+    hit, cached = get_cached_image(article_url)
+    incr("image_cache_hits" if hit else "image_cache_misses")
+    if hit: return cached
+
+    with host_slot(article_url):
+        image_url, definitive = fetch_meta_image(article_url, scraper)
+    image_url = normalize_image_url(image_url, article_url)
+    if definitive and not dry_run:
+        cache_image(article_url, image_url)
+    return image_url
+
+@timed("resolve_image_url")
+def resolve_image_url(entry, scraper, inline: str | None = None) -> str | None:
+    if inline:
+        incr("images_inline")
+        return inline
+    return scrape_image_from_page(entry.get('link'), scraper)
+
+@timed("process_entries_html")
+def process_entries_html(entries) -> list[tuple[str, str | None]]:
+    """(summary text, inline image) per entry, from a single parse of its summary HTML."""
+    parsed = parse_summaries([entry.get('summary') or entry.get('description') or '' for entry in entries])
+    return [
+        (text, extract_inline_image(entry, entry.get('link'), summary_image))
+        for entry, (text, summary_image) in zip(entries, parsed)
+    ]
 
 # ---- Feature Slot Logic (Turso Version) ----
 
@@ -152,7 +219,7 @@ def ensure_feature_slots():
         # 1. Use '?' for the post_id placeholder
         # 2. Pass None instead of 0 to create a valid NULL entry
         # 3. Use a tuple (...) for arguments, which is safer for some drivers
-        client.execute(
+        get_client().execute(
             "INSERT OR IGNORE INTO featured_slots (slot_id, label, post_id) VALUES (?, ?, ?)", 
             (slot_id, meta['label'], None)
         )
@@ -161,7 +228,7 @@ def ensure_feature_slots():
 def get_feature_state_map():
     """Loads current locks from DB."""
     try:
-        rs = client.execute("SELECT slot_id, locked_until, manual_override FROM featured_slots")
+        rs = get_client().execute("SELECT slot_id, locked_until, manual_override FROM featured_slots")
         state = {}
         for row in rs.rows:
             state[row[0]] = {
@@ -190,55 +257,65 @@ def can_rotate_feature_slot(slot: str):
     except ValueError:
         return True
 
-def lock_feature_story(slot: str, article_link: str):
-    """Updates the featured_slots table to point to the new article."""
-    try:
-        # 1. Get the ID of the newly inserted article
-        rs = client.execute("SELECT id FROM posts WHERE link = ?", [article_link])
-        if not rs.rows:
-            return
-        post_id = rs.rows[0][0]
-
-        # 2. Update the slot
-        new_lock_time = (datetime.now(timezone.utc) + timedelta(hours=FEATURE_ROTATION_HOURS)).isoformat()
-        
-        client.execute(
+def feature_slot_statement(slot: str, article_link: str, guarded: bool = False) -> "libsql_client.Statement":
+    """
+    Points a slot at an article. The post id is resolved by link inside the same
+    batch as the upsert, so no extra SELECT round trip is needed. A guarded
+    update re-checks the lock in SQL and returns the new post id only if it
+    rotated, so a repeated merge can't rotate a slot twice.
+    """
+    import libsql_client
+
+    now = datetime.now(timezone.utc)
+    new_lock_time = (now + timedelta(hours=FEATURE_ROTATION_HOURS)).isoformat()
+    if guarded:
+        return libsql_client.Statement(
             """
-            UPDATE featured_slots 
-            SET post_id = ?, locked_until = ?, updated_at = CURRENT_TIMESTAMP 
-            WHERE slot_id = ?
+            UPDATE featured_slots
+            SET post_id = (SELECT id FROM posts WHERE link = ?), locked_until = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE slot_id = ? AND COALESCE(manual_override, 0) = 0 AND (locked_until IS NULL OR locked_until <= ?)
+              AND EXISTS (SELECT 1 FROM posts WHERE link = ?)
+            RETURNING post_id
             """,
-            [post_id, new_lock_time, slot]
+            [article_link, new_lock_time, slot, now.isoformat(), article_link]
         )
-        print(f"🌟 [{slot}] Rotated to: {post_id}")
-        log_event("feature_rotated", {"slot": slot, "post_id": post_id})
-        
-        # Update local state to prevent double rotation in same run
-        feature_updated_this_run[slot] = True
-        
-    except Exception as e:
-        print(f"⚠️ Failed to lock feature: {e}")
+    return libsql_client.Statement(
+        """
+        UPDATE featured_slots 
+        SET post_id = (SELECT id FROM posts WHERE link = ?), locked_until = ?, updated_at = CURRENT_TIMESTAMP 
+        WHERE slot_id = ?
+        """,
+        [article_link, new_lock_time, slot]
+    )
+
+def record_feature_rotation(slot: str, post_id: int | None):
+    print(f"🌟 [{slot}] Rotated to: {post_id}")
+    log_event("feature_rotated", {"slot": slot, "post_id": post_id})
+    
+    # Update local state to prevent double rotation in same run
+    feature_updated_this_run[slot] = True
 
 # ---- Main Scraping Logic ----
 
-def save_batch_to_turso(articles: list[dict]):
-    """Saves a batch of articles using a Transaction for speed."""
-    if not articles: return
-
-    stmts = []
-    
+def build_upsert_statement(articles: list[dict]) -> "libsql_client.Statement":
+    """One multi-row upsert that returns the id of every inserted or updated row."""
+    import libsql_client
+
+    placeholders = ",\n                ".join(["(?, ?, ?, ?, ?, ?, ?, ?, ?)"] * len(articles))
+    sql = f"""
+        INSERT INTO posts (title, link, source, category, teaser, summary, image_url, published_at, scraped_at)
+        VALUES {placeholders}
+        ON CONFLICT(link) DO UPDATE SET
+            updated_at = CURRENT_TIMESTAMP,
+            summary = excluded.summary,
+            image_url = excluded.image_url
+        RETURNING id, link;
+    """
+
+    params = []
     for art in articles:
-        sql = """
-            INSERT INTO posts (title, link, source, category, teaser, summary, image_url, published_at, scraped_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(link) DO UPDATE SET
-                updated_at = CURRENT_TIMESTAMP,
-                summary = excluded.summary,
-                image_url = excluded.image_url;
-        """
-        
         # Prepare params (handle Nones safely)
-        params = [
+        params.extend([
             art.get("title") or "Untitled",
             art.get("link") or "",
             art.get("source") or "",
@@ -248,124 +325,542 @@ def save_batch_to_turso(articles: list[dict]):
             art.get("image_url"),
             art.get("published_at"),
             art.get("scraped_at")
-        ]
-        
-        stmts.append(libsql_client.Statement(sql, params))
-
+        ])
+    return libsql_client.Statement(sql, params)
+
+@timed("save_batch_to_turso")
+def save_batch_to_turso(articles: list[dict], slot_updates: list[tuple[str, str]] | None = None,
+                        extra_statements: list | None = None,
+                        rotated_slots: dict[str, int | None] | None = None) -> dict[str, int | None] | None:
+    """
+    Upserts every article of the run with multi-row INSERT ... RETURNING, in
+    chunks of DB_WRITE_CHUNK_SIZE. Each chunk is one transaction; the feature
+    slot updates and any extra statements ride along with the last one.
+    The chunks go to the local outbox first and are then pushed to Turso;
+    if the push fails they stay queued for the next run.
+    Slot updates are guarded, since a queued one may reach Turso after an
+    editor pinned the slot. Once pushed, each slot lands in `rotated_slots`
+    with its new post id, or None if the guard kept the slot as it was.
+    Returns {link: post_id} (None while still queued), or None if nothing could be queued.
+    """
+    if not articles and not extra_statements: return {}
+    # A single statement can't upsert the same link twice
+    unique_articles = list({art.get("link") or "": art for art in articles}.values())
+    chunks = [unique_articles[i:i + DB_WRITE_CHUNK_SIZE] for i in range(0, len(unique_articles), DB_WRITE_CHUNK_SIZE)] or [[]]
+
+    writes = []
+    for i, chunk in enumerate(chunks):
+        stmts = [build_upsert_statement(chunk)] if chunk else []
+        if i == len(chunks) - 1:
+            stmts.extend(feature_slot_statement(slot, link, guarded=True) for slot, link in slot_updates or [])
+            stmts.extend(extra_statements or [])
+        writes.append(stmts)
     try:
-        client.batch(stmts)
-        return True
+        outbox_ids = enqueue(writes)
     except Exception as e:
-        print(f"🔥 Turso Batch Error: {e}")
-        return False
-
-def pick_feature_candidate(candidates, target_category):
-    """Finds the best article in the batch for a specific category."""
-    best = None
-    best_score = 0
-    
-    for art in candidates:
-        # If target_category is None, it means "Main" (accept any category)
-        if target_category and art.get("category") != target_category:
-            continue
-            
-        score = int(art.get("hero_score", 0) or 0)
-        if not art.get("image_url"): score -= 5 # Penalize no image
-        
-        if score > best_score and score > 60: # Threshold for quality
-            best_score = score
-            best = art
-            
-    return best
-
-def fetch_and_save_feed(feed_config):
+        print(f"🔥 Outbox Error: {e}")
+        incr("db_write_errors")
+        return None
+
+    pushed = flush_outbox(get_client())
+    post_ids: dict[str, int | None] = {art.get("link") or "": None for art in unique_articles}
+    for outbox_id, chunk in zip(outbox_ids, chunks):
+        result_sets = pushed.get(outbox_id)
+        for post_id, link in result_sets[0].rows if result_sets and chunk else []:
+            post_ids[link] = post_id
+    last_result_sets = pushed.get(outbox_ids[-1])
+    if last_result_sets and rotated_slots is not None:
+        slot_results = last_result_sets[1 if chunks[-1] else 0:][:len(slot_updates or [])]
+        for (slot, _), rs in zip(slot_updates or [], slot_results):
+            rotated_slots[slot] = rs.rows[0][0] if rs.rows else None
+
+    written = sum(post_id is not None for post_id in post_ids.values())
+    incr("posts_written", written)
+    if written < len(post_ids):
+        print(f"📮 {len(post_ids) - written} articles saved locally, Turso gets them on the next sync.")
+        incr("posts_queued", len(post_ids) - written)
+    return post_ids
+
+def feature_score(art) -> int:
+    score = int(art.get("hero_score", 0) or 0)
+    if not art.get("image_url"): score -= NO_IMAGE_PENALTY # Penalize no image
+    return score
+
+def offer_feature_candidates(articles: list[dict]):
+    """Adds curated articles to the run-level top-k of every open slot they qualify for."""
+    for slot, meta in FEATURE_SLOTS.items():
+        if feature_updated_this_run[slot]: continue # Already done this run
+        if not feature_rotation_allowed[slot]: continue # Time hasn't passed
+
+        for art in articles:
+            # If the category is None, it means "Main" (accept any category)
+            if meta['category'] and art.get("category") != meta['category']:
+                continue
+            score = feature_score(art)
+            if score > FEATURE_SCORE_THRESHOLD: # Threshold for quality
+                slot_candidates.offer(slot, score, art['link'])
+
+def select_feature_slots(stored_links: set[str]) -> list[tuple[str, str]]:
+    """(slot, link) for every open slot, taking its best candidate among `stored_links`."""
+    updates = []
+    with _feature_lock:
+        for slot in FEATURE_SLOTS:
+            if feature_updated_this_run[slot] or not feature_rotation_allowed[slot]: continue
+            best = slot_candidates.best(slot, lambda link: link in stored_links)
+            if best:
+                updates.append((slot, best[1]))
+                feature_updated_this_run[slot] = True
+    return updates
+
+def mark_feed_unchanged(source: str, reason: str):
+    print(f"💤 [{source}] {reason}, skipping.")
+    incr("feeds_unchanged", feed=source)
+    with _unchanged_lock:
+        unchanged_feeds.append(source)
+
+def is_known_entry(entry) -> bool:
+    """True if the entry's link (or a permalink GUID) was stored or rejected before."""
+    return any(link_status(key) for key in (entry.get('link'), entry.get('id')) if key)
+
+def fetch_feed_articles(feed_config) -> dict | None:
+    """Fetches one feed and returns its new raw articles, ready for curation."""
     url = feed_config['url']
     source = feed_config['source']
     
     print(f"--- 📡 Fetching {source} ---")
+    started = time.perf_counter()
     
     try:
-        scraper = cloudscraper.create_scraper()
-        resp = scraper.get(url, timeout=20)
+        scraper = get_session()
+        state = feed_states.get(url)
+        with host_slot(url), timed("feed_http", feed=source):
+            resp = scraper.get(url, timeout=20, headers=conditional_headers(state))
+        incr("feed_bytes", len(resp.content), feed=source)
+        if resp.status_code == 304:
+            mark_feed_unchanged(source, "Not modified (304)")
+            record_poll(url)
+            return None
         if resp.status_code != 200:
-            print(f"❌ Status {resp.status_code}")
-            return
-
-        feed = feedparser.parse(resp.content)
-        if not feed.entries:
-            print("❌ No entries.")
-            return
+            print(f"❌ [{source}] Status {resp.status_code}")
+            record_poll(url, failed=True)
+            return None
+
+        # Some servers ignore validators, so compare the body as well
+        body_hash = hash_body(resp.content)
+        if state and state.get("body_hash") == body_hash:
+            mark_feed_unchanged(source, "Body unchanged")
+            record_poll(url)
+            return None
+
+        def remember_feed():
+            if dry_run: return
+            # Pushed with the run's last sync, through the outbox like every other write
+            try:
+                enqueue([[feed_state_statement(url, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), body_hash)]])
+            except Exception as e:
+                print(f"⚠️ Failed to queue feed state for {url}: {e}")
+
+        # Stream the newest entries and stop at ones we already stored or rejected
+        with timed("feed_parse", feed=source):
+            recent_entries = parse_recent_entries(resp.content, MAX_ENTRIES_PER_FEED, is_known_entry)
+        if not recent_entries:
+            print(f"❌ [{source}] No entries.")
+            record_poll(url)
+            remember_feed()
+            return None
+
+        # Drop links already stored, rejected, or taken by another feed this run
+        new_entries = [
+            entry for entry in recent_entries
+            if entry.get('link') and claim_link(entry.get('link'))
+        ]
+        incr("entries_already_seen", len(recent_entries) - len(new_entries), feed=source)
+        record_poll(url, len(new_entries), recent_entries, capped=len(new_entries) == MAX_ENTRIES_PER_FEED)
+        if not new_entries:
+            print(f"💤 [{source}] No new entries.")
+            remember_feed()
+            return None
 
         raw_articles = []
-        for entry in feed.entries[:8]: # Limit to 8 per feed to save tokens
-            img = resolve_image_url(entry, scraper)
-            txt = extract_summary_text(entry)
+        duplicates = []
+        for entry, (txt, inline_image) in zip(new_entries, process_entries_html(new_entries)):
+            title = entry.get('title', 'No Title')
+            link = entry.get('link', '')
+
+            # Another outlet already ran this story: attach it there, skip the image and the curator
+            story_link = assign_story(link, source, title, txt)
+            if story_link:
+                duplicates.append({
+                    "title": title,
+                    "link": link,
+                    "source": source,
+                    "published_at": parse_date(entry),
+                    "story_link": story_link,
+                })
+                continue
+
+            img = resolve_image_url(entry, scraper, inline_image)
             raw_articles.append({
-                "title": entry.get('title', 'No Title'),
-                "link": entry.get('link', ''),
+                "title": title,
+                "link": link,
                 "source": source,
                 "published_at": parse_date(entry),
                 "image_url": img,
                 "summary_text": txt,
             })
 
-        if not raw_articles: return
+        incr("articles_collected", len(raw_articles), feed=source)
+        incr("near_duplicates", len(duplicates), feed=source)
+        return {"source": source, "articles": raw_articles, "duplicates": duplicates, "remember": remember_feed}
 
-        # AI Analysis
-        curated_articles = analyze_news_batch(raw_articles)
-        if not curated_articles: return
+    except Exception as e:
+        print(f"🔥 Critical error on {source}: {e}")
+        incr("feed_errors", feed=source)
+        record_poll(url, failed=True)
+        return None
+    finally:
+        record_time("fetch_feed_articles", time.perf_counter() - started, source)
+
+def prepare_feed_results(feed_result: dict, curated_articles: list[dict], rejected_links: set[str]) -> dict | None:
+    """Stamps the curated articles of one feed, offers them for feature slots and strips AI-only keys."""
+    source = feed_result['source']
+    raw_articles = feed_result['articles']
+
+    if not curated_articles:
+        # Everything was rejected (as opposed to a curator failure)
+        if not feed_result['duplicates'] and all(art['link'] in rejected_links for art in raw_articles):
+            feed_result['remember']()
+        return None
+
+    # Add timestamp
+    now_str = datetime.now(timezone.utc).isoformat()
+    for a in curated_articles:
+        a["scraped_at"] = now_str
+
+    # Offer feature candidates BEFORE removing internal keys
+    offer_feature_candidates(curated_articles)
+
+    # Clean up AI internal keys before saving
+    db_ready_articles = []
+    
+    for art in curated_articles:
+        # Remove AI scoring keys that aren't in DB
+        art.pop("hero_candidate", None)
+        art.pop("hero_score", None)
+        art.pop("tone", None)
+        
+        db_ready_articles.append(art)
+
+    return {
+        "feed": feed_result,
+        "source": source,
+        "articles": db_ready_articles,
+        "rejected": rejected_links,
+    }
+
+def save_run_results(prepared: list[dict], duplicates: list[dict] | None = None, rejected_links: set[str] | None = None):
+    """Writes every prepared feed in one go and then updates the run bookkeeping."""
+    prepared = [p for p in prepared if p]
+    duplicates = duplicates or []
+    rejected_links = rejected_links or set()
+    if not prepared and not duplicates: return
+
+    articles = [art for p in prepared for art in p['articles']]
+    # Slot winners are picked once per run and ride along with the same write
+    slots_to_update = [] if defer_feature_rotation else select_feature_slots({art['link'] for art in articles})
+    if dry_run:
+        print(f"🧪 Dry run: would save {len(articles)} articles from {len(prepared)} feeds "
+              f"and fold {len(duplicates)} near-duplicates.")
+        for slot, link in slots_to_update:
+            print(f"🧪 Dry run: [{slot}] would rotate to {link}")
+        log_event("dry_run", {"articles": len(articles), "duplicates": len(duplicates), "slots": dict(slots_to_update)})
+        return
+    confirm_stories(rejected_links)
+
+    # Save to Turso; near-duplicates and image derivatives are linked to their posts in the same write
+    extra_statements = [post_source_statement(d) for d in duplicates]
+    if image_stage_enabled():
+        extra_statements.extend(post_image_statement(link, record) for link, record in optimize_images(articles).items())
+    rotated_slots: dict[str, int | None] = {}
+    post_ids = save_batch_to_turso(articles, slots_to_update, extra_statements, rotated_slots)
+
+    if post_ids is None:
+        # Release the claimed slots so a later run can take them
+        with _feature_lock:
+            for slot, _ in slots_to_update:
+                feature_updated_this_run[slot] = False
+        return
+
+    if articles:
+        print(f"✅ Saved {len(post_ids)} articles from {len(prepared)} feeds.")
+    # Only links Turso confirmed count as stored. Queued ones are fetched again by a
+    # later run (their verdicts and images are cached), so an article whose write
+    # ends up parked in the outbox is queued afresh instead of being lost.
+    stored_links = [link for link, post_id in post_ids.items() if post_id is not None]
+    remember_stored(stored_links)
+    confirm_stories(stored_links)
+    for slot, _ in slots_to_update:
+        if slot not in rotated_slots:
+            print(f"📮 [{slot}] Rotation queued with the run's write.")
+        elif rotated_slots[slot] is None:
+            print(f"🔒 Slot [{slot}] was locked or pinned in the meantime.")
+        else:
+            record_feature_rotation(slot, rotated_slots[slot])
+
+    # A duplicate is settled once its story is stored or rejected; otherwise it's retried next run
+    settled_duplicates = set()
+    for dup in duplicates:
+        status = link_status(dup['story_link'])
+        if status == "stored":
+            remember_stored([dup['link']])
+        elif status == "rejected":
+            remember_rejected([dup['link']])
+        else:
+            continue
+        settled_duplicates.add(dup['link'])
+    if duplicates:
+        print(f"🧬 Folded {len(settled_duplicates)}/{len(duplicates)} near-duplicates into existing stories.")
+        log_event("near_duplicates", {"count": len(duplicates), "settled": len(settled_duplicates),
+                                      "links": {d['link']: d['story_link'] for d in duplicates}})
+
+    for p in prepared:
+        # Only a fully processed feed may be skipped next time
+        feed = p['feed']
+        processed = set(stored_links) | p['rejected']
+        if all(art['link'] in processed for art in feed['articles']) and \
+                all(dup['link'] in settled_duplicates for dup in feed['duplicates']):
+            feed['remember']()
 
-        # Add timestamp
-        now_str = datetime.now(timezone.utc).isoformat()
-        for a in curated_articles:
-            a["scraped_at"] = now_str
+def fetch_and_save_feed(feed_config):
+    """Runs the whole pipeline for a single feed."""
+    feed_result = fetch_feed_articles(feed_config)
+    if not feed_result: return
+
+    rejected_links: list[str] = []
+    curated_articles = analyze_in_batches(feed_result['articles'], rejected_links)
+    remember_rejected(rejected_links)
+    rejected_set = set(rejected_links)
+    save_run_results([prepare_feed_results(feed_result, curated_articles, rejected_set)],
+                     feed_result['duplicates'], rejected_set)
+
+def run_feeds(feed_configs: list[dict]):
+    """
+    Fetches all feeds concurrently and curates their articles in shared batches.
+    Full batches go to the curator while slower feeds are still downloading.
+    """
+    feed_results = []
+    curation_futures = []
+    rejected_links: list[str] = []
+    buffered: list[dict] = []
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FEEDS) as fetch_pool, \
+            ThreadPoolExecutor(max_workers=MAX_PARALLEL_CALLS) as curate_pool:
+        futures = [fetch_pool.submit(fetch_feed_articles, config) for config in feed_configs]
+        for future in as_completed(futures):
+            feed_result = future.result()
+            if not feed_result: continue
+            feed_results.append(feed_result)
+
+            # Dispatch every full batch, keep the last partial one buffered
+            batches = pack_batches(buffered + feed_result['articles'])
+            buffered = batches.pop() if batches else []
+            for batch in batches:
+                curation_futures.append(curate_pool.submit(analyze_with_split, batch, rejected_links))
+
+        if buffered:
+            curation_futures.append(curate_pool.submit(analyze_with_split, buffered, rejected_links))
+
+        curated_articles = [art for f in curation_futures for art in f.result()]
+
+    remember_rejected(rejected_links)
+    if curation_futures:
+        print(f"🧠 Curated {sum(len(r['articles']) for r in feed_results)} articles in {len(curation_futures)} batches.")
+
+    # Route curated articles back to the feed they came from
+    curated_by_link = {art['link']: art for art in curated_articles}
+    rejected_set = set(rejected_links)
+    prepared = []
+    for feed_result in feed_results:
+        feed_curated = [curated_by_link[art['link']] for art in feed_result['articles'] if art['link'] in curated_by_link]
+        prepared.append(prepare_feed_results(feed_result, feed_curated, rejected_set))
+
+    # One write for the whole run (or a few chunks) instead of one per feed
+    duplicates = [dup for feed_result in feed_results for dup in feed_result['duplicates']]
+    save_run_results(prepared, duplicates, rejected_set)
+
+def write_articles_file(path: Path, payload: dict):
+    """Writes a fetch-only/curate-only handoff file atomically."""
+    write_atomic(path, json.dumps(payload, ensure_ascii=False, indent=2))
+
+def fetch_only(feed_configs: list[dict], path: Path):
+    """Fetches the feeds and writes their new raw articles to `path`, without curating them."""
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FEEDS) as fetch_pool:
+        feed_results = [r for r in fetch_pool.map(fetch_feed_articles, feed_configs) if r]
+
+    articles = [art for r in feed_results for art in r['articles']]
+    duplicates = [dup for r in feed_results for dup in r['duplicates']]
+    write_articles_file(path, {
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+        "articles": articles,
+        "duplicates": duplicates,
+    })
+    print(f"📦 Wrote {len(articles)} new articles ({len(duplicates)} near-duplicates) to {path}.")
+
+def curate_only(path: Path, out_path: Path):
+    """Curates the articles of a fetch-only file and writes the verdicts to `out_path`. Needs no database."""
+    try:
+        articles = json.loads(path.read_text(encoding="utf-8"))["articles"]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Can't read fetched articles from {path}: {e}")
+        return
+
+    rejected_links: list[str] = []
+    curated = analyze_in_batches(articles, rejected_links)
+    write_articles_file(out_path, {
+        "curated_at": datetime.now(timezone.utc).isoformat(),
+        "articles": curated,
+        "rejected": rejected_links,
+    })
+    print(f"🧠 Curated {len(articles)} articles: {len(curated)} kept, {len(rejected_links)} rejected -> {out_path}.")
+
+def merge_feature_candidates(run_id: str):
+    """Rotates each open slot to the best candidate any shard of the run found."""
+    global feature_states
+    ensure_feature_candidates_table(get_client())
+    feature_states = get_feature_state_map()
+    best = load_best_candidates(get_client(), run_id)
+    print(f"🧩 Merging feature candidates of run {run_id} ({len(best)} slots with candidates).")
 
-        # Check for Feature Rotation BEFORE removing internal keys
-        for slot, meta in FEATURE_SLOTS.items():
-            if feature_updated_this_run[slot]: continue # Already done this run
-            if not feature_rotation_allowed[slot]: continue # Time hasn't passed
-            
-            candidate = pick_feature_candidate(curated_articles, meta['category'])
-            if candidate:
-                # We defer the lock until after we save to DB so we have an ID
-                # We attach the slot request to the article object temporarily
-                candidate["_target_slot"] = slot
-
-        # Clean up AI internal keys before saving
-        db_ready_articles = []
-        slots_to_update = []
-        
-        for art in curated_articles:
-            target_slot = art.pop("_target_slot", None)
-            
-            # Remove AI scoring keys that aren't in DB
-            art.pop("hero_candidate", None)
-            art.pop("hero_score", None)
-            art.pop("tone", None)
-            
-            db_ready_articles.append(art)
-            if target_slot:
-                slots_to_update.append((target_slot, art['link']))
+    for slot in FEATURE_SLOTS:
+        candidate = best.get(slot)
+        if not candidate: continue
+        if not can_rotate_feature_slot(slot):
+            print(f"🔒 Slot [{slot}] is locked.")
+            continue
+        try:
+            rs = get_client().execute(feature_slot_statement(slot, candidate['link'], guarded=True))
+        except Exception as e:
+            print(f"🔥 Failed to rotate [{slot}]: {e}")
+            continue
+        if rs.rows:
+            record_feature_rotation(slot, rs.rows[0][0])
 
-        # Save to Turso
-        success = save_batch_to_turso(db_ready_articles)
-        
-        # If save successful, update feature slots
-        if success:
-            print(f"✅ Saved {len(db_ready_articles)} articles.")
-            for slot, link in slots_to_update:
-                lock_feature_story(slot, link)
+    clear_feature_candidates(get_client(), run_id)
 
-    except Exception as e:
-        print(f"🔥 Critical error on {source}: {e}")
+COMMANDS = {
+    "run": "fetch, curate and store (default)",
+    "fetch-only": "fetch the due feeds and write their new articles to --articles; no curation, no DB writes",
+    "curate-only": "curate the articles in --articles and write the verdicts to --curated; no fetching, no DB",
+    "dry-run": "fetch and curate, print what would be stored, write nothing",
+    "maintenance": "archive and/or delete (--phase) posts older than --retention-days, ensure indexes, reclaim space",
+}
 
-def main():
-    global feature_states, feature_rotation_allowed
-    print(f"🚀 Scraper started at {datetime.now()}")
-    
-    ensure_feature_slots()
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fetches, curates and stores the Vibes news feeds.",
+        epilog="commands: " + "; ".join(f"{name}: {help}" for name, help in COMMANDS.items()),
+    )
+    parser.add_argument("command", nargs="?", default="run", choices=list(COMMANDS), help="What to run (default: run)")
+    parser.add_argument("--shard", help="Only process shard INDEX/COUNT of TARGET_FEEDS, e.g. 2/4")
+    parser.add_argument("--run-id", default=os.getenv("GITHUB_RUN_ID") or datetime.now(timezone.utc).strftime("%Y%m%d%H"),
+                        help="Groups the shards of one run for --merge-features (default: GITHUB_RUN_ID or the UTC hour)")
+    parser.add_argument("--merge-features", action="store_true",
+                        help="Rotate feature slots to the best candidates the shards of --run-id found, then exit")
+    parser.add_argument("--articles", type=Path, default=FETCHED_ARTICLES_FILE,
+                        help="Raw articles written by fetch-only and read by curate-only")
+    parser.add_argument("--curated", type=Path, default=CURATED_ARTICLES_FILE,
+                        help="Where curate-only writes the curated articles")
+    parser.add_argument("--retention-days", type=int, default=RETENTION_DAYS,
+                        help=f"maintenance: archive posts older than this (default: {RETENTION_DAYS})")
+    parser.add_argument("--archive-dir", type=Path, default=ARCHIVE_DIR,
+                        help="maintenance: where the posts-YYYY-MM.<run>.jsonl.gz archives go")
+    parser.add_argument("--phase", choices=("archive", "delete", "all"), default="all",
+                        help="maintenance: only write the archive, only delete the posts already in --archive-dir, "
+                             "or both (default)")
+    args = parser.parse_args(argv)
+    if args.shard:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+def sync_run_state():
+    """Queues the run's feed schedules and pushes everything still in the outbox."""
+    try:
+        statements = feed_schedule_statements()
+        if statements:
+            enqueue([statements])
+    except Exception as e:
+        print(f"⚠️ Failed to queue feed schedules: {e}")
+    flush_outbox(get_client())
+
+def load_run_state(read_only: bool = False):
+    """
+    Loads slot locks, feed states, schedules, seen links and story fingerprints.
+    Read-only runs create nothing. If Turso is unreachable the run goes on from
+    the local state: every read falls back to it and writes stay in the outbox.
+    """
+    global feature_states, feed_states
+    if not read_only:
+        client = get_client()  # A missing URL or token is a setup error, not an outage
+        try:
+            ensure_feature_slots()
+            ensure_feed_state_table(client)
+            ensure_feed_schedule_table(client)
+            ensure_post_sources_table(client)
+            if image_stage_enabled():
+                ensure_post_images_table(client)
+            if defer_feature_rotation:
+                ensure_feature_candidates_table(client)
+        except Exception as e:
+            print(f"⚠️ Turso unavailable, running on local state ({e}).")
+            incr("db_unavailable")
+        else:
+            # Writes a previous run couldn't push go first, so the reads below include them
+            flush_outbox(client)
     feature_states = get_feature_state_map()
-    
+    feed_states = load_feed_states(get_client())
+    load_feed_schedules(get_client())
+    print(f"🧾 Loaded {load_seen_links(get_client())} seen links.")
+    print(f"🧬 Loaded {load_story_index()} recent story fingerprints.")
+
+def main(argv=None):
+    global feature_rotation_allowed, defer_feature_rotation, dry_run
+    args = parse_args(argv)
+    print(f"🚀 Scraper started at {datetime.now()}")
+
+    if args.merge_features:
+        merge_feature_candidates(args.run_id)
+        export_snapshots(get_client())  # Shards leave the export to the merge, which sees every write
+        close_client()
+        sys.exit(0)
+
+    if args.command == "maintenance":
+        run_maintenance(get_client(), args.retention_days, args.archive_dir, args.phase)
+        close_client()
+        sys.exit(0)
+
+    if args.command == "curate-only":
+        # Only the curator is loaded: no feeds, no HTML parsing, no database
+        curate_only(args.articles, args.curated)
+        sys.exit(0)
+
+    dry_run = args.command in ("dry-run", "fetch-only")
+    if dry_run:
+        set_cache_read_only(True)
+        print(f"🧪 {args.command}: nothing will be written to the database.")
+
+    feeds = TARGET_FEEDS
+    shard_index, shard_count = args.shard or (1, 1)
+    if shard_count > 1:
+        feeds = select_shard(TARGET_FEEDS, shard_index, shard_count)
+        defer_feature_rotation = True
+        set_rate_limit_share(1 / shard_count)  # The Gemini quota is per key, not per runner
+        print(f"🧩 Shard {shard_index}/{shard_count}: {len(feeds)}/{len(TARGET_FEEDS)} feeds (run {args.run_id}).")
+
+    load_run_state(read_only=dry_run)
+
     # Calculate if we are allowed to rotate
     for slot in FEATURE_SLOTS:
         feature_rotation_allowed[slot] = can_rotate_feature_slot(slot)
@@ -374,12 +869,43 @@ def main():
         else:
             print(f"🔒 Slot [{slot}] is locked.")
 
-    for config in TARGET_FEEDS:
-        fetch_and_save_feed(config)
-        
-    print("🏁 Done.")
+    # Feeds run concurrently; a slow feed no longer holds up the rest
+    started = time.monotonic()
+    feeds_due, feeds_waiting = due_feeds(feeds)
+    if feeds_waiting:
+        print(f"⏭️ {len(feeds_waiting)}/{len(feeds)} feeds are not due yet.")
+    incr("feeds_not_due", len(feeds_waiting))
+    log_event("feeds_not_due", {"count": len(feeds_waiting), "sources": sorted(f['source'] for f in feeds_waiting)})
+    if args.command == "fetch-only":
+        fetch_only(feeds_due, args.articles)
+    else:
+        run_feeds(feeds_due)
+
+    if unchanged_feeds:
+        print(f"💤 Skipped {len(unchanged_feeds)}/{len(feeds_due)} unchanged feeds.")
+    log_event("feeds_unchanged", {"count": len(unchanged_feeds), "sources": sorted(unchanged_feeds)})
+    if defer_feature_rotation and not dry_run:
+        # Only candidates that actually made it into posts can win the merge
+        stored = {}
+        for slot in FEATURE_SLOTS:
+            best = slot_candidates.best(slot, lambda link: link_status(link) == "stored")
+            if best:
+                stored[slot] = {"link": best[1], "score": best[0]}
+        save_feature_candidates(get_client(), args.run_id, shard_index, stored)
+        print(f"🧩 Submitted {len(stored)} feature candidates for the merge step.")
+    if not dry_run:
+        sync_run_state()
+        save_seen_links()
+        save_story_index()
+        if not defer_feature_rotation:
+            export_snapshots(get_client())
+        prune_image_cache()
+        log_event("outbox", {"pending": pending_count()})
+
+    print_run_summary(write_run_summary())
+    print(f"🏁 Done in {time.monotonic() - started:.1f}s.")
     try:
-        client.close()
+        close_client()
         print("🔌 Database connection closed.")
     except Exception as e:
         print(f"⚠️ Error closing DB: {e}")
@@ -0,0 +1,120 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+from local_state import CACHE_DIR, write_atomic
+from maintenance import RETENTION_DAYS
+
+# Links we already stored or the curator already rejected. Loaded in bulk once
+# per run so known entries never reach the image scraper or Gemini again.
+# Stored links are forgotten once their posts are past the retention window
+# (maintenance archives them by then, and feeds no longer carry them).
+
+SEEN_LINKS_FILE = CACHE_DIR / "seen_links.json"
+
+REJECTED_TTL_DAYS = 30  # Give rejected stories another chance after a month
+STORED_TTL_DAYS = RETENTION_DAYS
+
+_stored_links: dict[str, str] = {}    # link -> ISO timestamp of when it was stored
+_rejected_links: dict[str, str] = {}  # link -> ISO timestamp of the rejection
+_claimed_links: set[str] = set()      # Links taken by a feed during this run
+_lock = threading.Lock()
+
+
+def load_seen_links(client) -> int:
+    """Loads every stored link from `posts` plus the local on-disk copy."""
+    _load_local_copy()
+
+    # posts.created_at is SQLite's CURRENT_TIMESTAMP: UTC, "YYYY-MM-DD HH:MM:SS"
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=STORED_TTL_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    now_str = datetime.now(timezone.utc).isoformat()
+    try:
+        rs = client.execute("SELECT link, created_at FROM posts WHERE created_at IS NULL OR created_at >= ?", [cutoff])
+        with _lock:
+            for link, created_at in rs.rows:
+                if link:
+                    _stored_links.setdefault(link, _stored_at(created_at) or now_str)
+    except Exception as e:
+        print(f"⚠️ Failed to load seen links from DB, using local copy only: {e}")
+
+    return len(_stored_links) + len(_rejected_links)
+
+
+def _load_local_copy() -> None:
+    if not SEEN_LINKS_FILE.exists():
+        return
+    try:
+        data = json.loads(SEEN_LINKS_FILE.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable {SEEN_LINKS_FILE.name}: {e}")
+        return
+
+    now = datetime.now(timezone.utc)
+    stored = data.get("stored") or {}
+    if isinstance(stored, list):
+        # Written before stored links had timestamps: their window starts now
+        stored = dict.fromkeys(stored, now.isoformat())
+    stored_cutoff = (now - timedelta(days=STORED_TTL_DAYS)).isoformat()
+    rejected_cutoff = (now - timedelta(days=REJECTED_TTL_DAYS)).isoformat()
+    with _lock:
+        for link, stored_at in stored.items():
+            if stored_at >= stored_cutoff:
+                _stored_links[link] = stored_at
+        for link, rejected_at in (data.get("rejected") or {}).items():
+            if rejected_at >= rejected_cutoff:
+                _rejected_links[link] = rejected_at
+
+
+def _stored_at(created_at: str | None) -> str | None:
+    """posts.created_at as an ISO timestamp like the local copy's, or None if it can't be read."""
+    try:
+        return datetime.fromisoformat(created_at).replace(tzinfo=timezone.utc).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def claim_link(link: str | None) -> bool:
+    """Returns True if the link is new and no other feed took it this run."""
+    if not link:
+        return True
+    with _lock:
+        if link in _stored_links or link in _rejected_links or link in _claimed_links:
+            return False
+        _claimed_links.add(link)
+        return True
+
+
+def link_status(link: str) -> str | None:
+    """"stored", "rejected" or None for a link we know nothing about."""
+    with _lock:
+        if link in _stored_links:
+            return "stored"
+        if link in _rejected_links:
+            return "rejected"
+    return None
+
+
+def remember_stored(links: list[str]) -> None:
+    now_str = datetime.now(timezone.utc).isoformat()
+    with _lock:
+        for link in links:
+            if link:
+                _stored_links.setdefault(link, now_str)
+
+
+def remember_rejected(links: list[str]) -> None:
+    now_str = datetime.now(timezone.utc).isoformat()
+    with _lock:
+        for link in links:
+            if link:
+                _rejected_links[link] = now_str
+
+
+def save_seen_links() -> None:
+    """Writes the local copy atomically so a killed run can't corrupt it."""
+    try:
+        with _lock:
+            data = {"stored": dict(sorted(_stored_links.items())), "rejected": dict(_rejected_links)}
+        write_atomic(SEEN_LINKS_FILE, json.dumps(data, ensure_ascii=False))
+    except Exception as e:
+        print(f"⚠️ Failed to save seen links: {e}")
@@ -0,0 +1,95 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+# Sharded runs: `scraper.py --shard 2/4` only processes the feeds whose URL
+# hashes to shard 2 of 4, so a matrix of runners can split TARGET_FEEDS.
+# Shards don't rotate feature slots themselves; each one records its best
+# candidate per slot in feature_candidates and a single merge step
+# (`scraper.py --merge-features`) picks the winner across shards.
+
+CANDIDATE_RETENTION_DAYS = 2  # Candidates of runs whose merge never happened
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """'2/4' -> (2, 4). Shards are numbered from 1."""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected INDEX/COUNT such as 2/4")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}', INDEX must be between 1 and COUNT")
+    return index, count
+
+
+def shard_of(feed_url: str, count: int) -> int:
+    """Stable across runs, machines and Python versions (unlike hash())."""
+    digest = hashlib.sha1(feed_url.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def select_shard(feed_configs: list[dict], index: int, count: int) -> list[dict]:
+    return [config for config in feed_configs if shard_of(config["url"], count) == index]
+
+
+def ensure_feature_candidates_table(client) -> None:
+    """Creates the feature_candidates table if it doesn't exist yet."""
+    client.execute(
+        """
+        CREATE TABLE IF NOT EXISTS feature_candidates (
+            run_id TEXT NOT NULL,
+            slot_id TEXT NOT NULL,
+            shard INTEGER NOT NULL,
+            link TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            created_at TEXT,
+            PRIMARY KEY (run_id, slot_id, shard)
+        )
+        """
+    )
+
+
+def save_feature_candidates(client, run_id: str, shard: int, candidates: dict[str, dict]) -> None:
+    """Stores this shard's best {slot: {"link", "score"}} in one batch."""
+    if not candidates:
+        return
+    now_str = datetime.now(timezone.utc).isoformat()
+    import libsql_client
+
+    try:
+        client.batch([
+            libsql_client.Statement(
+                """
+                INSERT INTO feature_candidates (run_id, slot_id, shard, link, score, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(run_id, slot_id, shard) DO UPDATE SET
+                    link = excluded.link,
+                    score = excluded.score,
+                    created_at = excluded.created_at
+                """,
+                [run_id, slot, shard, candidate["link"], candidate["score"], now_str],
+            )
+            for slot, candidate in candidates.items()
+        ])
+    except Exception as e:
+        print(f"⚠️ Failed to save feature candidates: {e}")
+
+
+def load_best_candidates(client, run_id: str) -> dict[str, dict]:
+    """Best candidate per slot across every shard of a run (ties go to the lowest link)."""
+    rs = client.execute(
+        "SELECT slot_id, link, score FROM feature_candidates WHERE run_id = ? ORDER BY score DESC, link ASC",
+        [run_id],
+    )
+    best: dict[str, dict] = {}
+    for slot, link, score in rs.rows:
+        best.setdefault(slot, {"link": link, "score": score})
+    return best
+
+
+def clear_feature_candidates(client, run_id: str) -> None:
+    """Drops the merged run's candidates and any stale ones left by failed merges."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=CANDIDATE_RETENTION_DAYS)).isoformat()
+    try:
+        client.execute("DELETE FROM feature_candidates WHERE run_id = ? OR created_at < ?", [run_id, cutoff])
+    except Exception as e:
+        print(f"⚠️ Failed to clear feature candidates: {e}")
@@ -0,0 +1,45 @@
+import heapq
+import itertools
+import threading
+
+# Run-level feature slot selection: every curated article of the run is offered
+# to each slot it qualifies for, and only the k best per slot are kept. Slots
+# are decided once all feeds are in, so the best story wins rather than the
+# first feed that happened to have a candidate.
+
+
+class SlotCandidates:
+    """Thread-safe running top-k of (score, link) per slot. Ties keep the earlier offer."""
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heaps: dict[str, list[tuple[int, int, str]]] = {}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def offer(self, slot: str, score: int, link: str) -> None:
+        # Min-heap on (score, -order): the root is the weakest, latest candidate
+        item = (score, -next(self._order), link)
+        with self._lock:
+            heap = self._heaps.setdefault(slot, [])
+            if len(heap) < self.k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    def ranked(self, slot: str) -> list[tuple[int, str]]:
+        """(score, link) from best to worst."""
+        with self._lock:
+            items = sorted(self._heaps.get(slot, []), reverse=True)
+        return [(score, link) for score, _, link in items]
+
+    def best(self, slot: str, accept=None) -> tuple[int, str] | None:
+        """The best candidate whose link passes `accept` (e.g. "was stored")."""
+        for score, link in self.ranked(slot):
+            if accept is None or accept(link):
+                return score, link
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heaps.clear()
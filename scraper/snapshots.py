@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from local_state import write_atomic
+from metrics import incr, timed
+
+# Static JSON snapshots of what the frontend shows, exported after each run's
+# writes: the homepage, every category (paginated) and the resolved feature
+# slots. Files are named by a hash of their content, so unchanged pages keep
+# their URL and can be cached forever; index.json (short cache) maps each view
+# to its current file. Every file is written atomically, the index last, so a
+# reader never sees a half-written snapshot or an index pointing at nothing.
+
+SNAPSHOT_DIR = Path(os.getenv("SCRAPER_SNAPSHOT_DIR") or Path(__file__).resolve().parent / "snapshots")
+INDEX_FILE = "index.json"
+SNAPSHOT_VERSION = 1
+
+CATEGORIES = ("Tech", "Culture", "Lifestyle", "Business", "Sports")
+HOMEPAGE_SIZE = 20            # Same as the homepage query
+PAGE_SIZE = 20
+MAX_CATEGORY_PAGES = 10
+HASH_CHARS = 12
+RETENTION_HOURS = 6           # Unreferenced files stay this long for readers holding an older index
+
+POST_FIELDS = ("id", "title", "link", "source", "category", "teaser", "summary", "image_url", "published_at")
+_POST_COLUMNS = ", ".join(f"p.{field}" for field in POST_FIELDS)
+
+
+def _post(row) -> dict:
+    """Row of _POST_COLUMNS as a dict, leaving out empty fields to keep files small."""
+    return {field: value for field, value in zip(POST_FIELDS, row) if value is not None}
+
+
+def _query_statements() -> list:
+    import libsql_client
+
+    statements = [
+        libsql_client.Statement(
+            f"SELECT {_POST_COLUMNS} FROM posts p ORDER BY p.published_at DESC LIMIT ?", [HOMEPAGE_SIZE]
+        ),
+        libsql_client.Statement(
+            f"""
+            SELECT f.slot_id, f.label, {_POST_COLUMNS}
+            FROM featured_slots f LEFT JOIN posts p ON p.id = f.post_id
+            ORDER BY f.slot_id
+            """
+        ),
+    ]
+    statements.extend(
+        libsql_client.Statement(
+            f"SELECT {_POST_COLUMNS} FROM posts p WHERE p.category = ? ORDER BY p.published_at DESC LIMIT ?",
+            [category, PAGE_SIZE * MAX_CATEGORY_PAGES],
+        )
+        for category in CATEGORIES
+    )
+    return statements
+
+
+def build_snapshots(client) -> dict[str, dict]:
+    """{view name: payload} for every snapshot, read in a single round trip."""
+    home_rs, featured_rs, *category_results = client.batch(_query_statements())
+
+    snapshots = {"home": {"version": SNAPSHOT_VERSION, "posts": [_post(row) for row in home_rs.rows]}}
+    snapshots["featured"] = {
+        "version": SNAPSHOT_VERSION,
+        "slots": {
+            row[0]: {"label": row[1], "post": _post(row[2:]) if row[2] is not None else None}
+            for row in featured_rs.rows
+        },
+    }
+
+    for category, rs in zip(CATEGORIES, category_results):
+        posts = [_post(row) for row in rs.rows]
+        pages = [posts[i:i + PAGE_SIZE] for i in range(0, len(posts), PAGE_SIZE)] or [[]]
+        for number, page in enumerate(pages, start=1):
+            snapshots[f"{category.lower()}-{number}"] = {
+                "version": SNAPSHOT_VERSION,
+                "category": category,
+                "page": number,
+                "pages": len(pages),
+                "posts": page,
+            }
+    return snapshots
+
+
+def write_snapshot(name: str, payload: dict, directory: Path = SNAPSHOT_DIR) -> tuple[str, bool]:
+    """Writes `<name>.<content hash>.json` unless it already exists. Returns (file name, written)."""
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    file_name = f"{name}.{hashlib.sha256(data).hexdigest()[:HASH_CHARS]}.json"
+    path = directory / file_name
+    if path.exists():
+        os.utime(path)  # Still referenced: restart its retention clock
+        return file_name, False
+    write_atomic(path, data)
+    return file_name, True
+
+
+def prune_snapshots(keep: set[str], directory: Path = SNAPSHOT_DIR) -> int:
+    """Deletes snapshot files no index has referenced for RETENTION_HOURS."""
+    cutoff = time.time() - RETENTION_HOURS * 3600
+    removed = 0
+    for path in directory.glob("*.json"):
+        if path.name == INDEX_FILE or path.name in keep:
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+@timed("export_snapshots")
+def export_snapshots(client, directory: Path = SNAPSHOT_DIR) -> dict | None:
+    """Builds and writes every snapshot plus index.json. Returns the index, or None on failure."""
+    try:
+        snapshots = build_snapshots(client)
+    except Exception as e:
+        print(f"⚠️ Failed to read data for snapshots: {e}")
+        return None
+
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        files = {}
+        written = 0
+        for name, payload in snapshots.items():
+            files[name], is_new = write_snapshot(name, payload, directory)
+            written += is_new
+
+        index = {
+            "version": SNAPSHOT_VERSION,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "home": files["home"],
+            "featured": files["featured"],
+            "categories": {},
+        }
+        for category in CATEGORIES:
+            key = category.lower()
+            pages = snapshots[f"{key}-1"]["pages"]
+            index["categories"][category] = {
+                "pages": [files[f"{key}-{n}"] for n in range(1, pages + 1)],
+                "page_size": PAGE_SIZE,
+            }
+        write_atomic(directory / INDEX_FILE, json.dumps(index, ensure_ascii=False, indent=2))
+        removed = prune_snapshots(set(files.values()), directory)
+    except Exception as e:
+        print(f"⚠️ Failed to write snapshots: {e}")
+        return None
+
+    incr("snapshot_files_written", written)
+    print(f"🗂️ Exported {len(files)} snapshots ({written} changed, {removed} pruned) to {directory}.")
+    return index
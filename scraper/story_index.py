@@ -0,0 +1,188 @@
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from datetime import datetime, timedelta, timezone
+
+from local_state import CACHE_DIR, write_atomic
+
+# Near-duplicate detection across outlets. Agencies' copy (MIA, Makfax...) is
+# republished by several feeds within minutes, so every article gets a 64-bit
+# SimHash of its normalized title + summary. Articles within
+# MAX_HAMMING_DISTANCE bits of a known story are attached to it instead of
+# being curated and stored again. The index is kept on disk so a developing
+# story still matches the version stored by an earlier run.
+
+STORY_INDEX_FILE = CACHE_DIR / "story_index.json"
+
+FINGERPRINT_BITS = 64
+MAX_HAMMING_DISTANCE = 6   # Unrelated stories sit around 32 bits apart
+BAND_BITS = 8              # 8 bands: any match within 7 bits shares at least one band
+STORY_TTL_HOURS = 48       # Older stories no longer absorb new articles
+MIN_FEATURES = 6           # Too little text to fingerprint reliably (e.g. "Временска прогноза")
+TITLE_WEIGHT = 2
+STEM_CHARS = 6             # Crude stemming: drops inflection and the definite article (-от, -та, -те)
+
+STOPWORDS = {
+    "и", "на", "во", "за", "со", "од", "да", "се", "е", "ќе", "не", "го", "ја", "ги",
+    "што", "кој", "која", "кое", "кои", "а", "но", "по", "до", "при", "преку", "меѓу", "како",
+    "или", "ние", "тие", "тој", "таа", "тоа", "овој", "оваа", "ова", "беше", "биле",
+    "има", "нема", "сме", "сте", "си", "сум", "ли", "уште", "веќе", "само",
+}
+
+_entries: list[dict] = []                    # {"fp": int, "story": link, "source": str, "seen_at": iso}
+_bands: dict[tuple[int, int], list[int]] = {}  # (band index, band value) -> positions in _entries
+_new_stories: set[str] = set()               # Stories first seen this run, kept only once confirmed
+_confirmed: set[str] = set()
+_lock = threading.Lock()
+
+
+def normalize_tokens(text: str) -> list[str]:
+    """Lowercase, strip punctuation/digits and stopwords, and stem Cyrillic or Latin words."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    words = re.findall(r"[^\W\d_]+", text)
+    return [word[:STEM_CHARS] for word in words if len(word) > 1 and word not in STOPWORDS]
+
+
+def _hash_feature(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def fingerprint(title: str, summary: str) -> int | None:
+    """64-bit SimHash over title words (weighted) and word pairs of title + summary."""
+    title_tokens = normalize_tokens(title)
+    tokens = title_tokens + normalize_tokens(summary)
+
+    features: dict[str, int] = {}
+    for token in title_tokens:
+        features[token] = features.get(token, 0) + TITLE_WEIGHT
+    for first, second in zip(tokens, tokens[1:]):
+        pair = f"{first} {second}"
+        features[pair] = features.get(pair, 0) + 1
+    if len(features) < MIN_FEATURES:
+        return None
+
+    weights = [0] * FINGERPRINT_BITS
+    for feature, weight in features.items():
+        value = _hash_feature(feature)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += weight if value >> bit & 1 else -weight
+    return sum(1 << bit for bit in range(FINGERPRINT_BITS) if weights[bit] > 0)
+
+
+def _band_keys(fp: int) -> list[tuple[int, int]]:
+    mask = (1 << BAND_BITS) - 1
+    return [(band, fp >> (band * BAND_BITS) & mask) for band in range(FINGERPRINT_BITS // BAND_BITS)]
+
+
+def _add_entry(entry: dict) -> None:
+    _entries.append(entry)
+    for key in _band_keys(entry["fp"]):
+        _bands.setdefault(key, []).append(len(_entries) - 1)
+
+
+def _find_story(fp: int) -> str | None:
+    best_story, best_distance = None, MAX_HAMMING_DISTANCE + 1
+    for key in _band_keys(fp):
+        for position in _bands.get(key, []):
+            entry = _entries[position]
+            distance = (entry["fp"] ^ fp).bit_count()
+            if distance < best_distance:
+                best_story, best_distance = entry["story"], distance
+    return best_story
+
+
+def load_story_index() -> int:
+    """Loads the stories of the last STORY_TTL_HOURS from the local cache."""
+    if not STORY_INDEX_FILE.exists():
+        return 0
+    try:
+        data = json.loads(STORY_INDEX_FILE.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable {STORY_INDEX_FILE.name}: {e}")
+        return 0
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=STORY_TTL_HOURS)).isoformat()
+    with _lock:
+        for entry in data.get("entries", []):
+            if entry.get("seen_at", "") >= cutoff:
+                _add_entry({**entry, "fp": int(entry["fp"], 16)})
+                _confirmed.add(entry["story"])
+        return len(_entries)
+
+
+def assign_story(link: str, source: str, title: str, summary: str) -> str | None:
+    """
+    Returns the link of the story this article duplicates, or None if it's new
+    (it then becomes the representative of its own story). Thread-safe, so the
+    first feed to reach a story this run wins.
+    """
+    fp = fingerprint(title, summary)
+    if fp is None:
+        return None
+
+    now_str = datetime.now(timezone.utc).isoformat()
+    with _lock:
+        story = _find_story(fp)
+        if story == link:
+            return None  # Our own story from an earlier run that never got stored
+        if story is None:
+            _new_stories.add(link)
+            story = link
+        _add_entry({"fp": fp, "story": story, "source": source, "seen_at": now_str})
+        return None if story == link else story
+
+
+def confirm_stories(links) -> None:
+    """Marks stories as settled (stored or rejected) so they're kept for later runs."""
+    with _lock:
+        _confirmed.update(link for link in links if link in _new_stories)
+
+
+def save_story_index() -> None:
+    """Writes the settled stories atomically; stories whose curation failed are dropped."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=STORY_TTL_HOURS)).isoformat()
+    try:
+        with _lock:
+            entries = [
+                {**entry, "fp": f"{entry['fp']:016x}"}
+                for entry in _entries
+                if entry["story"] in _confirmed and entry["seen_at"] >= cutoff
+            ]
+        write_atomic(STORY_INDEX_FILE, json.dumps({"entries": entries}, ensure_ascii=False))
+    except Exception as e:
+        print(f"⚠️ Failed to save story index: {e}")
+
+
+# ---- Extra sources of a stored story ----
+
+def ensure_post_sources_table(client) -> None:
+    """Creates the post_sources table if it doesn't exist yet."""
+    client.execute(
+        """
+        CREATE TABLE IF NOT EXISTS post_sources (
+            link TEXT PRIMARY KEY,
+            post_id INTEGER NOT NULL,
+            source TEXT NOT NULL,
+            title TEXT,
+            published_at TEXT,
+            added_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(post_id) REFERENCES posts(id)
+        )
+        """
+    )
+
+
+def post_source_statement(duplicate: dict):
+    """Attaches a duplicate to its story's post; a no-op if that post was never stored."""
+    import libsql_client
+
+    return libsql_client.Statement(
+        """
+        INSERT INTO post_sources (link, post_id, source, title, published_at)
+        SELECT ?, id, ?, ?, ? FROM posts WHERE link = ?
+        ON CONFLICT(link) DO NOTHING
+        """,
+        [duplicate["link"], duplicate["source"], duplicate.get("title"), duplicate.get("published_at"), duplicate["story_link"]],
+    )
@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The scraper's modules import each other by name from scraper/ and read their
+# local directories at import time, so both are set up before any test module
+# imports them. Nothing a test does touches the real cache, logs or database.
+
+SCRAPER_DIR = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(SCRAPER_DIR))
+_workdir = Path(tempfile.mkdtemp(prefix="vibes-tests-"))
+for name, sub in (("SCRAPER_CACHE_DIR", "cache"), ("SCRAPER_LOG_DIR", "logs"), ("SCRAPER_SNAPSHOT_DIR", "snapshots"),
+                  ("SCRAPER_ARCHIVE_DIR", "archive"), ("SCRAPER_IMAGE_DIR", "media")):
+    os.environ[name] = str(_workdir / sub)
+os.environ.pop("TURSO_AUTH_TOKEN", None)
+
+
+class FakeClock:
+    """Stands in for the `time` module: sleeping just moves the clock forward."""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+        self.slept: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def fresh_curator_cache(tmp_path, monkeypatch):
+    """An empty verdict cache, so one test's verdicts aren't served to the next."""
+    import curator_cache
+
+    monkeypatch.setattr(curator_cache, "CACHE_FILE", tmp_path / "curator_cache.db")
+    monkeypatch.setattr(curator_cache, "_conn", None)
+    yield
+    if curator_cache._conn is not None:
+        curator_cache._conn.close()
+
+
+@pytest.fixture
+def sqlite_url(tmp_path):
+    """A local SQLite stand-in for Turso with the site's schema, as a libsql `file:` URL."""
+    import sqlite3
+
+    db_path = tmp_path / "turso.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript((SCRAPER_DIR / "schema.sql").read_text(encoding="utf-8"))
+    conn.close()
+    return f"file:{db_path}"
+
+
+@pytest.fixture
+def turso(sqlite_url, tmp_path, monkeypatch):
+    """Points scraper.get_client() at `sqlite_url`, with an empty outbox. Yields the db path."""
+    import outbox
+    import scraper
+
+    monkeypatch.setenv("TURSO_DATABASE_URL", sqlite_url)
+    monkeypatch.setattr(outbox, "OUTBOX_FILE", tmp_path / "outbox.db")
+    monkeypatch.setattr(outbox, "_conn", None)
+    scraper.close_client()
+    yield Path(sqlite_url.removeprefix("file:"))
+    scraper.close_client()
+    if outbox._conn is not None:
+        outbox._conn.close()
+        outbox._conn = None
@@ -0,0 +1,196 @@
+import pytest
+
+import curator
+import curator_cache
+from curator import ModelsUnavailableError, analyze_with_split, pack_batches
+from fakes import FakeGeminiModel
+
+
+def make_articles(count: int, summary: str = "Краток опис на настанот.") -> list[dict]:
+    return [
+        {
+            "title": f"Вест број {i}",
+            "link": f"https://example.mk/{i}",
+            "source": "Example",
+            "published_at": "2025-01-01T10:00:00",
+            "image_url": None,
+            "summary_text": summary,
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def use_model(monkeypatch, fresh_curator_cache):
+    """Routes every curator call to the given model(s), without real rate limits or backoff."""
+    monkeypatch.setattr(curator, "MODEL_LIMITS", {})
+    monkeypatch.setattr(curator, "DEFAULT_MODEL_LIMITS", {"rpm": 1_000_000, "tpm": 1_000_000_000})
+    monkeypatch.setattr(curator, "QUOTA_BACKOFF_SECONDS", 0)
+
+    def install(model_for):
+        curator.set_model_factory(model_for if callable(model_for) else lambda name: model_for)
+
+    yield install
+    curator.set_model_factory(curator._default_model_factory)
+
+
+class PickyModel(FakeGeminiModel):
+    """Accepts everything, but fails on batches larger than `max_items`."""
+
+    def __init__(self, max_items: int):
+        super().__init__(accept_ratio=1.0)
+        self.max_items = max_items
+        self.batch_sizes: list[int] = []
+
+    def generate_content(self, prompt: str):
+        size = prompt[prompt.rindex("INPUT DATA:"):].count('"id":')
+        self.batch_sizes.append(size)
+        if size > self.max_items:
+            raise RuntimeError("500 Internal error (batch too large)")
+        return super().generate_content(prompt)
+
+
+# ---- pack_batches ----
+
+def sized_article(i: int, chars: int) -> dict:
+    """An article whose estimated size is exactly `chars`."""
+    title = f"{i:04d}"
+    return {"title": title, "source": "s", "link": f"https://example.mk/{i}",
+            "summary_text": "x" * (chars - len(title) - 1 - curator.ARTICLE_OVERHEAD_CHARS)}
+
+
+def test_pack_batches_respects_the_char_budget():
+    articles = [sized_article(i, 100) for i in range(5)]
+    batches = pack_batches(articles, char_budget=250, max_articles=10)
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [art for batch in batches for art in batch] == articles  # Order is kept
+
+
+def test_pack_batches_respects_the_article_limit():
+    batches = pack_batches([sized_article(i, 100) for i in range(7)], char_budget=100_000, max_articles=3)
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+
+
+def test_oversized_article_gets_a_batch_of_its_own():
+    articles = [sized_article(0, 100), sized_article(1, 5000), sized_article(2, 100)]
+    batches = pack_batches(articles, char_budget=1000, max_articles=10)
+    assert [[art["title"] for art in batch] for batch in batches] == [["0000"], ["0001"], ["0002"]]
+
+
+def test_pack_batches_of_nothing():
+    assert pack_batches([]) == []
+
+
+def test_compact_wire_packs_more_per_batch(monkeypatch):
+    articles = make_articles(10, summary="долг опис " * 200)
+    full = pack_batches(articles, char_budget=5000)
+    monkeypatch.setenv("CURATOR_WIRE_FORMAT", "compact")
+    compact = pack_batches(articles, char_budget=5000)
+    assert len(compact) < len(full)
+
+
+# ---- analyze_with_split ----
+
+def test_failed_batch_is_split_until_it_fits(use_model):
+    model = PickyModel(max_items=2)
+    use_model(model)
+    articles = make_articles(5)
+
+    approved = analyze_with_split(articles)
+
+    assert [art["link"] for art in approved] == [art["link"] for art in articles]
+    assert model.batch_sizes[0] == 5
+    assert sum(size for size in model.batch_sizes if size <= 2) == 5  # Every article answered once
+
+
+def test_single_article_that_keeps_failing_is_dropped(use_model):
+    use_model(FakeGeminiModel(failure_rate=1.0))
+    assert analyze_with_split(make_articles(1)) == []
+
+
+def test_no_available_model_defers_without_splitting(use_model, monkeypatch):
+    use_model(FakeGeminiModel())
+    calls = []
+
+    def unavailable(prompt):
+        calls.append(prompt)
+        raise ModelsUnavailableError("cooling down")
+
+    monkeypatch.setattr(curator, "generate_with_fallback", unavailable)
+    assert analyze_with_split(make_articles(6)) == []
+    assert len(calls) == 1
+
+
+def test_rejected_links_are_reported(use_model):
+    use_model(FakeGeminiModel(accept_ratio=0.0))
+    rejected: list[str] = []
+    assert analyze_with_split(make_articles(3), rejected) == []
+    assert sorted(rejected) == [f"https://example.mk/{i}" for i in range(3)]
+
+
+def test_cached_verdicts_skip_the_model(use_model):
+    model = FakeGeminiModel(accept_ratio=0.5)
+    use_model(model)
+    articles = make_articles(8)
+
+    first = analyze_with_split(articles)
+    calls = model.calls
+    second = analyze_with_split(articles)
+
+    assert model.calls == calls
+    assert [art["link"] for art in second] == [art["link"] for art in first]
+
+
+# ---- Fallback and circuit breaker ----
+
+def test_failing_model_is_skipped_once_its_circuit_opens(use_model):
+    models = {name: FakeGeminiModel(name, failure_rate=1.0 if name == curator.MODEL_PRIORITY[0] else 0.0)
+              for name in curator.MODEL_PRIORITY}
+    use_model(lambda name: models[name])
+
+    for _ in range(curator.BREAKER_THRESHOLD + 3):
+        response = curator.generate_with_fallback("INPUT DATA:\n[]")
+        assert response.text
+
+    assert models[curator.MODEL_PRIORITY[0]].calls == curator.BREAKER_THRESHOLD
+    assert models[curator.MODEL_PRIORITY[1]].calls == curator.BREAKER_THRESHOLD + 3
+
+
+def test_every_model_failing_raises(use_model):
+    use_model(FakeGeminiModel(failure_rate=1.0))
+    with pytest.raises(RuntimeError, match="All Gemini models failed"):
+        curator.generate_with_fallback("INPUT DATA:\n[]")
+
+
+def test_read_only_cache_serves_verdicts_but_stores_nothing(use_model):
+    model = FakeGeminiModel(accept_ratio=0.5)
+    use_model(model)
+    cached, fresh = make_articles(4), make_articles(8)[4:]
+    analyze_with_split(cached)
+    calls = model.calls
+
+    curator_cache.set_read_only(True)
+    try:
+        analyze_with_split(cached + fresh)
+        assert model.calls > calls      # Only the fresh articles went to the model...
+        calls = model.calls
+        analyze_with_split(fresh)
+        assert model.calls > calls      # ...and their verdicts were not kept
+    finally:
+        curator_cache.set_read_only(False)
+
+
+def test_quota_retries_wait_for_the_rate_limiter(use_model, monkeypatch):
+    models = {name: FakeGeminiModel(name, quota_failure_rate=1.0) for name in curator.MODEL_PRIORITY}
+    use_model(lambda name: models[name])
+    monkeypatch.setattr(curator, "DEFAULT_MODEL_LIMITS", {"rpm": 2, "tpm": 1_000_000_000})
+    monkeypatch.setattr(curator, "MAX_RATE_WAIT_SECONDS", 0)
+    monkeypatch.setattr(curator, "_rate_limiters", {})
+    monkeypatch.setattr(curator, "_breakers", {})
+
+    with pytest.raises(RuntimeError, match="All Gemini models failed"):
+        curator.generate_with_fallback("INPUT DATA:\n[]")
+
+    # Two requests per minute: the second quota retry has to wait for the bucket, so it isn't sent
+    assert curator.QUOTA_RETRIES == 2
+    assert all(model.calls == 2 for model in models.values())
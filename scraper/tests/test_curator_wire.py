@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from curator_wire import (CompactResponseError, build_compact_prompt, full_response_chars, parse_compact_response,
+                          trim_summary)
+
+
+def test_valid_reply_is_expanded_to_the_full_format():
+    reply = {
+        "a": [
+            {"i": 0, "c": "T", "s": " Ново резиме. ", "t": "Кратка најава", "o": "+", "x": 9},
+            {"i": 2, "c": "Culture", "s": "Друго резиме.", "o": "0"},
+        ],
+        "r": [1],
+        "h": 0,
+    }
+    accepted, rejected, invalid = parse_compact_response(reply, 3)
+
+    assert invalid == 0
+    assert rejected == [{"id": 1}]
+    assert accepted == [
+        {"id": 0, "category": "Tech", "summary": "Ново резиме.", "teaser": "Кратка најава", "tone": "positive",
+         "hero_candidate": True, "hero_score": 9},
+        {"id": 2, "category": "Culture", "summary": "Друго резиме.", "teaser": "", "tone": "neutral",
+         "hero_candidate": False, "hero_score": 0},
+    ]
+
+
+@pytest.mark.parametrize("item", [
+    {"i": 7, "c": "T", "s": "id outside the batch"},
+    {"i": -1, "c": "T", "s": "negative id"},
+    {"i": True, "c": "T", "s": "bool is not an id"},
+    {"i": "0", "c": "T", "s": "string id"},
+    {"i": 0, "c": "X", "s": "unknown category"},
+    {"i": 0, "c": "T", "s": "   "},
+    {"i": 0, "c": "T"},
+    "not an object",
+])
+def test_invalid_items_are_dropped_and_counted(item):
+    accepted, rejected, invalid = parse_compact_response({"a": [item], "r": []}, 3)
+    assert (accepted, rejected, invalid) == ([], [], 1)
+
+
+def test_each_id_is_answered_once():
+    reply = {"a": [{"i": 0, "c": "T", "s": "first"}, {"i": 0, "c": "B", "s": "again"}], "r": [0, 1, 1]}
+    accepted, rejected, invalid = parse_compact_response(reply, 2)
+    assert [item["summary"] for item in accepted] == ["first"]
+    assert rejected == [{"id": 1}]
+    assert invalid == 3
+
+
+def test_hero_score_is_clamped_and_unknown_tone_is_neutral():
+    reply = {"a": [{"i": 0, "c": "S", "s": "ok", "o": "?", "x": 42}, {"i": 1, "c": "S", "s": "ok", "x": "9"}]}
+    accepted, _, _ = parse_compact_response(reply, 2)
+    assert [(item["tone"], item["hero_score"]) for item in accepted] == [("neutral", 10), ("neutral", 0)]
+
+
+def test_missing_lists_mean_no_verdicts():
+    assert parse_compact_response({"h": None}, 3) == ([], [], 0)
+
+
+@pytest.mark.parametrize("reply", [[], "text", None, {"a": {"i": 0}}, {"r": "1,2"}])
+def test_wrong_shape_raises(reply):
+    with pytest.raises(CompactResponseError):
+        parse_compact_response(reply, 3)
+
+
+def test_trim_summary_cuts_on_a_word_boundary():
+    text = "збор " * 100
+    trimmed = trim_summary(text, token_budget=10)
+    assert len(trimmed) <= 31
+    assert trimmed.endswith("збор…")
+    assert trim_summary("кратко", token_budget=10) == "кратко"
+
+
+def test_compact_prompt_carries_the_payload():
+    payload = [{"id": 0, "title": "Наслов", "source": "Извор", "summary": ""}]
+    prompt = build_compact_prompt(payload)
+    items = json.loads(prompt[prompt.rindex("INPUT DATA:") + len("INPUT DATA:"):])
+    assert items == [{"i": 0, "t": "Наслов", "s": "Извор"}]
+
+
+def test_full_response_chars_counts_a_reason_per_rejection():
+    accepted = [{"id": 0, "category": "Tech"}]
+    assert full_response_chars(accepted, [{"id": 1}]) > full_response_chars(accepted, [])
@@ -0,0 +1,98 @@
+import feedparser
+
+import feed_stream
+from feed_stream import iter_entries, parse_recent_entries
+
+
+def rss(count: int, tail: str = "</channel></rss>") -> bytes:
+    items = "".join(
+        f"""<item>
+              <title>Вест {i}</title>
+              <link>https://example.mk/{i}</link>
+              <guid isPermaLink="false">id-{i}</guid>
+              <description><![CDATA[<p>Опис {i}</p>]]></description>
+              <content:encoded><![CDATA[<p>Целосен текст {i}</p>]]></content:encoded>
+              <pubDate>Tue, 0{1 + i % 9} Apr 2025 10:00:00 +0200</pubDate>
+              <media:content url="https://example.mk/{i}.jpg" medium="image"/>
+              <enclosure url="https://example.mk/{i}.mp3" type="audio/mpeg" length="10"/>
+            </item>"""
+        for i in range(count)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/" '
+        'xmlns:media="http://search.yahoo.com/mrss/"><channel><title>Example</title>'
+        f"{items}{tail}"
+    ).encode("utf-8")
+
+
+ATOM = """<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Example</title>
+  <entry>
+    <title type="html">Наслов &amp;amp; друго</title>
+    <link rel="alternate" href="https://example.mk/atom/1"/>
+    <link rel="enclosure" type="image/jpeg" href="https://example.mk/atom/1.jpg"/>
+    <id>tag:example.mk,2025:1</id>
+    <published>2025-04-01T08:00:00Z</published>
+    <updated>2025-04-01T09:30:00+02:00</updated>
+    <content type="xhtml"><div xmlns="http://www.w3.org/1999/xhtml"><p>Текст <b>важно</b></p></div></content>
+  </entry>
+</feed>""".encode("utf-8")
+
+
+def test_rss_entries_match_feedparser():
+    content = rss(3)
+    streamed = list(iter_entries(content))
+    parsed = feedparser.parse(content).entries
+
+    assert len(streamed) == 3
+    for mine, theirs in zip(streamed, parsed):
+        for key in ("title", "link", "id", "summary", "published_parsed"):
+            assert mine[key] == theirs[key], key
+        assert mine["content"][0]["value"] == theirs["content"][0]["value"]
+        assert mine["media_content"][0]["url"] == theirs["media_content"][0]["url"]
+        assert [link["href"] for link in mine["links"] if link["rel"] == "enclosure"] == \
+               [link["href"] for link in theirs["links"] if link["rel"] == "enclosure"]
+
+
+def test_atom_entry():
+    [entry] = iter_entries(ATOM)
+    assert entry["title"] == "Наслов &amp; друго"
+    assert entry["link"] == "https://example.mk/atom/1"
+    assert entry["id"] == "tag:example.mk,2025:1"
+    assert tuple(entry["published_parsed"])[:5] == (2025, 4, 1, 8, 0)
+    assert tuple(entry["updated_parsed"])[:5] == (2025, 4, 1, 7, 30)  # Converted to UTC
+    assert entry["content"][0]["value"] == "<p>Текст <b>важно</b></p>"
+    assert entry["summary"] == entry["content"][0]["value"]
+
+
+def test_entries_span_chunk_boundaries(monkeypatch):
+    monkeypatch.setattr(feed_stream, "CHUNK_BYTES", 7)
+    assert [entry["link"] for entry in iter_entries(rss(4))] == [f"https://example.mk/{i}" for i in range(4)]
+
+
+def test_limit_stops_the_scan():
+    assert len(parse_recent_entries(rss(20), 5, lambda entry: False)) == 5
+
+
+def test_seen_streak_stops_the_scan():
+    seen = {"https://example.mk/1", "https://example.mk/3", "https://example.mk/4", "https://example.mk/5"}
+    entries = parse_recent_entries(rss(10), 10, lambda entry: entry["link"] in seen)
+    # A single seen entry (1) doesn't stop it; two in a row (3, 4) do, and are included
+    assert [entry["link"] for entry in entries] == [f"https://example.mk/{i}" for i in range(5)]
+
+
+def test_broken_tail_is_never_parsed_when_the_scan_stops_early():
+    content = rss(5, tail="<item><title>Broken &nbsp; entity</title></item></channel></rss>")
+    assert len(parse_recent_entries(content, 3, lambda entry: False)) == 3
+
+
+def test_broken_xml_falls_back_to_feedparser():
+    content = rss(2, tail="<item><title>Broken &nbsp; entity</title><link>https://example.mk/x</link></item></channel></rss>")
+    entries = parse_recent_entries(content, 10, lambda entry: False)
+    assert [entry.get("link") for entry in entries] == ["https://example.mk/0", "https://example.mk/1", "https://example.mk/x"]
+
+
+def test_non_feed_content_falls_back_to_feedparser():
+    assert parse_recent_entries(b'{"items": []}', 10, lambda entry: False) == []
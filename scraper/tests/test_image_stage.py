@@ -0,0 +1,111 @@
+import io
+import json
+
+import pytest
+
+import image_stage
+
+pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+
+def jpeg(width: int, height: int, color=(200, 30, 30)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class FakeBucket:
+    def __init__(self):
+        self.files: dict[str, bytes] = {}
+
+    def upload(self, path, data, file_options=None):
+        self.files[path] = data
+
+    def remove(self, paths):
+        for path in paths:
+            self.files.pop(path, None)
+
+
+@pytest.fixture
+def stage(tmp_path, monkeypatch):
+    monkeypatch.setenv(image_stage.OPTIMIZE_ENV, "1")
+    monkeypatch.setattr(image_stage, "CACHE_FILE", tmp_path / "image_variants.db")
+    monkeypatch.setattr(image_stage, "_conn", None)
+    monkeypatch.setattr(image_stage, "IMAGE_DIR", tmp_path / "media")
+    downloads = {}
+    monkeypatch.setattr(image_stage, "_download", lambda url: downloads.get(url))
+    yield downloads
+    if image_stage._conn is not None:
+        image_stage._conn.close()
+
+
+@pytest.fixture
+def bucket(stage, monkeypatch):
+    monkeypatch.setenv("SUPABASE_URL", "https://project.supabase.co/")
+    monkeypatch.setenv("SUPABASE_KEY", "service-key")
+    monkeypatch.setattr(image_stage, "IMAGE_DIR", None)
+    fake = FakeBucket()
+    monkeypatch.setattr(image_stage, "_bucket", fake)
+    return fake
+
+
+def test_derivatives_never_upscale(stage):
+    stage["https://a.mk/big.jpg"] = jpeg(2000, 1000)
+    stage["https://a.mk/small.jpg"] = jpeg(500, 500)
+    records = image_stage.optimize_images([
+        {"link": "https://a.mk/1", "image_url": "https://a.mk/big.jpg"},
+        {"link": "https://a.mk/2", "image_url": "https://a.mk/small.jpg"},
+    ])
+
+    assert sorted(records["https://a.mk/1"]["variants"]["webp"]) == ["1280", "320", "640"]
+    assert sorted(records["https://a.mk/2"]["variants"]["webp"]) == ["320", "500"]
+    for variants in records["https://a.mk/1"]["variants"].values():
+        for path in variants.values():
+            assert (image_stage.IMAGE_DIR / path).exists()
+    assert records["https://a.mk/1"]["placeholder"].startswith("data:image/webp;base64,")
+
+
+def test_shared_image_is_processed_once(stage, monkeypatch):
+    stage["https://a.mk/x.jpg"] = stage["https://cdn.a.mk/x.jpg"] = jpeg(800, 600)
+    records = image_stage.optimize_images([
+        {"link": "https://a.mk/1", "image_url": "https://a.mk/x.jpg"},
+        {"link": "https://a.mk/2", "image_url": "https://a.mk/x.jpg"},
+        {"link": "https://a.mk/3", "image_url": "https://cdn.a.mk/x.jpg"},
+        {"link": "https://a.mk/4", "image_url": "https://a.mk/missing.jpg"},
+    ])
+    assert len({record["digest"] for record in records.values()}) == 1
+    assert sorted(records) == ["https://a.mk/1", "https://a.mk/2", "https://a.mk/3"]
+
+    # The next run is served from the cache
+    monkeypatch.setattr(image_stage, "build_derivatives", lambda data: pytest.fail("processed again"))
+    again = image_stage.optimize_images([{"link": "https://a.mk/5", "image_url": "https://a.mk/x.jpg"}])
+    assert again["https://a.mk/5"] == records["https://a.mk/1"]
+
+
+def test_derivatives_are_uploaded_and_recorded_by_url(bucket, stage):
+    stage["https://a.mk/x.jpg"] = jpeg(700, 350)
+    record = image_stage.optimize_images([{"link": "https://a.mk/1", "image_url": "https://a.mk/x.jpg"}])["https://a.mk/1"]
+
+    urls = [url for variants in record["variants"].values() for url in variants.values()]
+    assert all(url.startswith("https://project.supabase.co/storage/v1/object/public/post-images/") for url in urls)
+    assert sorted(bucket.files) == sorted(image_stage._storage_path(url) for url in urls)
+
+
+def test_stage_needs_somewhere_to_store_files(stage, monkeypatch):
+    assert image_stage.image_stage_enabled()
+    monkeypatch.setattr(image_stage, "IMAGE_DIR", None)
+    monkeypatch.delenv("SUPABASE_URL", raising=False)
+    monkeypatch.setattr(image_stage, "_warned", False)
+    assert not image_stage.image_stage_enabled()
+
+
+def test_removed_derivatives_leave_the_bucket_and_the_cache(bucket, stage):
+    stage["https://a.mk/x.jpg"] = jpeg(700, 350)
+    record = image_stage.optimize_images([{"link": "https://a.mk/1", "image_url": "https://a.mk/x.jpg"}])["https://a.mk/1"]
+
+    removed = image_stage.remove_derivatives({record["digest"]: json.dumps(record["variants"])})
+
+    assert removed == sum(map(len, record["variants"].values()))
+    assert bucket.files == {}
+    assert image_stage._cached_record("https://a.mk/x.jpg") is None
@@ -0,0 +1,101 @@
+import gzip
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import logger
+
+
+@pytest.fixture
+def log_dir(monkeypatch, tmp_path):
+    """Sends the log to tmp_path, after stopping any writer an earlier test started."""
+    logger.flush_logs()
+    monkeypatch.setattr(logger, "LOG_DIR", tmp_path)
+    monkeypatch.setattr(logger, "LOG_FILE", tmp_path / "scraper_log.jsonl")
+    return tmp_path
+
+
+def archives(directory) -> list:
+    return sorted(directory.glob("scraper_log-*.jsonl.gz"))
+
+
+def test_dropped_events_are_counted_across_threads(log_dir, monkeypatch):
+    monkeypatch.setattr(logger, "_ensure_writer", lambda: None)  # Nothing drains the queue
+    monkeypatch.setattr(logger, "_queue", logger.queue.Queue(maxsize=1))
+    monkeypatch.setattr(logger, "_dropped_events", 0)
+
+    def spam():
+        for _ in range(2000):
+            logger.log_event("test", {})
+
+    threads = [threading.Thread(target=spam) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert logger._dropped_events == 8 * 2000 - 1
+
+
+def test_dropped_count_is_written_by_the_writer(log_dir, monkeypatch):
+    monkeypatch.setattr(logger, "_queue", logger.queue.Queue())
+    monkeypatch.setattr(logger, "_dropped_events", 5)
+    logger._queue.put(None)
+
+    logger._writer_loop()
+
+    events = [json.loads(line) for line in logger.LOG_FILE.read_text(encoding="utf-8").splitlines()]
+    assert [(event["event"], event["data"]) for event in events] == [("log_events_dropped", {"count": 5})]
+    assert logger._dropped_events == 0
+
+
+def test_full_log_is_rotated_and_gzipped(log_dir, monkeypatch):
+    monkeypatch.setattr(logger, "MAX_LOG_BYTES", 100)
+    logger._write_lines(["a" * 60 + "\n"])
+    logger._write_lines(["b" * 30 + "\n"])     # Still fits
+    logger._write_lines(["c" * 30 + "\n"])     # Doesn't: the first two lines are rotated out
+
+    [archive] = archives(log_dir)
+    assert gzip.decompress(archive.read_bytes()).decode("utf-8") == "a" * 60 + "\n" + "b" * 30 + "\n"
+    assert logger.LOG_FILE.read_text(encoding="utf-8") == "c" * 30 + "\n"
+    assert not list(log_dir.glob("scraper_log-*.jsonl"))  # Only the gzipped copy is kept
+
+
+def test_log_from_an_earlier_day_is_rotated(log_dir):
+    logger._write_lines(["yesterday\n"])
+    yesterday = time.time() - 24 * 3600
+    os.utime(logger.LOG_FILE, (yesterday, yesterday))
+
+    logger._write_lines(["today\n"])
+
+    [archive] = archives(log_dir)
+    assert gzip.decompress(archive.read_bytes()) == b"yesterday\n"
+    assert logger.LOG_FILE.read_text(encoding="utf-8") == "today\n"
+
+
+def test_only_the_newest_archives_are_kept(log_dir, monkeypatch):
+    monkeypatch.setattr(logger, "MAX_LOG_BYTES", 10)
+    monkeypatch.setattr(logger, "MAX_ROTATED_FILES", 2)
+    for day in ("20200101", "20200102", "20200103"):
+        (log_dir / f"scraper_log-{day}-000000-000000.jsonl.gz").write_bytes(gzip.compress(b"old\n"))
+
+    logger._write_lines(["first line\n"])
+    logger._write_lines(["second line\n"])
+
+    kept = archives(log_dir)
+    assert len(kept) == 2
+    assert kept[0].name == "scraper_log-20200103-000000-000000.jsonl.gz"
+    assert gzip.decompress(kept[1].read_bytes()) == b"first line\n"
+
+
+def test_long_payloads_are_truncated():
+    data = logger._truncate({"text": "x" * 4500, "items": list(range(150)), "nested": [{"text": "y" * 4001}],
+                             "short": "ok"})
+
+    assert data["text"] == "x" * 4000 + "…[+500 chars]"
+    assert data["items"] == list(range(100)) + ["…[+50 items]"]
+    assert data["nested"] == [{"text": "y" * 4000 + "…[+1 chars]"}]
+    assert data["short"] == "ok"
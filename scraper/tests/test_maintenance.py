@@ -0,0 +1,117 @@
+import gzip
+import json
+import sqlite3
+
+import libsql_client
+import pytest
+
+import image_stage
+import maintenance
+from maintenance import archive_old_posts, delete_archived_posts, run_maintenance
+
+OLD = "2020-01-15T10:00:00"
+NEW = "2999-01-01T10:00:00"
+
+
+@pytest.fixture
+def db(sqlite_url, monkeypatch):
+    monkeypatch.setattr(maintenance, "BATCH_PAUSE_SECONDS", 0)
+    client = libsql_client.create_client_sync(sqlite_url)
+    yield client, sqlite_url.removeprefix("file:")
+    client.close()
+
+
+def add_posts(db_path, *posts):
+    with sqlite3.connect(db_path) as conn:
+        for post_id, category, published_at in posts:
+            conn.execute("INSERT INTO posts (id, title, link, source, category, published_at) VALUES (?, ?, ?, ?, ?, ?)",
+                         [post_id, f"Post {post_id}", f"https://a.mk/{post_id}", "A", category, published_at])
+
+
+def post_ids(db_path) -> list[int]:
+    with sqlite3.connect(db_path) as conn:
+        return [row[0] for row in conn.execute("SELECT id FROM posts ORDER BY id")]
+
+
+def archived(directory) -> list[dict]:
+    posts = []
+    for path in sorted(directory.glob("posts-*.jsonl.gz")):
+        posts.extend(json.loads(line) for line in gzip.decompress(path.read_bytes()).decode("utf-8").splitlines())
+    return posts
+
+
+def test_old_unreferenced_posts_are_archived_and_deleted(db, tmp_path):
+    client, db_path = db
+    add_posts(db_path, (1, "Tech", OLD), (2, "Blog", OLD), (3, "Sports", OLD), (4, "Tech", OLD), (5, "Tech", NEW))
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO featured_slots (slot_id, post_id) VALUES ('sports', 3)")
+        conn.execute("INSERT INTO bookmarks (user_id, post_id) VALUES ('user_1', 4)")
+
+    run_maintenance(client, retention_days=30, directory=tmp_path / "archive")
+
+    assert post_ids(db_path) == [2, 3, 4, 5]  # Blog, featured, bookmarked and recent posts stay
+    assert [post["id"] for post in archived(tmp_path / "archive")] == [1]
+
+
+def test_archive_phase_deletes_nothing(db, tmp_path, monkeypatch):
+    client, db_path = db
+    monkeypatch.setattr(maintenance, "DELETE_BATCH_SIZE", 2)
+    add_posts(db_path, *[(n, "Tech", OLD) for n in range(1, 6)])
+
+    paths = archive_old_posts(client, retention_days=30, directory=tmp_path / "archive")
+
+    assert [path.name.split(".")[0] for path in paths] == ["posts-2020-01"]
+    assert post_ids(db_path) == [1, 2, 3, 4, 5]
+    assert [post["id"] for post in archived(tmp_path / "archive")] == [1, 2, 3, 4, 5]
+
+
+def test_delete_phase_only_removes_archived_posts(db, tmp_path):
+    client, db_path = db
+    add_posts(db_path, (1, "Tech", OLD), (2, "Tech", OLD))
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript("""
+            CREATE TABLE post_sources (link TEXT PRIMARY KEY, post_id INTEGER NOT NULL, source TEXT NOT NULL,
+                                       title TEXT, published_at TEXT, added_at TEXT);
+            INSERT INTO post_sources (link, post_id, source) VALUES ('https://b.mk/1', 1, 'B'), ('https://b.mk/2', 2, 'B');
+        """)
+    archive_old_posts(client, retention_days=30, directory=tmp_path / "archive")
+    add_posts(db_path, (3, "Tech", OLD))  # Old, but not archived yet
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO featured_slots (slot_id, post_id) VALUES ('tech', 2)")  # Featured since
+
+    assert delete_archived_posts(client, tmp_path / "archive") == 1
+
+    assert post_ids(db_path) == [2, 3]
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT post_id FROM post_sources").fetchall() == [(2,)]
+
+
+def test_delete_phase_without_an_archive_does_nothing(db, tmp_path):
+    client, db_path = db
+    add_posts(db_path, (1, "Tech", OLD))
+    assert delete_archived_posts(client, tmp_path / "missing") == 0
+    assert post_ids(db_path) == [1]
+
+
+def test_deleted_posts_take_their_unshared_images_along(db, tmp_path, monkeypatch):
+    client, db_path = db
+    media = tmp_path / "media"
+    monkeypatch.setattr(image_stage, "IMAGE_DIR", media)
+    monkeypatch.setattr(image_stage, "CACHE_FILE", tmp_path / "image_variants.db")
+    monkeypatch.setattr(image_stage, "_conn", None)
+    image_stage.ensure_post_images_table(client)
+    add_posts(db_path, (1, "Tech", OLD), (2, "Tech", OLD), (3, "Tech", NEW))
+    for post_id, digest in ((1, "aa1"), (2, "bb2"), (3, "bb2")):
+        variants = {"webp": {"320": f"{digest[:2]}/{digest}-320.webp"}}
+        for path in variants["webp"].values():
+            (media / path).parent.mkdir(parents=True, exist_ok=True)
+            (media / path).write_bytes(b"webp")
+        client.execute("INSERT INTO post_images (link, post_id, digest, variants) VALUES (?, ?, ?, ?)",
+                       [f"https://a.mk/{post_id}", post_id, digest, json.dumps(variants)])
+
+    run_maintenance(client, retention_days=30, directory=tmp_path / "archive")
+
+    assert not (media / "aa/aa1-320.webp").exists()
+    assert (media / "bb/bb2-320.webp").exists()  # Post 3 still shows it
+    assert [tuple(row) for row in client.execute("SELECT post_id, digest FROM post_images").rows] == [(3, "bb2")]
+    image_stage._conn.close()
@@ -0,0 +1,98 @@
+import model_guard
+from model_guard import CircuitBreaker, RateLimiter, TokenBucket, is_quota_error
+
+
+def test_token_bucket_refills_at_its_rate(clock, monkeypatch):
+    monkeypatch.setattr(model_guard, "time", clock)
+    bucket = TokenBucket(60)  # One token per second
+    bucket.take(60)
+    assert bucket.wait_time(1) == 1.0
+    clock.sleep(0.5)
+    assert bucket.wait_time(1) == 0.5
+    clock.sleep(100)
+    assert bucket.wait_time(60) == 0
+    assert bucket.tokens == 60   # Never more than the capacity
+
+
+def test_oversized_request_waits_for_a_full_bucket(clock, monkeypatch):
+    monkeypatch.setattr(model_guard, "time", clock)
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(1000) == 0
+    bucket.take(1000)
+    assert bucket.tokens == 0
+
+
+def test_rate_limiter_enforces_requests_per_minute(clock, monkeypatch):
+    monkeypatch.setattr(model_guard, "time", clock)
+    limiter = RateLimiter(rpm=2, tpm=1_000_000)
+    assert limiter.acquire(10, max_wait=0)
+    assert limiter.acquire(10, max_wait=0)
+    assert not limiter.acquire(10, max_wait=0)
+    assert not limiter.acquire(10, max_wait=5)    # The next request frees up in 30s
+    assert clock.slept == []
+    assert limiter.acquire(10, max_wait=60)
+    assert clock.slept == [30.0]
+
+
+def test_rate_limiter_enforces_tokens_per_minute(clock, monkeypatch):
+    monkeypatch.setattr(model_guard, "time", clock)
+    limiter = RateLimiter(rpm=100, tpm=6000)
+    assert limiter.acquire(5000, max_wait=0)
+    assert not limiter.acquire(3000, max_wait=10)  # 2000 tokens short: 20s at 100 tokens/s
+    assert limiter.acquire(3000, max_wait=20)
+    assert clock.slept == [20.0]
+
+
+def test_circuit_breaker_opens_after_consecutive_failures(clock, monkeypatch):
+    monkeypatch.setattr(model_guard, "time", clock)
+    breaker = CircuitBreaker(threshold=3, cooldown=300)
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(clock, monkeypatch):
+    monkeypatch.setattr(model_guard, "time", clock)
+    breaker = CircuitBreaker(threshold=2, cooldown=300)
+    breaker.record_failure()
+    breaker.record_success()
+    assert not breaker.record_failure()
+    assert breaker.allow()
+
+
+def test_half_open_breaker_lets_one_trial_through(clock, monkeypatch):
+    monkeypatch.setattr(model_guard, "time", clock)
+    breaker = CircuitBreaker(threshold=1, cooldown=300)
+    breaker.record_failure()
+    clock.sleep(299)
+    assert not breaker.allow()
+    clock.sleep(1)
+    assert breaker.allow()
+    assert not breaker.allow()   # Only one trial at a time
+
+    breaker.record_failure()     # The trial failed: open for another cooldown
+    assert breaker.is_open
+    assert not breaker.allow()
+    clock.sleep(300)
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow()
+
+
+def test_released_trial_can_be_taken_again(clock, monkeypatch):
+    monkeypatch.setattr(model_guard, "time", clock)
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock.sleep(10)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_is_quota_error():
+    assert is_quota_error(RuntimeError("429 Resource has been exhausted"))
+    assert is_quota_error(RuntimeError("Quota exceeded for metric"))
+    assert not is_quota_error(RuntimeError("500 Internal error"))
@@ -0,0 +1,76 @@
+import sqlite3
+
+import libsql_client
+import pytest
+
+import outbox
+import scraper
+
+
+@pytest.fixture
+def client(turso, monkeypatch):
+    monkeypatch.setattr(outbox, "SYNC_RETRIES", 1)
+    return scraper.get_client()
+
+
+def post_write(n: int) -> list:
+    return [scraper.build_upsert_statement([{"title": f"t{n}", "link": f"https://a.mk/{n}", "source": "A"}])]
+
+
+POISON = [libsql_client.Statement("INSERT INTO no_such_table (x) VALUES (?)", [1])]
+
+
+def stored_links(db_path) -> list[str]:
+    with sqlite3.connect(db_path) as conn:
+        return [row[0] for row in conn.execute("SELECT link FROM posts ORDER BY link")]
+
+
+def attempts() -> list[int]:
+    return [row[0] for row in outbox._get_conn().execute("SELECT attempts FROM outbox ORDER BY id")]
+
+
+def test_poison_write_only_holds_back_itself(client, turso):
+    ids = outbox.enqueue([post_write(1), POISON, post_write(2), post_write(3)])
+
+    results = outbox.flush(client)
+
+    assert sorted(results) == [ids[0], ids[2], ids[3]]
+    assert stored_links(turso) == ["https://a.mk/1", "https://a.mk/2", "https://a.mk/3"]
+    assert attempts() == [1]   # Only the poison write is left, with one failure counted
+
+
+def test_parked_write_no_longer_blocks_the_queue(client, turso, monkeypatch):
+    monkeypatch.setattr(outbox, "MAX_ATTEMPTS", 2)
+    outbox.enqueue([POISON])
+    outbox.flush(client)
+    outbox.flush(client)
+    later = outbox.enqueue([post_write(4)])
+
+    assert sorted(outbox.flush(client)) == later
+    assert attempts() == [2]
+
+
+class DownClient:
+    def execute(self, *args, **kwargs):
+        raise ConnectionError("Turso is down")
+
+    def batch(self, statements):
+        raise ConnectionError("Turso is down")
+
+
+def test_outage_counts_no_attempts(client):
+    outbox.enqueue([post_write(1), post_write(2)])
+    assert outbox.flush(DownClient()) == {}
+    assert attempts() == [0, 0]
+
+
+def test_queue_stays_open_during_a_push(client):
+    outbox.enqueue([post_write(1)])
+
+    class CheckingClient:
+        def batch(self, statements):
+            assert outbox._lock.acquire(timeout=1), "the local queue is locked during the push"
+            outbox._lock.release()
+            return client.batch(statements)
+
+    assert len(outbox.flush(CheckingClient())) == 1
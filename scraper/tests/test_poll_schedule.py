@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import poll_schedule
+from poll_schedule import MIN_POLL_INTERVAL_MINUTES, due_feeds, record_poll
+
+FEED = {"url": "https://a.mk/feed", "source": "A"}
+
+
+@pytest.fixture(autouse=True)
+def schedules(monkeypatch):
+    monkeypatch.setattr(poll_schedule, "_schedules", {})
+    monkeypatch.setattr(poll_schedule, "_updated", {})
+    monkeypatch.delenv(poll_schedule.POLL_ALL_ENV, raising=False)
+
+
+def test_new_feeds_are_due():
+    assert due_feeds([FEED]) == ([FEED], [])
+
+
+def test_busy_feed_is_due_when_the_next_run_starts_early():
+    record_poll(FEED["url"], new_links=8, capped=True)
+    polled = datetime.now(timezone.utc)
+    assert poll_schedule._schedules[FEED["url"]]["interval_minutes"] == MIN_POLL_INTERVAL_MINUTES
+
+    # This run's poll came 40 minutes into a late run; the next one starts on time
+    next_run = polled + timedelta(minutes=MIN_POLL_INTERVAL_MINUTES - 40)
+    assert due_feeds([FEED], now=next_run) == ([FEED], [])
+
+
+def test_feed_polled_this_run_is_not_due_again_soon():
+    record_poll(FEED["url"], new_links=8, capped=True)
+    soon = datetime.now(timezone.utc) + timedelta(minutes=30)
+    assert due_feeds([FEED], now=soon) == ([], [FEED])
+
+
+def test_quiet_feed_waits_for_its_interval():
+    record_poll(FEED["url"], new_links=0, entries=[])
+    record_poll(FEED["url"], new_links=0, entries=[])
+    schedule = poll_schedule._schedules[FEED["url"]]
+    assert schedule["interval_minutes"] > MIN_POLL_INTERVAL_MINUTES
+    assert due_feeds([FEED], now=datetime.now(timezone.utc) + timedelta(hours=3)) == ([], [FEED])
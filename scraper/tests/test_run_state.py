@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+import metrics
+import outbox
+import poll_schedule
+import scraper
+
+
+class DownClient:
+    def execute(self, *args, **kwargs):
+        raise ConnectionError("Turso is down")
+
+    def batch(self, statements):
+        raise ConnectionError("Turso is down")
+
+
+@pytest.fixture(autouse=True)
+def run_globals(monkeypatch):
+    monkeypatch.setattr(scraper, "feature_states", {})
+    monkeypatch.setattr(scraper, "feed_states", {})
+
+
+def test_run_starts_from_local_state_when_turso_is_down(turso, monkeypatch):
+    outbox.enqueue([[scraper.build_upsert_statement([{"title": "t", "link": "https://a.mk/1", "source": "A"}])]])
+    monkeypatch.setattr(outbox, "SYNC_RETRIES", 1)
+    monkeypatch.setattr(scraper, "get_client", lambda: DownClient())
+    metrics.reset()
+
+    scraper.load_run_state()
+
+    assert metrics.summary()["counters"]["db_unavailable"] == 1
+    assert scraper.feature_states == {} and scraper.feed_states == {}
+    assert outbox.pending_count() == 1
+
+
+def test_run_state_is_synced_through_the_outbox(turso, monkeypatch):
+    monkeypatch.setattr(poll_schedule, "_schedules", {})
+    monkeypatch.setattr(poll_schedule, "_updated", {})
+    scraper.load_run_state()
+    poll_schedule.record_poll("https://a.mk/feed", failed=True)
+
+    with monkeypatch.context() as down:
+        down.setattr(outbox, "SYNC_RETRIES", 1)
+        down.setattr(scraper, "get_client", lambda: DownClient())
+        scraper.sync_run_state()
+    assert outbox.pending_count() == 1
+
+    scraper.sync_run_state()  # The next run's sync, now that Turso is back (the schedule is queued again)
+    assert outbox.pending_count() == 0
+    with sqlite3.connect(turso) as conn:
+        assert conn.execute("SELECT feed_url, failures FROM feed_schedule").fetchall() == [("https://a.mk/feed", 1)]
+
+
+def test_queued_articles_are_not_marked_as_stored(turso, monkeypatch):
+    import seen_links
+
+    monkeypatch.setattr(seen_links, "_stored_links", {})
+    monkeypatch.setattr(scraper, "defer_feature_rotation", True)
+    monkeypatch.setattr(outbox, "SYNC_RETRIES", 1)
+    remembered = []
+    article = {"title": "t", "link": "https://a.mk/1", "source": "A", "category": "Tech", "summary": "s"}
+    feed = {"source": "A", "articles": [article], "duplicates": [], "remember": lambda: remembered.append("A")}
+    prepared = {"feed": feed, "source": "A", "articles": [article], "rejected": set()}
+
+    with monkeypatch.context() as down:
+        down.setattr(scraper, "get_client", lambda: DownClient())
+        scraper.save_run_results([prepared])
+    assert seen_links.link_status(article["link"]) is None
+    assert remembered == []  # The feed is fetched again too
+
+    scraper.save_run_results([prepared])  # Turso is back
+    assert seen_links.link_status(article["link"]) == "stored"
+    assert remembered == ["A"]
@@ -0,0 +1,102 @@
+import sqlite3
+
+import scraper
+from scraper import build_upsert_statement, save_batch_to_turso
+
+
+def article(n: int, summary: str = "Резиме.") -> dict:
+    return {"title": f"Вест {n}", "link": f"https://example.mk/{n}", "source": "Example", "category": "Tech",
+            "teaser": "", "summary": summary, "image_url": None,
+            "published_at": "2025-01-01T10:00:00", "scraped_at": "2025-01-01T10:05:00"}
+
+
+def posts_by_link(db_path) -> dict[str, tuple[int, str]]:
+    with sqlite3.connect(db_path) as conn:
+        return {link: (post_id, summary) for post_id, link, summary in conn.execute("SELECT id, link, summary FROM posts")}
+
+
+def test_upsert_statement_has_one_row_per_article():
+    stmt = build_upsert_statement([article(1), article(2)])
+    assert stmt.sql.count("(?, ?, ?, ?, ?, ?, ?, ?, ?)") == 2
+    assert len(stmt.args) == 18
+    assert "RETURNING id, link" in stmt.sql
+
+
+def test_save_batch_returns_the_id_of_every_row(turso, monkeypatch):
+    monkeypatch.setattr(scraper, "DB_WRITE_CHUNK_SIZE", 3)
+    # Link 1 appears in what would be the first and the third chunk; the later copy wins
+    articles = [article(n) for n in range(1, 8)] + [article(1, summary="Ново резиме.")]
+
+    post_ids = save_batch_to_turso(articles)
+
+    rows = posts_by_link(turso)
+    assert len(rows) == 7
+    assert post_ids == {link: post_id for link, (post_id, _) in rows.items()}
+    assert rows["https://example.mk/1"][1] == "Ново резиме."
+
+
+def test_save_batch_updates_existing_rows_in_place(turso, monkeypatch):
+    monkeypatch.setattr(scraper, "DB_WRITE_CHUNK_SIZE", 2)
+    first = save_batch_to_turso([article(n) for n in range(1, 5)])
+
+    # Overlaps the first run across a chunk boundary: 3 and 4 exist, 5 and 6 are new
+    second = save_batch_to_turso([article(n, summary="Освежено.") for n in range(3, 7)])
+
+    rows = posts_by_link(turso)
+    assert len(rows) == 6
+    assert second["https://example.mk/3"] == first["https://example.mk/3"]
+    assert second["https://example.mk/4"] == first["https://example.mk/4"]
+    assert second == {f"https://example.mk/{n}": rows[f"https://example.mk/{n}"][0] for n in range(3, 7)}
+    assert rows["https://example.mk/4"][1] == "Освежено."
+    assert rows["https://example.mk/1"][1] == "Резиме."
+
+
+class DownClient:
+    def batch(self, statements):
+        raise ConnectionError("Turso is down")
+
+
+def add_slots(db_path, *rows):
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO featured_slots (slot_id, post_id, locked_until, manual_override) VALUES (?, ?, ?, ?)",
+                         rows)
+
+
+def slot_posts(db_path) -> dict[str, int | None]:
+    with sqlite3.connect(db_path) as conn:
+        return dict(conn.execute("SELECT slot_id, post_id FROM featured_slots"))
+
+
+def test_slot_updates_respect_pins_and_locks(turso):
+    add_slots(turso, ("main", None, None, 0), ("tech", 99, None, 1), ("sports", 98, "2999-01-01T00:00:00+00:00", 0))
+    rotated = {}
+
+    post_ids = save_batch_to_turso([article(1), article(2)], [("main", article(1)["link"]), ("tech", article(2)["link"]),
+                                                              ("sports", article(2)["link"])], rotated_slots=rotated)
+
+    assert rotated == {"main": post_ids[article(1)["link"]], "tech": None, "sports": None}
+    assert slot_posts(turso) == {"main": post_ids[article(1)["link"]], "tech": 99, "sports": 98}
+
+
+def test_queued_slot_update_does_not_override_a_later_pin(turso, monkeypatch):
+    import outbox
+
+    add_slots(turso, ("main", None, None, 0))
+    monkeypatch.setattr(outbox, "SYNC_RETRIES", 1)
+    rotated = {}
+
+    with monkeypatch.context() as down:
+        down.setattr(scraper, "get_client", lambda: DownClient())
+        post_ids = save_batch_to_turso([article(1)], [("main", article(1)["link"])], rotated_slots=rotated)
+    assert post_ids == {article(1)["link"]: None}
+    assert rotated == {}
+    assert outbox.pending_count() == 1
+
+    # An editor pins the slot before the queued write gets through
+    with sqlite3.connect(turso) as conn:
+        conn.execute("UPDATE featured_slots SET manual_override = 1")
+    outbox.flush(scraper.get_client())
+
+    assert outbox.pending_count() == 0
+    assert article(1)["link"] in posts_by_link(turso)
+    assert slot_posts(turso) == {"main": None}
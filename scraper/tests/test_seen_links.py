@@ -0,0 +1,60 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import libsql_client
+import pytest
+
+import seen_links
+
+
+@pytest.fixture(autouse=True)
+def local_copy(tmp_path, monkeypatch):
+    monkeypatch.setattr(seen_links, "SEEN_LINKS_FILE", tmp_path / "seen_links.json")
+    monkeypatch.setattr(seen_links, "_stored_links", {})
+    monkeypatch.setattr(seen_links, "_rejected_links", {})
+    return tmp_path / "seen_links.json"
+
+
+def days_ago(days: int) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def test_stored_links_expire_after_the_retention_window(local_copy):
+    local_copy.write_text(json.dumps({"stored": {
+        "https://a.mk/old": days_ago(seen_links.STORED_TTL_DAYS + 1).isoformat(),
+        "https://a.mk/recent": days_ago(5).isoformat(),
+    }}))
+
+    seen_links._load_local_copy()
+    seen_links.save_seen_links()
+
+    assert seen_links.link_status("https://a.mk/old") is None
+    assert seen_links.link_status("https://a.mk/recent") == "stored"
+    assert list(json.loads(local_copy.read_text())["stored"]) == ["https://a.mk/recent"]
+
+
+def test_copy_without_timestamps_starts_their_window_now(local_copy):
+    local_copy.write_text(json.dumps({"stored": ["https://a.mk/1"], "rejected": {}}))
+    seen_links._load_local_copy()
+    assert seen_links.link_status("https://a.mk/1") == "stored"
+    assert seen_links._stored_links["https://a.mk/1"] >= days_ago(1).isoformat()
+
+
+def test_only_posts_inside_the_window_are_loaded(sqlite_url):
+    def created(days: int) -> str:
+        return days_ago(days).strftime("%Y-%m-%d %H:%M:%S")
+
+    with sqlite3.connect(sqlite_url.removeprefix("file:")) as conn:
+        conn.executemany("INSERT INTO posts (title, link, source, created_at) VALUES ('t', ?, 'A', ?)", [
+            ("https://a.mk/old", created(seen_links.STORED_TTL_DAYS + 1)),
+            ("https://a.mk/recent", created(2)),
+        ])
+    client = libsql_client.create_client_sync(sqlite_url)
+    try:
+        seen_links.load_seen_links(client)
+    finally:
+        client.close()
+
+    assert seen_links.link_status("https://a.mk/old") is None
+    assert seen_links._stored_links["https://a.mk/recent"] == seen_links._stored_at(created(2))
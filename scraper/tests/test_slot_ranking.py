@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+import scraper
+from slot_ranking import SlotCandidates
+
+
+def test_keeps_the_k_best_per_slot():
+    candidates = SlotCandidates(k=3)
+    for score, link in [(5, "a"), (9, "b"), (7, "c"), (8, "d"), (6, "e")]:
+        candidates.offer("main", score, link)
+    candidates.offer("tech", 4, "f")
+
+    assert candidates.ranked("main") == [(9, "b"), (8, "d"), (7, "c")]
+    assert candidates.ranked("tech") == [(4, "f")]
+    assert candidates.ranked("sports") == []
+
+
+def test_ties_keep_the_earlier_offer():
+    candidates = SlotCandidates(k=2)
+    for link in ["first", "second", "third"]:
+        candidates.offer("main", 7, link)
+    assert candidates.ranked("main") == [(7, "first"), (7, "second")]
+
+
+def test_best_skips_links_that_were_not_accepted():
+    candidates = SlotCandidates(k=3)
+    for score, link in [(9, "unsaved"), (8, "saved"), (7, "also saved")]:
+        candidates.offer("main", score, link)
+    assert candidates.best("main") == (9, "unsaved")
+    assert candidates.best("main", lambda link: link != "unsaved") == (8, "saved")
+    assert candidates.best("main", lambda link: False) is None
+
+
+def test_concurrent_offers():
+    candidates = SlotCandidates(k=5)
+
+    def offer(start):
+        for score in range(start, 1000, 8):
+            candidates.offer("main", score, f"link-{score}")
+
+    threads = [threading.Thread(target=offer, args=(start,)) for start in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [score for score, _ in candidates.ranked("main")] == [999, 998, 997, 996, 995]
+
+
+def test_clear():
+    candidates = SlotCandidates(k=1)
+    candidates.offer("main", 1, "a")
+    candidates.clear()
+    assert candidates.best("main") is None
+
+
+# ---- Offering curated articles to the slots ----
+
+@pytest.fixture
+def open_slots(monkeypatch):
+    monkeypatch.setattr(scraper, "slot_candidates", SlotCandidates(scraper.FEATURE_TOP_K))
+    monkeypatch.setattr(scraper, "feature_rotation_allowed", {slot: True for slot in scraper.FEATURE_SLOTS})
+    monkeypatch.setattr(scraper, "feature_updated_this_run", {slot: False for slot in scraper.FEATURE_SLOTS})
+
+
+def curated(link: str, category: str, hero_score: int, image: bool = True) -> dict:
+    return {"link": link, "category": category, "hero_score": hero_score,
+            "image_url": f"{link}.jpg" if image else None}
+
+
+def test_threshold_is_on_the_hero_score_scale(open_slots):
+    scraper.offer_feature_candidates([
+        curated("https://a.mk/standout", "Tech", 9),
+        curated("https://a.mk/weak", "Tech", scraper.FEATURE_SCORE_THRESHOLD),
+        curated("https://a.mk/no-image", "Tech", 10, image=False),
+        curated("https://a.mk/sports", "Sports", 8),
+    ])
+
+    assert scraper.slot_candidates.ranked("tech") == [(9, "https://a.mk/standout")]
+    assert scraper.slot_candidates.ranked("sports") == [(8, "https://a.mk/sports")]
+    assert scraper.slot_candidates.ranked("main") == [(9, "https://a.mk/standout"), (8, "https://a.mk/sports")]
+    assert scraper.slot_candidates.ranked("culture") == []
+
+
+def test_select_feature_slots_takes_the_best_stored_candidate(open_slots):
+    scraper.offer_feature_candidates([curated("https://a.mk/1", "Tech", 10), curated("https://a.mk/2", "Tech", 8)])
+    scraper.feature_rotation_allowed["main"] = False
+
+    updates = scraper.select_feature_slots({"https://a.mk/2"})
+
+    assert updates == [("tech", "https://a.mk/2")]
+    assert scraper.feature_updated_this_run["tech"]
+    assert scraper.select_feature_slots({"https://a.mk/2"}) == []  # Once per run
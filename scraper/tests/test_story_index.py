@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+import story_index
+from story_index import assign_story, confirm_stories, fingerprint, load_story_index, normalize_tokens, save_story_index
+
+TITLE = "Владата донесе нов закон за јавните набавки по долга расправа во Собранието"
+SUMMARY = ("Пратениците го изгласаа предлогот со мнозинство гласови, а опозицијата најави "
+           "дека ќе поднесе иницијатива до Уставниот суд за оценка на уставноста.")
+REWRITE = ("Пратениците го изгласаа предлогот со мнозинство гласови, а опозицијата најави "
+           "иницијатива до Уставниот суд за оценка на уставноста.")
+OTHER_TITLE = "Температурите утре ќе се искачат до 35 степени во Скопје и Велес"
+OTHER_SUMMARY = "Метеоролозите предупредуваат на топлотен бран што ќе трае до крајот на неделата низ целата држава."
+
+
+@pytest.fixture(autouse=True)
+def empty_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(story_index, "STORY_INDEX_FILE", tmp_path / "story_index.json")
+    monkeypatch.setattr(story_index, "_entries", [])
+    monkeypatch.setattr(story_index, "_bands", {})
+    monkeypatch.setattr(story_index, "_new_stories", set())
+    monkeypatch.setattr(story_index, "_confirmed", set())
+
+
+def distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def test_normalize_tokens_drops_stopwords_digits_and_inflection():
+    assert normalize_tokens("Владата и Собранието во 2025, ВЛАДАТА!") == ["владат", "собран", "владат"]
+
+
+def test_rewrites_are_close_and_unrelated_stories_are_far():
+    original = fingerprint(TITLE, SUMMARY)
+    assert distance(original, fingerprint(TITLE, REWRITE)) <= story_index.MAX_HAMMING_DISTANCE
+    assert distance(original, fingerprint(OTHER_TITLE, OTHER_SUMMARY)) > 3 * story_index.MAX_HAMMING_DISTANCE
+
+
+def test_short_text_has_no_fingerprint():
+    assert fingerprint("Временска прогноза", "") is None
+
+
+def test_duplicate_is_attached_to_the_first_story():
+    assert assign_story("https://a.mk/1", "A", TITLE, SUMMARY) is None
+    assert assign_story("https://b.mk/1", "B", TITLE, REWRITE) == "https://a.mk/1"
+    assert assign_story("https://c.mk/1", "C", OTHER_TITLE, OTHER_SUMMARY) is None
+
+
+def test_article_does_not_duplicate_its_own_story():
+    assign_story("https://a.mk/1", "A", TITLE, SUMMARY)
+    assert assign_story("https://a.mk/1", "A", TITLE, SUMMARY) is None
+
+
+def test_only_confirmed_stories_are_saved_and_reloaded(monkeypatch):
+    assign_story("https://a.mk/1", "A", TITLE, SUMMARY)
+    assign_story("https://c.mk/1", "C", OTHER_TITLE, OTHER_SUMMARY)
+    confirm_stories(["https://a.mk/1"])
+    save_story_index()
+
+    saved = json.loads(story_index.STORY_INDEX_FILE.read_text(encoding="utf-8"))["entries"]
+    assert [entry["story"] for entry in saved] == ["https://a.mk/1"]
+
+    # A later run
+    monkeypatch.setattr(story_index, "_entries", [])
+    monkeypatch.setattr(story_index, "_bands", {})
+    assert load_story_index() == 1
+    assert assign_story("https://b.mk/1", "B", TITLE, REWRITE) == "https://a.mk/1"
+    assert assign_story("https://d.mk/1", "D", OTHER_TITLE, OTHER_SUMMARY) is None
+
+
+def test_expired_stories_are_not_loaded():
+    story_index.STORY_INDEX_FILE.write_text(json.dumps({"entries": [
+        {"fp": f"{fingerprint(TITLE, SUMMARY):016x}", "story": "https://a.mk/1", "source": "A",
+         "seen_at": "2000-01-01T00:00:00+00:00"},
+    ]}), encoding="utf-8")
+    assert load_story_index() == 0